@@ -0,0 +1,81 @@
+/*
+ * Пример приема команд от python/data_sender.py (Sender).
+ *
+ * Принимаются оба протокола:
+ *   - двоичный (SERIAL_PROTOCOL = "binary"): пропорциональное управление
+ *     по отклонению маркера от центра кадра и расстоянию;
+ *   - текстовый (SERIAL_PROTOCOL = "text"): символы 'S', 'F', 'L', 'R'.
+ * Если команды не приходят дольше COMMAND_TIMEOUT_MS, двигатели
+ * останавливаются. Цикл управления должен передавать команду Sender на
+ * каждом кадре: SerialWriter пропускает одинаковые команды не чаще раза
+ * в SERIAL_HEARTBEAT, но сам их не повторяет.
+ *
+ * Выводы и коэффициенты - пример для двух двигателей через драйвер с ШИМ
+ * входами, их нужно заменить на используемые на плате.
+ */
+#include "control_protocol.h"
+
+#define BAUD_RATE 9600          /* config.SERIAL_BOUD_RATE */
+#define COMMAND_TIMEOUT_MS 1000
+#define START_DISTANCE 1000     /* config.START_DISTANCE, мм */
+#define LEFT_PWM_PIN 5
+#define RIGHT_PWM_PIN 6
+#define BASE_SPEED 160
+#define TURN_GAIN 120
+
+ControlDecoder decoder;
+unsigned long last_command_ms = 0;
+
+void drive(int left, int right) {
+    analogWrite(LEFT_PWM_PIN, constrain(left, 0, 255));
+    analogWrite(RIGHT_PWM_PIN, constrain(right, 0, 255));
+}
+
+void apply_text(char direction) {
+    switch (direction) {
+        case 'F': drive(BASE_SPEED, BASE_SPEED); break;
+        case 'L': drive(0, BASE_SPEED); break;
+        case 'R': drive(BASE_SPEED, 0); break;
+        default: drive(0, 0); break;
+    }
+}
+
+void apply_message(const ControlMessage *message) {
+    if (!message->valid) {
+        drive(0, 0);
+        return;
+    }
+    /* поворот пропорционален отклонению, движение вперед - до START_DISTANCE */
+    long turn = (long)message->steering * TURN_GAIN / 32767;
+    int speed = message->distance > START_DISTANCE ? BASE_SPEED : 0;
+    drive(speed + turn, speed - turn);
+}
+
+void setup() {
+    pinMode(LEFT_PWM_PIN, OUTPUT);
+    pinMode(RIGHT_PWM_PIN, OUTPUT);
+    control_decoder_init(&decoder);
+    Serial.begin(BAUD_RATE);
+}
+
+void loop() {
+    ControlMessage message;
+    while (Serial.available() > 0) {
+        uint8_t byte = Serial.read();
+        if (decoder.length == 0 && byte != CONTROL_SYNC) {
+            /* вне двоичного кадра - текстовый протокол */
+            if (byte == 'S' || byte == 'F' || byte == 'L' || byte == 'R') {
+                apply_text((char)byte);
+                last_command_ms = millis();
+            }
+            continue;
+        }
+        if (control_decoder_feed(&decoder, byte, &message)) {
+            apply_message(&message);
+            last_command_ms = millis();
+        }
+    }
+    if (millis() - last_command_ms > COMMAND_TIMEOUT_MS) {
+        drive(0, 0);
+    }
+}
@@ -0,0 +1,113 @@
+/*
+ * Справочный декодер двоичного протокола управления (python/protocol.py).
+ *
+ * Формат кадра (версия 1, 9 байт, little-endian):
+ *   0     0xA5 - начало кадра
+ *   1     версия (старшие 4 бита) и флаги (младшие 4 бита):
+ *         бит 0 - маркер найден, бит 1 - маркер подтвержден,
+ *         биты 2-3 - направление (0 - S, 1 - F, 2 - L, 3 - R)
+ *   2     номер кадра (младшие 8 бит)
+ *   3-4   отклонение от центра кадра eps * 32767, int16
+ *   5-6   расстояние до маркера (мм), uint16
+ *   7     id маркера (0xFF - нет маркера)
+ *   8     CRC-8 (полином 0x07) байтов 1-7
+ *
+ * Заголовок не зависит от Arduino и может собираться на ПК.
+ */
+#ifndef CONTROL_PROTOCOL_H
+#define CONTROL_PROTOCOL_H
+
+#include <stdint.h>
+
+#define CONTROL_SYNC 0xA5
+#define CONTROL_VERSION 1
+#define CONTROL_FRAME_SIZE 9
+#define CONTROL_NO_MARKER 0xFF
+#define CONTROL_FLAG_FOUND 0x01
+#define CONTROL_FLAG_VALID 0x02
+
+typedef struct {
+    uint8_t seq;
+    int16_t steering;   /* eps * 32767 */
+    uint16_t distance;  /* мм */
+    uint8_t marker_id;  /* CONTROL_NO_MARKER - нет маркера */
+    uint8_t found;
+    uint8_t valid;
+    char direction;     /* 'S', 'F', 'L', 'R' */
+} ControlMessage;
+
+typedef struct {
+    uint8_t buffer[CONTROL_FRAME_SIZE];
+    uint8_t length;
+    uint16_t errors;
+} ControlDecoder;
+
+static inline uint8_t control_crc8(const uint8_t *data, uint8_t length) {
+    uint8_t crc = 0;
+    for (uint8_t i = 0; i < length; i++) {
+        crc ^= data[i];
+        for (uint8_t bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+        }
+    }
+    return crc;
+}
+
+static inline void control_decoder_init(ControlDecoder *decoder) {
+    decoder->length = 0;
+    decoder->errors = 0;
+}
+
+/* Разбор полного кадра из буфера декодера. */
+static inline uint8_t control_parse(const uint8_t *frame, ControlMessage *message) {
+    static const char directions[4] = {'S', 'F', 'L', 'R'};
+    if (frame[0] != CONTROL_SYNC || (frame[1] >> 4) != CONTROL_VERSION) {
+        return 0;
+    }
+    if (control_crc8(frame + 1, CONTROL_FRAME_SIZE - 2) != frame[CONTROL_FRAME_SIZE - 1]) {
+        return 0;
+    }
+    message->found = frame[1] & CONTROL_FLAG_FOUND ? 1 : 0;
+    message->valid = frame[1] & CONTROL_FLAG_VALID ? 1 : 0;
+    message->direction = directions[(frame[1] >> 2) & 0x03];
+    message->seq = frame[2];
+    message->steering = (int16_t)((uint16_t)frame[3] | ((uint16_t)frame[4] << 8));
+    message->distance = (uint16_t)frame[5] | ((uint16_t)frame[6] << 8);
+    message->marker_id = frame[7];
+    return 1;
+}
+
+/*
+ * Добавление принятого байта. Возвращает 1, если собран корректный кадр
+ * (он записывается в message). При ошибке CRC или версии отбрасывается
+ * первый байт и поиск начала кадра продолжается в оставшихся байтах.
+ */
+static inline uint8_t control_decoder_feed(
+    ControlDecoder *decoder, uint8_t byte, ControlMessage *message) {
+    if (decoder->length == 0 && byte != CONTROL_SYNC) {
+        decoder->errors++;
+        return 0;
+    }
+    decoder->buffer[decoder->length++] = byte;
+    if (decoder->length < CONTROL_FRAME_SIZE) {
+        return 0;
+    }
+    if (control_parse(decoder->buffer, message)) {
+        decoder->length = 0;
+        return 1;
+    }
+    decoder->errors++;
+    /* сдвиг до следующего байта начала кадра */
+    uint8_t start = 1;
+    while (start < CONTROL_FRAME_SIZE && decoder->buffer[start] != CONTROL_SYNC) {
+        start++;
+    }
+    decoder->errors += start - 1;
+    for (uint8_t i = start; i < CONTROL_FRAME_SIZE; i++) {
+        decoder->buffer[i - start] = decoder->buffer[i];
+    }
+    decoder->length = CONTROL_FRAME_SIZE - start;
+    return 0;
+}
+
+#endif
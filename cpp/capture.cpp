@@ -0,0 +1,93 @@
+#include <algorithm>
+#include <cctype>
+#include <chrono>
+#include <sys/stat.h>
+#include <opencv2/videoio.hpp>
+
+#include "capture.h"
+
+LatestFrameCapture::~LatestFrameCapture()
+{
+    release();
+}
+
+bool LatestFrameCapture::open(const std::string &source, int width, int height)
+{
+    struct stat info;
+    auto is_digit = [](unsigned char c) { return std::isdigit(c) != 0; };
+    bool camera = !source.empty() && std::all_of(source.begin(), source.end(), is_digit);
+    if (camera)
+    {
+        cap.open(std::stoi(source), cv::CAP_V4L2);
+        cap.set(cv::CAP_PROP_FOURCC, cv::VideoWriter::fourcc('M', 'J', 'P', 'G'));
+        cap.set(cv::CAP_PROP_FRAME_HEIGHT, height);
+        cap.set(cv::CAP_PROP_FRAME_WIDTH, width);
+        cap.set(cv::CAP_PROP_BUFFERSIZE, 1);
+    }
+    else
+        cap.open(source, cv::CAP_FFMPEG);
+    if (!cap.isOpened())
+        return false;
+
+    // запись обрабатывается полностью, камера и поток - с пропуском устаревших кадров
+    threaded = camera || stat(source.c_str(), &info) != 0;
+    if (threaded)
+    {
+        running = true;
+        thread = std::thread(&LatestFrameCapture::run, this);
+    }
+    return true;
+}
+
+void LatestFrameCapture::run()
+{
+    cv::Mat grabbed;
+    while (running && cap.read(grabbed))
+    {
+        {
+            std::lock_guard<std::mutex> lock(mutex);
+            // буферы меняются местами, кадр не копируется
+            std::swap(grabbed, latest);
+            latest_seq++;
+        }
+        ready.notify_one();
+    }
+    {
+        // под блокировкой, чтобы read не пропустил уведомление
+        std::lock_guard<std::mutex> lock(mutex);
+        running = false;
+    }
+    ready.notify_all();
+}
+
+bool LatestFrameCapture::read(cv::Mat &frame, double timeout)
+{
+    if (!threaded)
+    {
+        if (!cap.read(frame))
+            return false;
+        seq++;
+        return true;
+    }
+    std::unique_lock<std::mutex> lock(mutex);
+    bool fresh = ready.wait_for(lock, std::chrono::duration<double>(timeout),
+                                [this] { return latest_seq > seq || !running; });
+    if (!fresh || latest_seq <= seq)
+        return false;
+    if (seq >= 0)
+        dropped += latest_seq - seq - 1;
+    std::swap(frame, latest);
+    seq = latest_seq;
+    return true;
+}
+
+void LatestFrameCapture::release()
+{
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        running = false;
+    }
+    if (thread.joinable())
+        thread.join();
+    cap.release();
+}
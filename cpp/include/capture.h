@@ -0,0 +1,43 @@
+#include <atomic>
+#include <condition_variable>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <opencv2/videoio.hpp>
+
+#ifndef capture_h
+#define capture_h
+
+// Захват кадров (как UsbVideoCapture/BufferlessVideoCapture и FileVideoCapture в python/video_capture.py).
+// Камера и поток читаются в отдельном потоке, read выдает последний кадр без копирования;
+// запись читается по кадрам подряд без пропусков.
+class LatestFrameCapture
+{
+public:
+    ~LatestFrameCapture();
+
+    // source - номер камеры, путь к записи или адрес потока
+    bool open(const std::string &source, int width, int height);
+    // Кадр новее предыдущего прочитанного, false в конце записи или по timeout
+    bool read(cv::Mat &frame, double timeout = 1.0);
+    // false после конца потока или отключения камеры (read больше не выдаст кадров)
+    bool is_running() const { return running; }
+    void release();
+
+    bool threaded = false;
+    long seq = -1;     // номер последнего прочитанного кадра
+    long dropped = 0;  // кадры, перезаписанные до чтения
+
+private:
+    void run();
+
+    cv::VideoCapture cap;
+    std::thread thread;
+    std::mutex mutex;
+    std::condition_variable ready;
+    cv::Mat latest;
+    long latest_seq = -1;
+    std::atomic<bool> running{false};
+};
+
+#endif
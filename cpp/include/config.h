@@ -1,15 +1,25 @@
 #ifndef config_h
 #define config_h
 
+// Значения по умолчанию совпадают с python/config.py
 namespace constants
 {
-    const float blind_spot = 0.1; // description
+    const float blind_spot = 0.1; // мертвая зона поворота (DEAD_ZONE), доля половины кадра
     const float frame_height = 720; //
     const float frame_width = 1280; //
 
-    const float distance_coefficient = 1.0;
-    const float marker_true_size = 150.0;
+    const float distance_coefficient = 1.0; // коэффициент расстояния для кадра высотой 720
+    const float marker_true_size = 150.0; // размер маркера (мм)
+    const double start_distance = 1000.0; // расстояние, с которого начинается движение вперед (мм)
+    const int correct_id = 1; // id маркера
+    const int valid_frame_count = 3; // количество подряд идущих кадров с маркером
 
+    const int camera_index = 0;
+    const char serial_port[] = "/dev/ttyACM0";
+    const int serial_baud_rate = 9600;
+    const double serial_heartbeat = 0.5; // период повторной отправки одинаковых команд (с)
+
+    const double stats_interval = 5.0; // период вывода статистики (с)
 }
 
-#endif
\ No newline at end of file
+#endif
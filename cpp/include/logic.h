@@ -1,10 +1,27 @@
 #include <string>
+#include <vector>
+#include <opencv2/core/types.hpp>
 
 #ifndef logic_h
 #define logic_h
 
-float find_position(std::vector<std::vector<cv::Point2f>> &corners);
-double find_distance(std::vector<std::vector<cv::Point2f>> &corners);
-std::string get_direction();
+#include "config.h"
 
-#endif
\ No newline at end of file
+// Состояние маркера после обработки кадра (как у Marker в python/marker.py)
+struct MarkerState
+{
+    bool found = false;
+    bool valid = false;
+    int found_frames = 0;
+    float eps = 0.0;
+    double distance = 0.0;
+    cv::Point2f center;
+    std::string direction = "S";
+};
+
+float find_position(std::vector<std::vector<cv::Point2f>> &corners, float frame_width = constants::frame_width);
+double find_distance(std::vector<std::vector<cv::Point2f>> &corners, float distance_coefficient = constants::distance_coefficient);
+int find_marker(const std::vector<int> &ids, int valid_id = constants::correct_id);
+std::string get_direction(std::vector<std::vector<cv::Point2f>> &corners, float frame_width, MarkerState &state);
+
+#endif
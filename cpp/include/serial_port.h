@@ -0,0 +1,35 @@
+#include <chrono>
+#include <string>
+
+#ifndef serial_port_h
+#define serial_port_h
+
+#include "logic.h"
+
+// Отправка команд на Arduino через termios (как Sender и SerialWriter в python/data_sender.py)
+class SerialPort
+{
+public:
+    ~SerialPort();
+
+    bool open(const std::string &port, int baud_rate);
+    // Текстовый протокол: направление и '\n'. Одинаковая команда повторяется не чаще heartbeat
+    bool send_direction(const std::string &direction, double heartbeat = constants::serial_heartbeat);
+    // Двоичный протокол (python/protocol.py, arduino/control_decoder/control_protocol.h)
+    bool send_message(const MarkerState &state, int seq, int marker_id);
+    void close();
+    bool is_open() const { return fd >= 0; }
+
+    int written = 0;
+    int dropped_duplicate = 0;
+    int errors = 0;
+
+private:
+    bool write_all(const unsigned char *data, size_t size);
+
+    int fd = -1;
+    std::string last_command;
+    std::chrono::steady_clock::time_point last_write;
+};
+
+#endif
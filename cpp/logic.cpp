@@ -4,22 +4,24 @@
 #include <opencv2/core/types.hpp>
 
 #include "config.h"
+#include "logic.h"
 
-float find_position(std::vector<std::vector<cv::Point2f>> &corners)
+// Отклонение центра маркера от центра кадра [-1.0;1.0], 0 в мертвой зоне
+float find_position(std::vector<std::vector<cv::Point2f>> &corners, float frame_width)
 {
     if (corners.size() == 0)
         return 0;
 
     int center_x = (corners[0][0].x + corners[0][2].x) / 2;
 
-    float pos = (2.0 * center_x) / constants::frame_width - 1.0;
+    float pos = (2.0 * center_x) / frame_width - 1.0;
     if (-constants::blind_spot <= pos && pos <= constants::blind_spot)
         return 0.0;
     else
         return pos;
 }
 
-double find_distance(std::vector<std::vector<cv::Point2f>> &corners)
+double find_distance(std::vector<std::vector<cv::Point2f>> &corners, float distance_coefficient)
 {
     if (corners.size() == 0)
         return 0;
@@ -27,11 +29,43 @@ double find_distance(std::vector<std::vector<cv::Point2f>> &corners)
     float marker_size = hypot(corners[0][1].x - corners[0][0].x, corners[0][1].y - corners[0][0].y) +
                         hypot(corners[0][2].x - corners[0][1].x, corners[0][2].y - corners[0][1].y);
 
-    return constants::distance_coefficient * 1000.0 * constants::marker_true_size / marker_size;
+    return distance_coefficient * 1000.0 * constants::marker_true_size / marker_size;
 }
 
-std::string get_direction(std::vector<std::vector<cv::Point2f>> &corners)
+// Индекс маркера valid_id среди найденных, -1 если маркер не найден
+int find_marker(const std::vector<int> &ids, int valid_id)
 {
-    
-    return " ";
+    for (size_t i = 0; i < ids.size(); i++)
+    {
+        if (ids[i] == valid_id)
+            return i;
+    }
+    return -1;
+}
+
+// Направление движения до маркера corners[0] ('S', 'F', 'L', 'R'), как Marker.get_direction
+std::string get_direction(std::vector<std::vector<cv::Point2f>> &corners, float frame_width, MarkerState &state)
+{
+    state.found = corners.size() > 0;
+    state.found_frames = state.found ? state.found_frames + 1 : 0;
+    state.valid = state.found_frames >= constants::valid_frame_count;
+    state.direction = "S";
+    state.distance = 0.0;
+    state.eps = 0.0;
+    if (!state.found)
+        return state.direction;
+
+    state.center = cv::Point2f((int)(corners[0][0].x + corners[0][2].x) / 2,
+                               (int)(corners[0][0].y + corners[0][2].y) / 2);
+    state.eps = (2.0 * state.center.x) / frame_width - 1.0;
+    // коэффициент расстояния задан для кадра высотой 720, как в python
+    state.distance = find_distance(corners, constants::distance_coefficient * frame_width / 720.0);
+    if (find_position(corners, frame_width) == 0.0)
+    {
+        if (state.distance > constants::start_distance)
+            state.direction = "F";
+    }
+    else
+        state.direction = state.eps < 0 ? "L" : "R";
+    return state.direction;
 }
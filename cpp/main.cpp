@@ -1,20 +1,104 @@
+#include <algorithm>
+#include <chrono>
+#include <csignal>
+#include <cstring>
+#include <fstream>
 #include <iostream>
+#include <string>
+#include <vector>
 #include <opencv2/opencv.hpp>
 #include <opencv2/aruco.hpp>
 
-#include "logic.h"
+#include "capture.h"
 #include "config.h"
+#include "logic.h"
+#include "serial_port.h"
 
-int main(int, char **)
+namespace
 {
+    volatile std::sig_atomic_t stop = 0;
+
+    void on_signal(int)
+    {
+        stop = 1;
+    }
+
+    void print_usage()
+    {
+        std::cout << "Usage: ArucoDetector [--source <camera index|file|url>] [--headless]\n"
+                     "                     [--serial <port>] [--no-serial] [--protocol text|binary]\n"
+                     "                     [--report <csv>] [--max-frames <n>]"
+                  << std::endl;
+    }
+
+    double percentile(std::vector<double> values, double q)
+    {
+        if (values.empty())
+            return 0.0;
+        size_t index = std::min(values.size() - 1, (size_t)(q / 100.0 * values.size()));
+        std::nth_element(values.begin(), values.begin() + index, values.end());
+        return values[index];
+    }
 
-    // cv::VideoCapture cap("udp://@172.23.122.51:8554", cv::CAP_FFMPEG); //?overrun_nonfatal=1&fifo_size=500000
-    cv::VideoCapture cap(0, cv::CAP_V4L2);
+    double mean(const std::vector<double> &values)
+    {
+        double total = 0.0;
+        for (double value : values)
+            total += value;
+        return values.empty() ? 0.0 : total / values.size();
+    }
 
-    cap.set(cv::CAP_PROP_BUFFERSIZE, 1);
-    cap.set(cv::CAP_PROP_FOURCC, cv::VideoWriter::fourcc('M', 'P', '4', 'V'));
+    double elapsed_ms(std::chrono::steady_clock::time_point start)
+    {
+        return std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - start).count();
+    }
+}
 
-    if (!cap.isOpened())
+int main(int argc, char **argv)
+{
+    std::string source = std::to_string(constants::camera_index);
+    std::string serial_port = constants::serial_port;
+    std::string protocol = "text";
+    std::string report_path;
+    bool headless = false;
+    bool use_serial = true;
+    long max_frames = -1;
+
+    for (int i = 1; i < argc; i++)
+    {
+        std::string arg = argv[i];
+        bool has_value = i + 1 < argc;
+        if (arg == "--source" && has_value)
+            source = argv[++i];
+        else if (arg == "--headless")
+            headless = true;
+        else if (arg == "--serial" && has_value)
+            serial_port = argv[++i];
+        else if (arg == "--no-serial")
+            use_serial = false;
+        else if (arg == "--protocol" && has_value)
+            protocol = argv[++i];
+        else if (arg == "--report" && has_value)
+            report_path = argv[++i];
+        else if (arg == "--max-frames" && has_value)
+            max_frames = std::stol(argv[++i]);
+        else
+        {
+            print_usage();
+            return arg == "--help" ? 0 : -1;
+        }
+    }
+    if (protocol != "text" && protocol != "binary")
+    {
+        print_usage();
+        return -1;
+    }
+
+    std::signal(SIGINT, on_signal);
+    std::signal(SIGTERM, on_signal);
+
+    LatestFrameCapture cap;
+    if (!cap.open(source, constants::frame_width, constants::frame_height))
     {
         std::cout << "Error opening video stream or file" << std::endl;
         return -1;
@@ -24,47 +108,107 @@ int main(int, char **)
         std::cout << "Successful opening video stream or file" << std::endl;
     }
 
-    cv::namedWindow("Frame", cv::WINDOW_GUI_NORMAL | cv::WINDOW_NORMAL | cv::WINDOW_KEEPRATIO);
+    SerialPort serial;
+    if (use_serial)
+        serial.open(serial_port, constants::serial_baud_rate);
+
+    std::ofstream report;
+    if (!report_path.empty())
+    {
+        report.open(report_path);
+        report << "seq,found,valid,direction,eps,distance,capture_ms,detect_ms\n";
+    }
+
+    if (!headless)
+        cv::namedWindow("Frame", cv::WINDOW_GUI_NORMAL | cv::WINDOW_NORMAL | cv::WINDOW_KEEPRATIO);
     cv::aruco::Dictionary dictionary = cv::aruco::getPredefinedDictionary(cv::aruco::DICT_4X4_250);
     cv::aruco::ArucoDetector detector = cv::aruco::ArucoDetector(dictionary, cv::aruco::DetectorParameters(), cv::aruco::RefineParameters());
     cv::Mat frame;
+    MarkerState state;
+    std::vector<int> ids;
+    std::vector<std::vector<cv::Point2f>> corners;
+    std::vector<std::vector<cv::Point2f>> target;
+    std::vector<double> capture_times;
+    std::vector<double> detect_times;
 
-    while (1)
+    auto start = std::chrono::steady_clock::now();
+    auto last_stats = start;
+    long frames = 0;
+    while (!stop && (max_frames < 0 || frames < max_frames))
     {
-        // Capture frame-by-frame
-        cap >> frame;
-
-        // If the frame is empty, break immediately
-        if (frame.empty())
+        auto capture_start = std::chrono::steady_clock::now();
+        if (!cap.read(frame))
+        {
+            // камера: кадр не получен за timeout, запись: конец записи
+            if (cap.threaded && cap.is_running())
+                continue;
+            if (cap.threaded)
+                std::cout << "Video stream ended or camera disconnected" << std::endl;
             break;
+        }
+        double capture_ms = elapsed_ms(capture_start);
 
-        std::vector<int> ids;
-        std::vector<std::vector<cv::Point2f>> corners;
+        auto detect_start = std::chrono::steady_clock::now();
         detector.detectMarkers(frame, corners, ids);
+        target.clear();
+        int index = find_marker(ids);
+        if (index >= 0)
+            target.push_back(corners[index]);
+        std::string direction = get_direction(target, frame.cols, state);
+        double detect_ms = elapsed_ms(detect_start);
 
-
-        if (ids.size() > 0)
+        if (serial.is_open())
         {
-            for (int id : ids)
-            {
-                std::cout << id << " ";
-            }
-            std::cout << std::endl;
-            cv::aruco::drawDetectedMarkers(frame, corners, ids);
-            std::cout << find_distance(corners) << std::endl;
+            if (protocol == "binary")
+                serial.send_message(state, cap.seq, constants::correct_id);
+            else
+                serial.send_direction(direction);
+        }
+        frames++;
+        capture_times.push_back(capture_ms);
+        detect_times.push_back(detect_ms);
+        if (report.is_open())
+        {
+            report << cap.seq << "," << state.found << "," << state.valid << "," << direction << ","
+                   << state.eps << "," << state.distance << "," << capture_ms << "," << detect_ms << "\n";
         }
 
-        cv::imshow("Frame", frame);
+        if (!headless)
+        {
+            if (state.found)
+                cv::aruco::drawDetectedMarkers(frame, target);
+            cv::putText(frame, direction + " " + std::to_string((int)state.distance) + " mm", cv::Point(0, 60),
+                        cv::FONT_HERSHEY_SIMPLEX, 2, cv::Scalar(0, 255, 0), 2);
+            cv::imshow("Frame", frame);
+            // Press  ESC on keyboard to exit
+            if ((char)cv::waitKey(1) == 27)
+                break;
+        }
 
-        // Press  ESC on keyboard to exit
-        if ((char)cv::waitKey(1) == 27)
-            break;
+        std::chrono::duration<double> since_stats = std::chrono::steady_clock::now() - last_stats;
+        if (since_stats.count() >= constants::stats_interval)
+        {
+            last_stats = std::chrono::steady_clock::now();
+            std::cout << "frames " << frames << ", dropped " << cap.dropped << ", detect mean/p95 "
+                      << mean(detect_times) << "/" << percentile(detect_times, 95) << " ms, serial "
+                      << serial.written << " written, " << serial.dropped_duplicate << " duplicate, "
+                      << serial.errors << " errors" << std::endl;
+        }
     }
+    std::chrono::duration<double> wall = std::chrono::steady_clock::now() - start;
+
+    // итоговая строка разбирается python/benchmarks/native_parity.py
+    std::cout << "summary: frames " << frames << ", fps " << (wall.count() > 0 ? frames / wall.count() : 0.0)
+              << ", capture mean " << mean(capture_times) << " ms, detect mean " << mean(detect_times)
+              << " ms, p50 " << percentile(detect_times, 50) << " ms, p95 " << percentile(detect_times, 95)
+              << " ms, dropped " << cap.dropped << std::endl;
 
     // When everything done, release the video capture object
     cap.release();
+    serial.close();
 
     // Closes all the frames
-    cv::destroyAllWindows();
+    if (!headless)
+        cv::destroyAllWindows();
     return 0;
 }
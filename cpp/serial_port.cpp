@@ -0,0 +1,146 @@
+#include <algorithm>
+#include <cerrno>
+#include <cmath>
+#include <cstdint>
+#include <iostream>
+#include <fcntl.h>
+#include <termios.h>
+#include <unistd.h>
+
+#include "serial_port.h"
+
+namespace
+{
+    speed_t baud_constant(int baud_rate)
+    {
+        switch (baud_rate)
+        {
+        case 9600:
+            return B9600;
+        case 19200:
+            return B19200;
+        case 38400:
+            return B38400;
+        case 57600:
+            return B57600;
+        case 115200:
+            return B115200;
+        default:
+            return 0;
+        }
+    }
+
+    uint8_t crc8(const uint8_t *data, size_t length)
+    {
+        uint8_t crc = 0;
+        for (size_t i = 0; i < length; i++)
+        {
+            crc ^= data[i];
+            for (int bit = 0; bit < 8; bit++)
+                crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+        }
+        return crc;
+    }
+}
+
+SerialPort::~SerialPort()
+{
+    close();
+}
+
+bool SerialPort::open(const std::string &port, int baud_rate)
+{
+    speed_t speed = baud_constant(baud_rate);
+    if (speed == 0)
+    {
+        std::cout << "ERROR - Unsupported baud rate " << baud_rate << std::endl;
+        return false;
+    }
+    fd = ::open(port.c_str(), O_RDWR | O_NOCTTY | O_NONBLOCK);
+    if (fd < 0)
+    {
+        std::cout << "ERROR - Could not open USB serial port." << std::endl;
+        return false;
+    }
+    termios tty{};
+    if (tcgetattr(fd, &tty) != 0)
+    {
+        close();
+        return false;
+    }
+    cfmakeraw(&tty);
+    cfsetispeed(&tty, speed);
+    cfsetospeed(&tty, speed);
+    tty.c_cflag |= CLOCAL | CREAD;
+    tty.c_cflag &= ~CRTSCTS;
+    tty.c_cc[VMIN] = 0;
+    tty.c_cc[VTIME] = 0;
+    if (tcsetattr(fd, TCSANOW, &tty) != 0)
+    {
+        close();
+        return false;
+    }
+    return true;
+}
+
+bool SerialPort::write_all(const unsigned char *data, size_t size)
+{
+    if (fd < 0)
+        return false;
+    // порт неблокирующий: при заполненном буфере отправки команда отбрасывается,
+    // следующий кадр даст новую команду
+    ssize_t result = ::write(fd, data, size);
+    if (result != (ssize_t)size)
+    {
+        errors++;
+        return false;
+    }
+    written++;
+    last_write = std::chrono::steady_clock::now();
+    return true;
+}
+
+bool SerialPort::send_direction(const std::string &direction, double heartbeat)
+{
+    std::string command = direction + "\n";
+    std::chrono::duration<double> since = std::chrono::steady_clock::now() - last_write;
+    if (command == last_command && written > 0 && since.count() < heartbeat)
+    {
+        dropped_duplicate++;
+        return true;
+    }
+    last_command = command;
+    return write_all((const unsigned char *)command.data(), command.size());
+}
+
+bool SerialPort::send_message(const MarkerState &state, int seq, int marker_id)
+{
+    static const std::string directions = "SFLR";
+    uint8_t frame[9];
+    uint8_t flags = directions.find(state.direction[0]) << 2;
+    if (state.found)
+        flags |= 0x01;
+    if (state.valid)
+        flags |= 0x02;
+    int16_t steering = std::lround(std::max(-1.0f, std::min(1.0f, state.eps)) * 32767);
+    uint16_t distance = std::lround(std::max(0.0, std::min(65535.0, state.distance)));
+    frame[0] = 0xA5;
+    frame[1] = (1 << 4) | flags;
+    frame[2] = seq & 0xFF;
+    frame[3] = steering & 0xFF;
+    frame[4] = (steering >> 8) & 0xFF;
+    frame[5] = distance & 0xFF;
+    frame[6] = distance >> 8;
+    frame[7] = state.found ? marker_id & 0xFF : 0xFF;
+    frame[8] = crc8(frame + 1, 7);
+    return write_all(frame, sizeof(frame));
+}
+
+void SerialPort::close()
+{
+    if (fd >= 0)
+    {
+        ::close(fd);
+        fd = -1;
+    }
+}
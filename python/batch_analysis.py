@@ -0,0 +1,484 @@
+"""
+Модуль для пакетного анализа записей с поиском маркера на нескольких ядрах
+    Классы:
+        ChunkTask
+    Функции:
+        plan_chunks
+        analyze_chunk
+        analyze
+        save_results
+        load_results
+
+Записи (видео файлы или каталоги изображений) делятся на части по
+chunk_frames кадров, части обрабатываются пулом процессов независимо.
+Каждая часть начинается на valid_frame_count - 1 кадров раньше своей
+границы (перекрытие), поэтому проверка подряд идущих кадров (valid) дает
+тот же результат, что и при последовательной обработке; кадры перекрытия
+в результат не попадают. Для поиска с состоянием между кадрами
+(сопровождение --flow, ROI_TRACKING) перекрытие этого состояния не
+восстанавливает: фаза полного поиска FlowTracker и область поиска в
+начале части могут отличаться от последовательной обработки, поэтому
+результаты на первых кадрах частей могут не совпадать. В процессах пула OpenCV работает в одном потоке
+(cv2.setNumThreads(1)), чтобы процессы не конкурировали за ядра.
+
+Результаты записываются по колонкам: один файл на запись, NPZ
+(numpy.savez) или Parquet (нужен pyarrow). Колонки кадров: frame, time_ms,
+found, valid, id, corners (N, 4, 2), center (N, 2), distance, eps,
+direction, elapsed_ms. Для MultiArucoMarker добавляются колонки всех
+найденных маркеров с префиксом det_ (det_frame, det_id, det_corners,
+det_center, det_distance, det_direction).
+
+Запуск:
+    python batch_analysis.py footage/*.avi --out results [--marker aruco]
+        [--flow] [--processes 4] [--chunk-frames 300] [--format npz]
+"""
+
+import argparse
+import os
+import time
+from multiprocessing import Pool
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+MARKERS = ("aruco", "multi_aruco", "qr")
+FORMATS = ("npz", "parquet")
+NO_ID = -1
+
+FRAME_COLUMNS = {
+    "frame": np.int64,
+    "time_ms": np.float64,
+    "found": np.bool_,
+    "valid": np.bool_,
+    "id": np.int32,
+    "corners": np.float32,
+    "center": np.float32,
+    "distance": np.float32,
+    "eps": np.float32,
+    "direction": "<U1",
+    "elapsed_ms": np.float32,
+}
+DETECTION_COLUMNS = {
+    "det_frame": np.int64,
+    "det_id": np.int32,
+    "det_corners": np.float32,
+    "det_center": np.float32,
+    "det_distance": np.float32,
+    "det_direction": "<U1",
+}
+SHAPES = {"corners": (4, 2), "center": (2,), "det_corners": (4, 2), "det_center": (2,)}
+
+
+class ChunkTask:
+    """
+    Часть записи для обработки в процессе пула.
+
+    Кадры [start, stop) записываются в результат, кадры [read_from, start)
+    обрабатываются только для восстановления состояния маркера.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index: int,
+        start: int,
+        stop: int,
+        read_from: int,
+        marker: str = "aruco",
+        flow: bool = False,
+    ) -> None:
+        self.path = path
+        self.index = index
+        self.start = start
+        self.stop = stop
+        self.read_from = read_from
+        self.marker = marker
+        self.flow = flow
+
+
+def _list_images(path: str) -> list[str]:
+    """Отсортированный список изображений каталога."""
+    return sorted(
+        os.path.join(path, name)
+        for name in os.listdir(path)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def count_frames(path: str) -> int:
+    """Количество кадров записи (видео файла или каталога изображений)."""
+    if os.path.isdir(path):
+        return len(_list_images(path))
+    cap = cv2.VideoCapture(path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+
+def plan_chunks(
+    paths: list[str],
+    chunk_frames: int = config.BATCH_CHUNK_FRAMES,
+    marker: str = "aruco",
+    flow: bool = False,
+    overlap: int = config.VALID_FRAME_COUNT - 1,
+) -> list[ChunkTask]:
+    """
+    Деление записей на части.
+
+    Параметры:
+    ----------
+    paths: list[str]
+        видео файлы или каталоги изображений
+    chunk_frames: int, optional
+        количество кадров в части. По умолчанию config.BATCH_CHUNK_FRAMES.
+    marker: str, optional
+        тип маркера (MARKERS). По умолчанию "aruco".
+    flow: bool, optional
+        сопровождение маркера оптическим потоком (FlowTracker). По умолчанию False.
+    overlap: int, optional
+        количество кадров перекрытия перед частью. По умолчанию config.VALID_FRAME_COUNT - 1.
+
+    Возвращаемое значение:
+    ----------------------
+    list[ChunkTask]:
+        части в порядке записей и кадров
+    """
+    if marker not in MARKERS:
+        raise ValueError(f"Unknown marker: {marker}")
+    if flow and marker == "multi_aruco":
+        raise ValueError("Flow tracking supports single markers only")
+    tasks = []
+    for path in paths:
+        total = count_frames(path)
+        for index, start in enumerate(range(0, total, chunk_frames)):
+            stop = min(start + chunk_frames, total)
+            read_from = max(0, start - overlap)
+            tasks.append(ChunkTask(path, index, start, stop, read_from, marker, flow))
+    return tasks
+
+
+def _make_marker(name: str, flow: bool):
+    """Создание маркера в процессе пула."""
+    from calibration import CameraCalibration
+    from marker import ArucoMarker, MultiArucoMarker, QRMarker
+
+    calibration = CameraCalibration.load() if config.USE_CALIBRATION else None
+    if name == "aruco":
+        marker = ArucoMarker(calibration=calibration)
+    elif name == "multi_aruco":
+        marker = MultiArucoMarker(calibration=calibration)
+    else:
+        marker = QRMarker(calibration=calibration)
+    if flow:
+        from flow_tracker import FlowTracker
+
+        marker = FlowTracker(marker)
+    return marker
+
+
+def _read_frames(path: str, start: int, stop: int):
+    """Кадры записи [start, stop): номер кадра, время (мс), кадр."""
+    if os.path.isdir(path):
+        images = _list_images(path)[start:stop]
+        for index, image in enumerate(images, start):
+            frame = cv2.imread(image)
+            if frame is None:
+                continue
+            yield index, 1000.0 * index / 30.0, frame
+        return
+    cap = cv2.VideoCapture(path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, stop):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield index, 1000.0 * index / fps, frame
+    finally:
+        cap.release()
+
+
+def _init_worker() -> None:
+    """Настройка процесса пула: OpenCV в одном потоке."""
+    cv2.setNumThreads(1)
+
+
+def analyze_chunk(task: ChunkTask) -> tuple[str, int, dict[str, np.ndarray]]:
+    """
+    Обработка части записи.
+
+    Параметры:
+    ----------
+    task: ChunkTask
+        часть записи
+
+    Возвращаемое значение:
+    ----------------------
+    tuple[str, int, dict[str, np.ndarray]]:
+        путь к записи, номер части и колонки результатов
+    """
+    marker = _make_marker(task.marker, task.flow)
+    multi = task.marker == "multi_aruco"
+    frames = {name: [] for name in FRAME_COLUMNS}
+    detections = {name: [] for name in DETECTION_COLUMNS}
+    for index, time_ms, frame in _read_frames(task.path, task.read_from, task.stop):
+        start = time.perf_counter()
+        found = marker.find_contour(frame)
+        direction = marker.get_direction(frame.shape[1])
+        if multi:
+            # заполняет distances/directions всех найденных маркеров
+            marker.get_targets(frame.shape[1])
+        elapsed = time.perf_counter() - start
+        if index < task.start:
+            continue
+        points = marker.points
+        frames["frame"].append(index)
+        frames["time_ms"].append(time_ms)
+        frames["found"].append(bool(found))
+        frames["valid"].append(marker.valid)
+        frames["id"].append(marker.valid_id if points is not None else NO_ID)
+        frames["corners"].append(
+            np.reshape(points, (4, 2))
+            if points is not None
+            else np.full((4, 2), np.nan)
+        )
+        frames["center"].append(
+            marker.center if marker.center is not None else (np.nan, np.nan)
+        )
+        frames["distance"].append(marker.distance)
+        frames["eps"].append(marker.eps)
+        frames["direction"].append(direction)
+        frames["elapsed_ms"].append(1000.0 * elapsed)
+        if multi:
+            # по строке на найденный маркер, в том числе для повторяющихся id
+            for row, id in enumerate(marker.ids.tolist()):
+                detections["det_frame"].append(index)
+                detections["det_id"].append(id)
+                detections["det_corners"].append(marker.corners[row])
+                detections["det_center"].append(marker.centers[row])
+                detections["det_distance"].append(marker.distances[row])
+                detections["det_direction"].append(marker.directions[row])
+    columns = _to_arrays(frames, FRAME_COLUMNS)
+    if multi:
+        columns.update(_to_arrays(detections, DETECTION_COLUMNS))
+    return task.path, task.index, columns
+
+
+def _to_arrays(values: dict[str, list], dtypes: dict) -> dict[str, np.ndarray]:
+    """Списки значений в массивы колонок."""
+    columns = {}
+    for name, dtype in dtypes.items():
+        shape = (len(values[name]),) + SHAPES.get(name, ())
+        if values[name]:
+            columns[name] = np.asarray(values[name], dtype=dtype).reshape(shape)
+        else:
+            columns[name] = np.empty(shape, dtype=dtype)
+    return columns
+
+
+def _concatenate(chunks: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    """Объединение колонок частей одной записи."""
+    return {
+        name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]
+    }
+
+
+def output_path(out_dir: str, path: str, format: str) -> str:
+    """Путь к файлу результатов записи."""
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return os.path.join(out_dir, f"{name}.{format}")
+
+
+def _check_format(format: str) -> None:
+    """Проверка формата результатов и наличия pyarrow для Parquet."""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format: {format}")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as error:
+            raise RuntimeError("Parquet output requires pyarrow") from error
+
+
+def save_results(path: str, columns: dict[str, np.ndarray], format: str) -> None:
+    """
+    Запись колонок результатов в файл.
+
+    Параметры:
+    ----------
+    path: str
+        путь к файлу
+    columns: dict[str, np.ndarray]
+        колонки результатов
+    format: str
+        "npz" или "parquet"
+    """
+    _check_format(format)
+    if format == "npz":
+        np.savez(path, **columns)
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def table(names: list[str]) -> "pa.Table":
+        data = {}
+        for name in names:
+            values = columns[name]
+            if values.ndim > 1:
+                # многомерные колонки (corners, center) - по колонке на элемент
+                flat = values.reshape(len(values), -1)
+                for i in range(flat.shape[1]):
+                    data[f"{name}_{i}"] = pa.array(flat[:, i])
+            elif values.dtype.kind == "U":
+                data[name] = pa.array(values.tolist(), type=pa.string())
+            else:
+                data[name] = pa.array(values)
+        return pa.table(data)
+
+    pq.write_table(table([name for name in columns if name in FRAME_COLUMNS]), path)
+    if "det_frame" in columns:
+        base, extension = os.path.splitext(path)
+        pq.write_table(table(list(DETECTION_COLUMNS)), f"{base}.det{extension}")
+
+
+def load_results(path: str) -> dict[str, np.ndarray]:
+    """
+    Чтение колонок результатов из файла NPZ или Parquet.
+
+    Параметры:
+    ----------
+    path: str
+        путь к файлу
+
+    Возвращаемое значение:
+    ----------------------
+    dict[str, np.ndarray]:
+        колонки результатов (corners - форма (N, 4, 2), center - (N, 2))
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    import pyarrow.parquet as pq
+
+    paths = [path]
+    base, extension = os.path.splitext(path)
+    if os.path.exists(f"{base}.det{extension}"):
+        paths.append(f"{base}.det{extension}")
+    columns = {}
+    for file in paths:
+        table = pq.read_table(file)
+        names = set(table.column_names)
+        for name, dtype in {**FRAME_COLUMNS, **DETECTION_COLUMNS}.items():
+            shape = SHAPES.get(name)
+            if shape is None:
+                if name in names:
+                    columns[name] = table[name].to_numpy().astype(dtype)
+                continue
+            size = int(np.prod(shape))
+            parts = [f"{name}_{i}" for i in range(size)]
+            if all(part in names for part in parts):
+                flat = np.stack([table[part].to_numpy() for part in parts], axis=1)
+                columns[name] = flat.astype(dtype).reshape((len(flat),) + shape)
+    return columns
+
+
+def analyze(
+    paths: list[str],
+    out_dir: str,
+    marker: str = "aruco",
+    flow: bool = False,
+    processes: Optional[int] = config.BATCH_PROCESSES,
+    chunk_frames: int = config.BATCH_CHUNK_FRAMES,
+    format: str = config.BATCH_FORMAT,
+) -> dict:
+    """
+    Пакетный анализ записей.
+
+    Параметры:
+    ----------
+    paths: list[str]
+        видео файлы или каталоги изображений
+    out_dir: str
+        каталог для файлов результатов
+    marker: str, optional
+        тип маркера (MARKERS). По умолчанию "aruco".
+    flow: bool, optional
+        сопровождение маркера оптическим потоком. По умолчанию False.
+    processes: int | None, optional
+        количество процессов, None - по числу ядер. По умолчанию config.BATCH_PROCESSES.
+    chunk_frames: int, optional
+        количество кадров в части. По умолчанию config.BATCH_CHUNK_FRAMES.
+    format: str, optional
+        "npz" или "parquet". По умолчанию config.BATCH_FORMAT.
+
+    Возвращаемое значение:
+    ----------------------
+    dict:
+        frames, seconds, fps, processes, outputs (пути к файлам результатов)
+    """
+    _check_format(format)
+    os.makedirs(out_dir, exist_ok=True)
+    processes = processes or os.cpu_count() or 1
+    tasks = plan_chunks(paths, chunk_frames, marker, flow)
+    counts = {path: 0 for path in paths}
+    for task in tasks:
+        counts[task.path] += 1
+    chunks = {path: {} for path in paths}
+    outputs = []
+    frames = 0
+    start = time.perf_counter()
+    with Pool(processes, initializer=_init_worker) as pool:
+        # части приходят в порядке готовности, запись сохраняется после
+        # получения всех ее частей
+        for path, index, columns in pool.imap_unordered(analyze_chunk, tasks):
+            chunks[path][index] = columns
+            frames += len(columns["frame"])
+            if len(chunks[path]) == counts[path]:
+                ordered = [chunks[path][i] for i in sorted(chunks[path])]
+                output = output_path(out_dir, path, format)
+                save_results(output, _concatenate(ordered), format)
+                outputs.append(output)
+                del chunks[path]
+    seconds = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "processes": processes,
+        "outputs": outputs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пакетный анализ записей")
+    parser.add_argument("paths", nargs="+", help="видео файлы или каталоги изображений")
+    parser.add_argument("--out", default="results", help="каталог результатов")
+    parser.add_argument("--marker", choices=MARKERS, default="aruco")
+    parser.add_argument(
+        "--flow", action="store_true", help="сопровождение оптическим потоком"
+    )
+    parser.add_argument("--processes", type=int, default=config.BATCH_PROCESSES)
+    parser.add_argument("--chunk-frames", type=int, default=config.BATCH_CHUNK_FRAMES)
+    parser.add_argument("--format", choices=FORMATS, default=config.BATCH_FORMAT)
+    args = parser.parse_args()
+    summary = analyze(
+        args.paths,
+        args.out,
+        args.marker,
+        args.flow,
+        args.processes,
+        args.chunk_frames,
+        args.format,
+    )
+    for output in summary["outputs"]:
+        print(output)
+    print(
+        f"{summary['frames']} frames in {summary['seconds']:.1f} s "
+        f"({summary['fps']:.1f} fps, {summary['processes']} processes)"
+    )
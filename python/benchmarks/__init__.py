@@ -0,0 +1 @@
+"""Скрипты для измерения производительности (запуск: python -m benchmarks.<имя>)"""
@@ -0,0 +1,84 @@
+"""
+Масштабирование пакетного анализа (batch_analysis) по количеству процессов.
+
+Записывается синтетическая MJPG запись с движущимся маркером, затем она
+обрабатывается с 1, 2, 4, ... процессами (до числа ядер). Для каждого
+количества процессов выводится скорость (кадров/с) и эффективность
+относительно одного процесса, а также проверяется, что результаты
+совпадают с обработкой одним процессом.
+
+Запуск:
+    python -m benchmarks.batch_scaling [--frames 600] [--chunk-frames 100]
+        [--max-processes 8]
+"""
+
+import argparse
+import os
+import tempfile
+
+import batch_analysis
+import cv2
+import numpy as np
+from synthetic import generate_scene
+
+
+def make_recording(path: str, frames: int) -> None:
+    """Запись синтетического видео с движущимся маркером."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (1280, 720))
+    rng = np.random.default_rng(0)
+    for index in range(frames):
+        frame, _ = generate_scene(
+            1280,
+            720,
+            distance=1500.0,
+            offset=(0.6 * np.sin(index / 20), 0.1),
+            noise=2.0,
+            rng=rng,
+        )
+        writer.write(frame)
+    writer.release()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--chunk-frames", type=int, default=100)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    counts = [1]
+    while counts[-1] * 2 <= args.max_processes:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != args.max_processes:
+        counts.append(args.max_processes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recording.avi")
+        make_recording(path, args.frames)
+        base = reference = None
+        for processes in counts:
+            summary = batch_analysis.analyze(
+                [path],
+                os.path.join(tmp, f"p{processes}"),
+                processes=processes,
+                chunk_frames=args.chunk_frames,
+            )
+            result = batch_analysis.load_results(summary["outputs"][0])
+            if reference is None:
+                base, reference = summary["fps"], result
+            same = np.array_equal(
+                result["corners"], reference["corners"], equal_nan=True
+            ) and all(
+                np.array_equal(result[name], reference[name])
+                for name in ("found", "valid", "direction")
+            )
+            print(
+                f"{processes:3d} processes: {summary['fps']:7.1f} fps, "
+                f"speedup {summary['fps'] / base:4.2f}, "
+                f"efficiency {summary['fps'] / base / processes:5.1%}, "
+                f"same results: {same}"
+            )
+
+
+if __name__ == "__main__":
+    main()
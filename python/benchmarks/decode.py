@@ -0,0 +1,108 @@
+"""
+Декодирование кадров MJPG для поиска маркера: цвет, оттенки серого и
+оттенки серого в 2 и 4 раза меньше (CAPTURE_DECODE).
+
+Синтетическая MJPG запись (движущийся маркер на разных расстояниях)
+воспроизводится FileVideoCapture в каждом режиме decode. Для каждого
+режима выводится процессорное время декодирования и декодирования с
+поиском маркера на кадр, доля найденных маркеров и ошибка центра маркера
+в координатах кадра камеры (после Marker.rescale).
+
+Режим "capture" - декодирование захватом (FFMPEG) без сжатых кадров, как
+до изменений для записей; камера V4L2 декодирует MJPG так же, как режим
+"color" (cv2.imdecode).
+
+Запуск:
+    python -m benchmarks.decode [--resolution 1920x1080] [--frames 120]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from marker import ArucoMarker
+from synthetic import generate_scene
+from video_capture import DECODE_MODES, FileVideoCapture
+
+
+def make_recording(
+    path: str, width: int, height: int, frames: int
+) -> list[list[float]]:
+    """Запись синтетического видео, возвращает центры маркера по кадрам."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    rng = np.random.default_rng(0)
+    centers = []
+    for index in range(frames):
+        frame, truth = generate_scene(
+            width,
+            height,
+            distance=800.0 + 2200.0 * index / frames,
+            offset=(0.6 * np.sin(index / 15), 0.2 * np.cos(index / 25)),
+            angles=(10.0, -15.0, index),
+            noise=2.0,
+            rng=rng,
+        )
+        writer.write(frame)
+        centers.append(truth["center"])
+    writer.release()
+    return centers
+
+
+def run(path: str, mode: str, centers: list[list[float]]) -> dict:
+    """Обработка записи в режиме decode."""
+    if mode == "capture":
+        cap = FileVideoCapture(path)
+    else:
+        cap = FileVideoCapture(path, decode=mode)
+    marker = ArucoMarker()
+    decode = detect = 0.0
+    errors = []
+    index = 0
+    while True:
+        start = time.process_time()
+        frame = cap.read_frame()
+        middle = time.process_time()
+        if frame is None:
+            break
+        marker.find_contour(frame.image)
+        marker.rescale(frame.scale)
+        marker.get_direction(frame.width)
+        detect += time.process_time() - middle
+        decode += middle - start
+        if marker.center is not None:
+            errors.append(np.hypot(*np.subtract(marker.center, centers[index])))
+        index += 1
+    cap.release()
+    return {
+        "decode_ms": 1000.0 * decode / index,
+        "total_ms": 1000.0 * (decode + detect) / index,
+        "found": len(errors) / index,
+        "center_error": float(np.mean(errors)) if errors else np.nan,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--frames", type=int, default=120)
+    args = parser.parse_args()
+    width, height = map(int, args.resolution.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recording.avi")
+        centers = make_recording(path, width, height, args.frames)
+        for mode in ("capture", *DECODE_MODES):
+            result = run(path, mode, centers)
+            print(
+                f"{mode:>8}: decode {result['decode_ms']:6.2f} ms, "
+                f"decode + detect {result['total_ms']:6.2f} ms, "
+                f"found {100 * result['found']:5.1f}%, "
+                f"center error {result['center_error']:.2f} px"
+            )
+
+
+if __name__ == "__main__":
+    main()
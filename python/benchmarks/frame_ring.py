@@ -0,0 +1,106 @@
+"""
+Сравнение захвата кадров с выделением памяти на каждый кадр и захвата в
+кольцо предвыделенных буферов (FrameRing).
+
+Кадры читаются из временного MJPG файла через cv2.VideoCapture, поэтому
+декодирование выполняется так же, как при работе с USB камерой.
+
+Запуск:
+    python -m benchmarks.frame_ring [--frames 300]
+"""
+
+import argparse
+import gc
+import os
+import queue
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from video_capture import FrameRing
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080)}
+
+
+def make_video(path: str, width: int, height: int, frames: int) -> None:
+    """Запись тестового MJPG видео."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        writer.write(np.roll(background, i * 4, axis=1))
+    writer.release()
+
+
+def run_legacy(path: str) -> dict:
+    """Захват как в исходном BufferlessVideoCapture: новый массив + queue.Queue."""
+    cap = cv2.VideoCapture(path)
+    q = queue.Queue()
+    count = 0
+    allocated = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        allocated += frame.nbytes
+        if not q.empty():
+            q.get_nowait()
+        q.put(frame)
+        count += 1
+    cap.release()
+    return {"frames": count, "allocated": allocated}
+
+
+def run_ring(path: str) -> dict:
+    """Захват в кольцо предвыделенных буферов."""
+    cap = cv2.VideoCapture(path)
+    ring = FrameRing()
+    count = 0
+    while (frame := ring.write(cap)) is not None:
+        count += 1
+    cap.release()
+    allocated = sum(buf.nbytes for buf in ring.buffers if buf is not None)
+    return {"frames": count, "allocated": allocated, "allocations": ring.allocations}
+
+
+def measure(func, path: str) -> dict:
+    """Время, объем выделенной памяти и количество сборок мусора."""
+    gc.collect()
+    collections = [stats["collections"] for stats in gc.get_stats()]
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["ms_per_frame"] = 1000.0 * elapsed / max(result["frames"], 1)
+    result["peak_mb"] = peak / 2**20
+    result["gc"] = [
+        stats["collections"] - before
+        for stats, before in zip(gc.get_stats(), collections)
+    ]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (width, height) in RESOLUTIONS.items():
+            path = os.path.join(tmp, f"{name}.avi")
+            make_video(path, width, height, args.frames)
+            for mode, func in (("legacy", run_legacy), ("ring", run_ring)):
+                result = measure(func, path)
+                print(
+                    f"{name:>6} {mode:>6}: {result['ms_per_frame']:.2f} ms/frame, "
+                    f"allocated {result['allocated'] / 2**20:.1f} MB, "
+                    f"peak {result['peak_mb']:.1f} MB, gc {result['gc']}"
+                )
+
+
+if __name__ == "__main__":
+    main()
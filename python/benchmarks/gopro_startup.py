@@ -0,0 +1,139 @@
+"""
+Время запуска GoProVideoCapture и восстановления потока на имитации
+HTTP API камеры (FakeGoPro).
+
+Сравниваются:
+    - команды: отдельный requests.get на каждую команду (новое соединение)
+      и gopro_stream.gopro (одно постоянное соединение);
+    - запуск: последовательные stream_stop/stream_start и открытие захвата
+      (как до изменений) и GoProVideoCapture, где команды выполняются
+      одновременно с открытием захвата. Вместо UDP потока открывается
+      временный MJPG файл, время считается до первого кадра;
+    - восстановление: камера недоступна --outage секунд, измеряется время от
+      восстановления до повторного старта потока keep-alive.
+
+Запуск:
+    python -m benchmarks.gopro_startup [--latency 0.05] [--connect-latency 0.05]
+        [--commands 50] [--outage 1.0] [--interval 0.2]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import config
+import cv2
+import numpy as np
+import requests
+from fake_gopro import FakeGoPro
+from gopro_stream import gopro
+from video_capture import BufferlessVideoCapture, GoProVideoCapture
+
+
+def make_video(path: str, frames: int = 30) -> None:
+    """Запись тестового MJPG видео."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (1280, 720))
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8))
+    writer.release()
+
+
+def bench_commands(latency: float, connect: float, count: int) -> None:
+    with FakeGoPro(latency=latency, connect_latency=connect) as camera:
+        start = time.perf_counter()
+        for _ in range(count):
+            requests.get(camera.url + "/gopro/camera/keep_alive")
+        plain = (time.perf_counter() - start) / count
+        plain_connections = camera.connections
+
+        client = gopro(base_url=camera.url)
+        start = time.perf_counter()
+        for _ in range(count):
+            client.keep_alive()
+        pooled = (time.perf_counter() - start) / count
+        pooled_connections = camera.connections - plain_connections
+        client.close()
+    print(
+        f"commands: requests.get {1000 * plain:.1f} ms "
+        f"({plain_connections} connections), "
+        f"session {1000 * pooled:.1f} ms ({pooled_connections} connections)"
+    )
+
+
+def bench_startup(latency: float, connect: float, video: str) -> None:
+    with FakeGoPro(latency=latency, connect_latency=connect) as camera:
+        # последовательный запуск, как до изменений
+        start = time.perf_counter()
+        requests.get(camera.url + "/gopro/camera/stream/stop")
+        requests.get(camera.url + "/gopro/camera/stream/start")
+        buff = BufferlessVideoCapture(
+            video, config.GOPRO_PREF_API, config.GOPRO_VIDEO_CODEC
+        )
+        buff.start()
+        buff.get_latest(timeout=5.0)
+        sequential = time.perf_counter() - start
+        buff.stop()
+
+        start = time.perf_counter()
+        cap = GoProVideoCapture(base_url=camera.url, source=video)
+        cap.read_frame()
+        parallel = time.perf_counter() - start
+        streaming = camera.streaming
+        cap.release()
+    print(
+        f"startup to first frame: sequential {1000 * sequential:.1f} ms, "
+        f"parallel {1000 * parallel:.1f} ms (stream started: {streaming})"
+    )
+
+
+def bench_reconnect(
+    latency: float, connect: float, outage: float, interval: float
+) -> None:
+    with FakeGoPro(latency=latency, connect_latency=connect) as camera:
+        client = gopro(base_url=camera.url, retries=0)
+        client.stream_start()
+        client.start_keep_alive(interval)
+        time.sleep(2 * interval)
+        camera.available = False
+        time.sleep(outage)
+        starts = len(camera.stream_started)
+        camera.available = True
+        restored = time.monotonic()
+        deadline = restored + 10 * interval + 1.0
+        while len(camera.stream_started) == starts and time.monotonic() < deadline:
+            time.sleep(0.005)
+        client.close()
+        if len(camera.stream_started) == starts:
+            print("reconnect: stream was not restarted")
+            return
+        delay = camera.stream_started[starts] - restored
+    print(
+        f"reconnect: stream restarted {1000 * delay:.0f} ms after camera returned "
+        f"(keep-alive every {1000 * interval:.0f} ms, "
+        f"{client.keep_alive_failures} failed keep-alives, "
+        f"{client.reconnects} reconnects)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.05)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--outage", type=float, default=1.0)
+    parser.add_argument("--interval", type=float, default=0.2)
+    args = parser.parse_args()
+
+    connect = args.connect_latency
+    bench_commands(args.latency, connect, args.commands)
+    with tempfile.TemporaryDirectory() as tmp:
+        video = os.path.join(tmp, "stream.avi")
+        make_video(video)
+        bench_startup(args.latency, connect, video)
+    bench_reconnect(args.latency, connect, args.outage, args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Измерение производительности ArucoMarker, QRMarker и ColorMarker на одной
+и той же записи (видео или каталог изображений) без камеры.
+
+Для каждого маркера выводится fps, задержка кадра (find_contour +
+get_direction) p50/p95/p99 и пиковый объем памяти, выделенной за время
+обработки (tracemalloc).
+
+Запуск:
+    python -m benchmarks.markers footage.avi [--markers aruco qr color]
+        [--frames 500] [--warmup 10] [--json result.json]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from marker import ArucoMarker, ColorMarker, QRMarker
+from video_capture import FileVideoCapture
+
+MARKERS = {"aruco": ArucoMarker, "qr": QRMarker, "color": ColorMarker}
+
+
+def run_marker(name: str, source: str, frames: int, warmup: int) -> dict:
+    """
+    Обработка записи одним маркером.
+
+    Параметры:
+    ----------
+    name: str
+        имя маркера (ключ MARKERS)
+    source: str
+        путь к видео или каталогу изображений
+    frames: int
+        максимальное количество кадров (0 - вся запись)
+    warmup: int
+        количество первых кадров, не учитываемых в статистике
+
+    Возвращаемое значение:
+    ----------------------
+    dict:
+        fps, задержки p50/p95/p99 (мс), пиковая память (МБ), доля кадров
+        с найденным маркером
+    """
+    marker = MARKERS[name]()
+    cam = FileVideoCapture(source)
+    latencies = []
+    found = 0
+    count = 0
+    tracemalloc.start()
+    try:
+        while not frames or count < frames + warmup:
+            ret, frame = cam.read()
+            if not ret:
+                break
+            if count == warmup:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            find_ret = marker.find_contour(frame)
+            marker.get_direction(frame.shape[1])
+            elapsed = time.perf_counter() - start
+            if count >= warmup:
+                latencies.append(elapsed)
+                found += bool(find_ret)
+            count += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        cam.release()
+
+    if not latencies:
+        return {"frames": 0}
+    latencies_ms = 1000.0 * np.asarray(latencies)
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "frames": len(latencies),
+        "fps": len(latencies) / float(np.sum(latencies)),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "peak_mb": peak / 2**20,
+        "found_rate": found / len(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="видео или каталог изображений")
+    parser.add_argument("--markers", nargs="+", choices=MARKERS, default=list(MARKERS))
+    parser.add_argument("--frames", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--json", help="сохранить результаты в JSON файл")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.markers:
+        result = run_marker(name, args.source, args.frames, args.warmup)
+        results[name] = result
+        if not result["frames"]:
+            print(f"{name:>6}: no frames")
+            continue
+        print(
+            f"{name:>6}: {result['fps']:7.1f} fps, "
+            f"p50 {result['p50_ms']:6.2f} ms, p95 {result['p95_ms']:6.2f} ms, "
+            f"p99 {result['p99_ms']:6.2f} ms, peak {result['peak_mb']:6.1f} MB, "
+            f"found {100 * result['found_rate']:5.1f}%"
+        )
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Сравнение цикла поиска маркера на Python и программы cpp/ (ArucoDetector)
+на одной записи.
+
+Обе реализации обрабатывают все кадры записи подряд без дисплея и без
+отправки команд и записывают по строке на кадр (номер кадра, найден,
+подтвержден, направление, отклонение, расстояние, время захвата и поиска).
+Выводится таблица частоты кадров и задержек захвата и поиска
+(среднее/p50/p95), затем совпадение результатов: доля кадров с
+одинаковыми направлением и флагами found/valid, наибольшая разница
+отклонения и расстояния.
+
+Без --video используется синтетическая MJPG запись с движущимся маркером.
+Программа собирается командами
+    cmake -S cpp -B cpp/build && cmake --build cpp/build
+без нее выводятся только результаты Python.
+
+Запуск:
+    python -m benchmarks.native_parity [--video path] [--frames 300]
+        [--binary ../cpp/build/ArucoDetector] [--out dir]
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from marker import ArucoMarker
+from synthetic import generate_scene
+from video_capture import FileVideoCapture
+
+COLUMNS = ("seq", "found", "valid", "direction", "eps", "distance")
+DEFAULT_BINARY = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "../../cpp/build/ArucoDetector")
+)
+
+
+def make_recording(path: str, frames: int) -> None:
+    """Запись синтетического видео с маркером, проходящим через кадр."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (1280, 720))
+    rng = np.random.default_rng(0)
+    for index in range(frames):
+        frame, _ = generate_scene(
+            1280,
+            720,
+            distance=700.0 + 1500.0 * (1 + np.cos(index / 40)) / 2,
+            offset=(0.8 * np.sin(index / 25), 0.1 * np.cos(index / 30)),
+            angles=(10.0, -15.0, index),
+            noise=2.0,
+            rng=rng,
+        )
+        # маркер пропадает на части кадров
+        if index % 50 >= 45:
+            frame[:] = frame.mean(axis=(0, 1)).astype(np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+def run_python(video: str, report: str) -> float:
+    """Цикл поиска маркера на Python, возвращает частоту кадров."""
+    cap = FileVideoCapture(video)
+    # поиск по всему кадру, как detectMarkers в программе cpp/
+    marker = ArucoMarker(roi_tracking=False, pyramid=False)
+    frames = 0
+    with open(report, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS + ("capture_ms", "detect_ms"))
+        start = time.perf_counter()
+        while True:
+            capture_start = time.perf_counter()
+            frame = cap.read_frame()
+            if frame is None:
+                break
+            detect_start = time.perf_counter()
+            marker.find_contour(frame.image)
+            direction = marker.get_direction(frame.width)
+            end = time.perf_counter()
+            writer.writerow(
+                (
+                    frame.seq,
+                    int(marker.center is not None),
+                    int(marker.valid),
+                    direction,
+                    marker.eps,
+                    marker.distance,
+                    1000.0 * (detect_start - capture_start),
+                    1000.0 * (end - detect_start),
+                )
+            )
+            frames += 1
+        elapsed = time.perf_counter() - start
+    cap.release()
+    return frames / elapsed
+
+
+def run_native(binary: str, video: str, report: str) -> float:
+    """Программа cpp/ на записи, возвращает частоту кадров из итоговой строки."""
+    output = subprocess.run(
+        [binary, "--source", video, "--headless", "--no-serial", "--report", report],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    for line in output.splitlines():
+        if line.startswith("summary:"):
+            return float(line.split("fps ")[1].split(",")[0])
+    raise RuntimeError("ArucoDetector did not print a summary line")
+
+
+def load(report: str) -> dict[str, np.ndarray]:
+    """Столбцы отчета о кадрах."""
+    with open(report, newline="") as file:
+        rows = list(csv.DictReader(file))
+    columns = {}
+    for name in rows[0] if rows else ():
+        values = [row[name] for row in rows]
+        columns[name] = (
+            np.array(values) if name == "direction" else np.array(values, dtype=float)
+        )
+    return columns
+
+
+def describe(name: str, fps: float, report: dict[str, np.ndarray]) -> str:
+    """Строка таблицы задержек."""
+    capture, detect = report["capture_ms"], report["detect_ms"]
+    return (
+        f"{name:>7}: {len(detect):5d} frames, {fps:6.1f} fps, "
+        f"capture {capture.mean():5.2f} ms, "
+        f"detect mean/p50/p95 {detect.mean():5.2f}/"
+        f"{np.percentile(detect, 50):5.2f}/{np.percentile(detect, 95):5.2f} ms"
+    )
+
+
+def compare(python: dict[str, np.ndarray], native: dict[str, np.ndarray]) -> str:
+    """Совпадение результатов по кадрам."""
+    count = min(len(python["seq"]), len(native["seq"]))
+    same = {
+        name: float(np.mean(python[name][:count] == native[name][:count]))
+        for name in ("direction", "found", "valid")
+    }
+    both = (python["found"][:count] == 1) & (native["found"][:count] == 1)
+    eps = np.abs(python["eps"][:count] - native["eps"][:count])[both]
+    distance = np.abs(python["distance"][:count] - native["distance"][:count])[both]
+    return (
+        f" parity: {count} frames, direction {100 * same['direction']:5.1f}%, "
+        f"found {100 * same['found']:5.1f}%, valid {100 * same['valid']:5.1f}%, "
+        f"max eps diff {eps.max() if eps.size else 0.0:.4f}, "
+        f"max distance diff {distance.max() if distance.size else 0.0:.1f} mm"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--binary", default=DEFAULT_BINARY)
+    parser.add_argument("--out", default=None, help="каталог для отчетов о кадрах")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = args.out or tmp
+        os.makedirs(out, exist_ok=True)
+        video = args.video
+        if video is None:
+            video = os.path.join(tmp, "recording.avi")
+            make_recording(video, args.frames)
+
+        python_report = os.path.join(out, "python.csv")
+        python_fps = run_python(video, python_report)
+        python = load(python_report)
+        print(describe("python", python_fps, python))
+
+        if not os.path.exists(args.binary):
+            print(
+                f"{args.binary} not found, build it with: cmake -S cpp -B cpp/build "
+                "&& cmake --build cpp/build"
+            )
+            return
+        native_report = os.path.join(out, "native.csv")
+        native_fps = run_native(args.binary, video, native_report)
+        native = load(native_report)
+        print(describe("native", native_fps, native))
+        print(compare(python, native))
+
+
+if __name__ == "__main__":
+    main()
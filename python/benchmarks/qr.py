@@ -0,0 +1,126 @@
+"""
+Поиск QR кодов: detectAndDecode на каждом кадре (как QRMarker до
+изменений) и QRCodeEngine (нахождение кодов на каждом кадре,
+декодирование только новых и сместившихся кодов).
+
+Генерируются последовательности кадров с 1 и 3 движущимися QR кодами
+(перспективные искажения, шум). Для каждого варианта выводится время на
+кадр, количество декодирований на кадр и доля кодов, найденных с
+правильными данными.
+
+Запуск:
+    python -m benchmarks.qr [--frames 60] [--resolution 1280x720]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from qr_engine import QRCodeEngine
+
+
+def make_code(payload: str, size: int) -> np.ndarray:
+    """Изображение QR кода с полем вокруг."""
+    code = cv2.QRCodeEncoder.create().encode(payload)
+    code = cv2.copyMakeBorder(code, 4, 4, 4, 4, cv2.BORDER_CONSTANT, value=255)
+    return cv2.resize(code, (size, size), interpolation=cv2.INTER_NEAREST)
+
+
+def make_sequence(
+    payloads: list[str], width: int, height: int, frames: int, seed: int = 0
+) -> list[np.ndarray]:
+    """Кадры с движущимися QR кодами."""
+    rng = np.random.default_rng(seed)
+    size = min(width // (len(payloads) + 1), height // 2)
+    codes = [make_code(payload, size) for payload in payloads]
+    source = np.float32([[0, 0], [size, 0], [size, size], [0, size]])
+    sequence = []
+    for index in range(frames):
+        frame = np.full((height, width), 180, dtype=np.uint8)
+        for number, code in enumerate(codes):
+            cx = width * (number + 1) / (len(codes) + 1)
+            cx += 0.05 * width * np.sin(index / 10 + number)
+            cy = height / 2 + 0.1 * height * np.cos(index / 15 + number)
+            half = 0.5 * size * (0.8 + 0.2 * np.sin(index / 20))
+            skew = 0.15 * half * np.sin(index / 12 + number)
+            target = np.float32(
+                [
+                    [cx - half, cy - half + skew],
+                    [cx + half, cy - half - skew],
+                    [cx + half, cy + half + skew],
+                    [cx - half, cy + half - skew],
+                ]
+            )
+            warp = cv2.getPerspectiveTransform(source, target)
+            mask = cv2.warpPerspective(np.full_like(code, 255), warp, (width, height))
+            warped = cv2.warpPerspective(code, warp, (width, height))
+            frame[mask > 0] = warped[mask > 0]
+        noise = rng.normal(0, 3, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        sequence.append(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    return sequence
+
+
+def bench_per_frame(frames: list[np.ndarray], multi: bool) -> tuple[float, list]:
+    """detectAndDecode (detectAndDecodeMulti) на каждом кадре."""
+    detector = cv2.QRCodeDetector()
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        if multi:
+            found, payloads, _, _ = detector.detectAndDecodeMulti(frame)
+            results.append([p for p in payloads if p] if found else [])
+        else:
+            payload, _, _ = detector.detectAndDecode(frame)
+            results.append([payload] if payload else [])
+    return (time.perf_counter() - start) / len(frames), results
+
+
+def bench_engine(
+    frames: list[np.ndarray], multi: bool
+) -> tuple[float, list, QRCodeEngine]:
+    """QRCodeEngine на каждом кадре."""
+    engine = QRCodeEngine(multi=multi)
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        results.append([payload for payload, _ in engine.find(frame)])
+    return (time.perf_counter() - start) / len(frames), results, engine
+
+
+def recall(results: list, payloads: list[str]) -> float:
+    """Доля кодов, найденных с правильными данными."""
+    found = sum(len(set(result) & set(payloads)) for result in results)
+    return found / (len(results) * len(payloads))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--resolution", default="1280x720")
+    args = parser.parse_args()
+    width, height = map(int, args.resolution.split("x"))
+
+    for payloads in (["1"], ["1", "rover-42", "dock"]):
+        multi = len(payloads) > 1
+        frames = make_sequence(payloads, width, height, args.frames)
+        per_frame, results = bench_per_frame(frames, multi)
+        print(
+            f"{len(payloads)} code(s), detectAndDecode{'Multi' if multi else ''}: "
+            f"{1000 * per_frame:6.1f} ms/frame, "
+            f"{len(payloads):.2f} decodes/frame, "
+            f"recall {100 * recall(results, payloads):5.1f}%"
+        )
+        for engine_multi in sorted({multi, True}):
+            elapsed, results, engine = bench_engine(frames, engine_multi)
+            print(
+                f"{len(payloads)} code(s), QRCodeEngine(multi={engine_multi}): "
+                f"{1000 * elapsed:6.1f} ms/frame, "
+                f"{engine.decodes / engine.frames:.2f} decodes/frame, "
+                f"recall {100 * recall(results, payloads):5.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
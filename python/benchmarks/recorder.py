@@ -0,0 +1,120 @@
+"""
+Стоимость записи кадров при поиске маркера.
+
+Синтетическая MJPG запись воспроизводится FileVideoCapture с максимальной
+скоростью, на каждом кадре выполняется поиск маркера. Кадры всегда
+читаются сжатыми и декодируются cv2.imdecode, как это делает захват V4L2
+для MJPG камеры, поэтому варианты отличаются только записью:
+    - без записи;
+    - FlightRecorder, сжатые кадры записи (passthrough);
+    - FlightRecorder, кадры кодируются в JPEG в потоке записи;
+    - cv2.VideoWriter (MJPG) в основном цикле.
+Для каждого варианта выводится процессорное время на кадр (все потоки),
+затем проверяется переход к кадрам записи по индексу.
+
+Запуск:
+    python -m benchmarks.recorder [--frames 300]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from marker import ArucoMarker
+from recorder import FlightRecorder, RecordingReader
+from synthetic import generate_scene
+from video_capture import FileVideoCapture, Frame
+
+
+def make_recording(path: str, frames: int) -> None:
+    """Запись синтетического видео с движущимся маркером."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (1280, 720))
+    rng = np.random.default_rng(0)
+    for index in range(frames):
+        frame, _ = generate_scene(
+            1280,
+            720,
+            distance=1500.0,
+            offset=(0.6 * np.sin(index / 20), 0.1),
+            noise=2.0,
+            rng=rng,
+        )
+        writer.write(frame)
+    writer.release()
+
+
+def run(source: str, mode: str, out: str) -> tuple[float, int]:
+    """Обработка записи, возвращает процессорное время на кадр (мс) и кадры."""
+    cap = FileVideoCapture(source, passthrough=True)
+    marker = ArucoMarker()
+    recorder = writer = None
+    if mode in ("passthrough", "encode"):
+        recorder = FlightRecorder(out)
+        recorder.start()
+    elif mode == "videowriter":
+        writer = cv2.VideoWriter(
+            out + ".avi", cv2.VideoWriter_fourcc(*"MJPG"), 30, (1280, 720)
+        )
+    frames = 0
+    start = time.process_time()
+    while True:
+        frame = cap.read_frame()
+        if frame is None:
+            break
+        marker.find_contour(frame.image)
+        marker.get_direction(frame.image.shape[1])
+        if mode == "encode":
+            frame = Frame(frame.image, frame.seq, frame.timestamp)
+        if recorder is not None:
+            recorder.record(frame, marker)
+        if writer is not None:
+            writer.write(frame.image)
+        frames += 1
+    if recorder is not None:
+        recorder.stop()
+    if writer is not None:
+        writer.release()
+    elapsed = time.process_time() - start
+    cap.release()
+    return 1000.0 * elapsed / frames, frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.avi")
+        make_recording(source, args.frames)
+        base = None
+        for mode in ("none", "passthrough", "encode", "videowriter"):
+            out = os.path.join(tmp, mode)
+            cpu, frames = run(source, mode, out)
+            base = base or cpu
+            print(
+                f"{mode:>12}: {cpu:6.2f} ms CPU/frame "
+                f"({100 * (cpu / base - 1):+6.1f}%), {frames} frames"
+            )
+
+        reader = RecordingReader(os.path.join(tmp, "passthrough"))
+        order = np.random.default_rng(0).permutation(len(reader))[:50]
+        start = time.perf_counter()
+        for i in order:
+            reader.seek(int(i))
+            ret, image = reader.read()
+            assert ret and image.shape == (720, 1280, 3)
+        seek = 1000.0 * (time.perf_counter() - start) / len(order)
+        found = int(reader.index["found"].sum())
+        print(
+            f"replay: {len(reader)} frames, {found} with marker, "
+            f"random seek + decode {seek:.2f} ms"
+        )
+        reader.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Сравнение синхронной и фоновой (SerialWriter) отправки команд на
+имитацию Arduino (FakeArduino).
+
+Команды генерируются с частотой кадров: направление меняется с
+вероятностью --change на каждом кадре, в остальное время повторяется.
+Выводится время вызова send_command (сколько ждет цикл обработки кадров),
+количество записанных и полученных команд и задержка от смены команды до
+ее приема платой, а также доля времени, когда плата выполняет устаревшую
+команду. При скорости генерации выше скорости линии синхронная
+отправка накапливает очередь в буфере порта, фоновая - отправляет только
+последнюю команду.
+
+Запуск:
+    python -m benchmarks.serial_writer [--rate 30 300] [--seconds 3]
+        [--baud 9600] [--change 0.1]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from data_sender import Sender
+from fake_arduino import FakeArduino
+
+COMMANDS = ["L", "R", "F", "S"]
+
+
+def run(
+    async_write: bool, rate: float, seconds: float, baud: int, change: float
+) -> dict:
+    """
+    Отправка команд с частотой rate в течение seconds секунд.
+
+    Параметры:
+    ----------
+    async_write: bool
+        фоновая отправка
+    rate: float
+        частота команд (Гц)
+    seconds: float
+        длительность (с)
+    baud: int
+        скорость линии
+    change: float
+        вероятность смены команды на каждом кадре
+
+    Возвращаемое значение:
+    ----------------------
+    dict:
+        call_p50_ms, call_p99_ms, call_max_ms, submitted, received,
+        lag_p50_ms, lag_p95_ms, lost (смены команды, не дошедшие до платы
+        до следующей смены), stale (доля времени, когда у платы не текущая
+        команда)
+    """
+    rng = np.random.default_rng(0)
+    with FakeArduino(baud) as arduino:
+        sender = Sender(bd_rate=baud, usb_port=arduino.port, async_write=async_write)
+        sender.open_connect()
+        command = COMMANDS[0]
+        changes = []
+        calls = []
+        period = 1.0 / rate
+        start = time.monotonic()
+        next_time = start
+        while next_time - start < seconds:
+            if not changes or rng.random() < change:
+                command = COMMANDS[(COMMANDS.index(command) + 1) % len(COMMANDS)]
+                changes.append((time.monotonic(), command))
+            t0 = time.perf_counter()
+            sender.send_command(command + "\n")
+            calls.append(time.perf_counter() - t0)
+            next_time += period
+            time.sleep(max(0.0, next_time - time.monotonic()))
+        # время на доставку оставшихся в буфере команд
+        idle = 64 * 10.0 / baud + 0.2
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline:
+            received = arduino.received
+            time.sleep(idle)
+            if arduino.received == received:
+                break
+        end = time.monotonic()
+        sender.close()
+        lines = arduino.lines()
+
+    # команда генератора и последняя принятая платой команда с шагом 1 мс
+    samples = np.arange(changes[0][0], end, 0.001)
+    change_times = np.array([changed for changed, _ in changes])
+    wanted = np.array([command for _, command in changes])[
+        np.searchsorted(change_times, samples, side="right") - 1
+    ]
+    line_times = np.array([received for received, _ in lines] + [np.inf])
+    line_commands = np.array([line.decode() for _, line in lines] + [""])
+    index = np.searchsorted(line_times, samples, side="right") - 1
+    actual = np.where(index >= 0, line_commands[index], "")
+    stale = actual != wanted
+
+    lags = []
+    lost = 0
+    bounds = np.searchsorted(samples, list(change_times) + [end])
+    for start_index, stop_index in zip(bounds, bounds[1:]):
+        matched = np.flatnonzero(~stale[start_index:stop_index])
+        if len(matched):
+            lags.append(0.001 * matched[0])
+        else:
+            lost += 1
+    calls_ms = 1000.0 * np.array(calls)
+    lags_ms = 1000.0 * np.array(lags) if lags else np.array([np.nan])
+    return {
+        "call_p50_ms": float(np.percentile(calls_ms, 50)),
+        "call_p99_ms": float(np.percentile(calls_ms, 99)),
+        "call_max_ms": float(calls_ms.max()),
+        "submitted": len(calls),
+        "received": len(lines),
+        "lag_p50_ms": float(np.percentile(lags_ms, 50)),
+        "lag_p95_ms": float(np.percentile(lags_ms, 95)),
+        "lost": lost,
+        "stale": float(stale.mean()),
+        "changes": len(changes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", nargs="+", type=float, default=[30.0, 300.0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--change", type=float, default=0.1)
+    args = parser.parse_args()
+
+    for rate in args.rate:
+        for name, async_write in (("sync", False), ("async", True)):
+            result = run(async_write, rate, args.seconds, args.baud, args.change)
+            print(
+                f"{rate:6.0f} Hz {name:>5}: "
+                f"send_command p50 {result['call_p50_ms']:6.3f} ms, "
+                f"p99 {result['call_p99_ms']:6.3f} ms, "
+                f"max {result['call_max_ms']:6.1f} ms; "
+                f"{result['submitted']} submitted, {result['received']} received; "
+                f"change lag p50 {result['lag_p50_ms']:7.1f} ms, "
+                f"p95 {result['lag_p95_ms']:7.1f} ms, "
+                f"{result['lost']}/{result['changes']} changes lost, "
+                f"stale {100 * result['stale']:4.1f}% of time"
+            )
+
+
+if __name__ == "__main__":
+    main()
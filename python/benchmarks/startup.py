@@ -0,0 +1,140 @@
+"""
+Время запуска системы до первой правильной команды.
+
+Сравниваются:
+    - импорт tracking: с импортом gopro_stream и requests (как до
+      изменений) и без него, в отдельном процессе;
+    - запуск: последовательные открытие порта, создание детектора и
+      открытие камеры без прогрева (как до изменений) и Tracking.start(),
+      где порт, камера и прогрев детектора выполняются параллельно.
+Вместо Arduino используется FakeArduino, вместо камеры - синтетическая
+MJPG запись с маркером, воспроизводимая с частотой записи. Время
+считается до первого кадра и до первой правильной команды (маркер
+подтвержден VALID_FRAME_COUNT кадрами).
+
+Запуск:
+    python -m benchmarks.startup [--runs 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+import cv2
+import numpy as np
+from data_sender import Sender
+from fake_arduino import FakeArduino
+from marker import ArucoMarker
+from synthetic import generate_scene
+from tracking import Tracking
+from video_capture import FileVideoCapture
+
+IMPORT_CODE = """
+import sys, time
+start = time.perf_counter()
+{imports}
+print(time.perf_counter() - start, "requests" in sys.modules)
+"""
+
+
+def make_recording(path: str, frames: int = 60) -> None:
+    """Запись синтетического видео с маркером."""
+    writer = cv2.VideoWriter(
+        path,
+        cv2.VideoWriter_fourcc(*"MJPG"),
+        30,
+        (config.FRAME_WIDTH, config.FRAME_HEIGHT),
+    )
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        frame, _ = generate_scene(
+            config.FRAME_WIDTH, config.FRAME_HEIGHT, distance=1500.0, rng=rng
+        )
+        writer.write(frame)
+    writer.release()
+
+
+def bench_import(imports: str, runs: int) -> tuple[float, bool]:
+    """Время импорта в новом процессе (лучшее из runs)."""
+    best, loaded = np.inf, False
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE.format(imports=imports)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.split()
+        best = min(best, float(output[0]))
+        loaded = output[1] == "True"
+    return best, loaded
+
+
+def run_sequential(port: str, path: str) -> dict:
+    """Последовательный запуск без прогрева детектора."""
+    start = time.monotonic()
+    sender = Sender(usb_port=port)
+    sender.open_connect()
+    marker = ArucoMarker()
+    cam = FileVideoCapture(path, realtime=True, loop=True)
+    result = {"ready": time.monotonic() - start}
+    while not marker.valid:
+        frame = cam.read_frame()
+        marker.find_contour(frame.image)
+        marker.get_direction(frame.width)
+        result.setdefault("first_frame", time.monotonic() - start)
+    result["first_valid_command"] = time.monotonic() - start
+    cam.release()
+    sender.close()
+    return result
+
+
+def run_parallel(port: str, path: str) -> dict:
+    """Tracking.start(): порт, камера и прогрев детектора параллельно."""
+    config.CAMERA_FILE = path
+    tracker = Tracking(headless=True, camera="file")
+    tracker.sender.usb_port = port
+    # время этапов отсчитывается от создания Tracking, как в run_sequential
+    tracker.startup.start = time.monotonic()
+    cam = tracker.start()
+    while not tracker.marker.valid:
+        frame = cam.read_frame()
+        tracker.marker.find_contour(frame.image)
+        tracker.marker.rescale(frame.scale)
+        tracker.marker.get_direction(frame.width)
+        tracker._first_valid(tracker.marker.valid)
+    cam.release()
+    tracker.sender.close()
+    return tracker.startup.marks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, imports in (
+        ("with gopro_stream", "import gopro_stream, tracking"),
+        ("tracking only", "import tracking"),
+    ):
+        seconds, loaded = bench_import(imports, args.runs)
+        print(f"import {name:>17}: {1000 * seconds:6.1f} ms, requests loaded {loaded}")
+
+    with tempfile.TemporaryDirectory() as tmp, FakeArduino() as arduino:
+        path = os.path.join(tmp, "recording.avi")
+        make_recording(path)
+        for name, run in (("sequential", run_sequential), ("parallel", run_parallel)):
+            results = [run(arduino.port, path) for _ in range(args.runs)]
+            line = ", ".join(
+                f"{key} {1000 * np.median([r[key] for r in results]):6.1f} ms"
+                for key in ("ready", "first_frame", "first_valid_command")
+            )
+            print(f"{name:>10}: {line}")
+
+
+if __name__ == "__main__":
+    main()
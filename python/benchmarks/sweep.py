@@ -0,0 +1,230 @@
+"""
+Оценка скорости и точности поиска Aruco маркера на синтетических кадрах.
+
+Для каждого сочетания разрешения, размера маркера (MARKER_TRUE_SIZE) и
+настроек детектора выводится доля кадров с найденным маркером, ошибка
+расстояния (средняя и p95, %), ошибка центра (пиксели) и время обработки
+кадра. Кадры генерируются последовательностями (маркер плавно смещается),
+чтобы режимы, использующие предыдущий кадр (roi, pyramid, flow), работали как
+при реальном движении.
+
+Запуск:
+    python -m benchmarks.sweep [--resolutions 1280x720 1920x1080]
+        [--sizes 100 150] [--settings default pyramid roi subpix flow]
+        [--distances 500 1000 2000 4000] [--frames 20]
+    python -m benchmarks.sweep --dataset out_dir [--settings ...]
+
+Для набора кадров synthetic.py (--dataset) разрешение берется из кадров
+набора, а размер маркера - config.MARKER_TRUE_SIZE, с которым набор
+сгенерирован (generate_dataset не меняет размер маркера); --resolutions и
+--sizes в этом режиме не используются.
+"""
+
+import argparse
+import time
+
+import config
+import cv2
+import numpy as np
+from flow_tracker import FlowTracker
+from marker import ArucoMarker, Marker
+from synthetic import generate_scene, load_dataset
+
+SETTINGS = {
+    "default": {},
+    "pyramid": {"pyramid": True},
+    "roi": {"roi_tracking": True},
+    "subpix": {
+        "parameters": {"cornerRefinementMethod": cv2.aruco.CORNER_REFINE_SUBPIX}
+    },
+    "flow": {"flow": True},
+}
+
+
+def make_marker(setting: str, marker_true_size: float) -> Marker:
+    """
+    Создание маркера с настройками детектора из SETTINGS.
+
+    Параметры:
+    ----------
+    setting: str
+        имя настроек (ключ SETTINGS)
+    marker_true_size: float
+        реальный размер маркера (мм)
+
+    Возвращаемое значение:
+    ----------------------
+    Marker:
+        маркер (ArucoMarker или FlowTracker)
+    """
+    kwargs = dict(SETTINGS[setting])
+    parameters = kwargs.pop("parameters", {})
+    flow = kwargs.pop("flow", False)
+    marker = ArucoMarker(marker_true_size=marker_true_size, **kwargs)
+    if parameters:
+        detector_parameters = marker.detector.getDetectorParameters()
+        for name, value in parameters.items():
+            setattr(detector_parameters, name, value)
+        marker.detector.setDetectorParameters(detector_parameters)
+    return FlowTracker(marker) if flow else marker
+
+
+def generate_sequences(
+    width: int,
+    height: int,
+    marker_true_size: float,
+    distances: list[float],
+    frames: int,
+    seed: int,
+) -> list[tuple[np.ndarray, dict]]:
+    """
+    Генерация последовательностей кадров для каждого расстояния.
+
+    Параметры:
+    ----------
+    width: int
+        ширина кадра
+    height: int
+        высота кадра
+    marker_true_size: float
+        реальный размер маркера (мм)
+    distances: list[float]
+        расстояния (мм)
+    frames: int
+        количество кадров в последовательности
+    seed: int
+        начальное значение генератора случайных чисел
+
+    Возвращаемое значение:
+    ----------------------
+    list[tuple[np.ndarray, dict]]:
+        кадры и эталонные значения
+    """
+    rng = np.random.default_rng(seed)
+    scenes = []
+    for distance in distances:
+        start = rng.uniform(-0.5, 0.5, 2)
+        end = rng.uniform(-0.5, 0.5, 2)
+        angles = (rng.uniform(-30, 30), rng.uniform(-30, 30), rng.uniform(-180, 180))
+        for t in np.linspace(0.0, 1.0, frames):
+            offset = tuple(start + (end - start) * t)
+            scenes.append(
+                generate_scene(
+                    width,
+                    height,
+                    distance=distance,
+                    offset=offset,
+                    angles=angles,
+                    blur=rng.uniform(0, 1.0),
+                    noise=rng.uniform(0, 5.0),
+                    brightness=rng.uniform(0.7, 1.2),
+                    gradient=rng.uniform(0, 0.4),
+                    marker_true_size=marker_true_size,
+                    rng=rng,
+                )
+            )
+    return scenes
+
+
+def evaluate(marker: Marker, scenes: list[tuple[np.ndarray, dict]]) -> dict:
+    """
+    Обработка кадров маркером и сравнение с эталонными значениями.
+
+    Параметры:
+    ----------
+    marker: Marker
+        маркер
+    scenes: list[tuple[np.ndarray, dict]]
+        кадры и эталонные значения
+
+    Возвращаемое значение:
+    ----------------------
+    dict:
+        detection_rate, distance_error_mean/p95 (%), center_error (пиксели),
+        ms_per_frame
+    """
+    found = 0
+    distance_errors = []
+    center_errors = []
+    elapsed = 0.0
+    for frame, truth in scenes:
+        start = time.perf_counter()
+        find_ret = marker.find_contour(frame)
+        marker.get_direction(frame.shape[1])
+        elapsed += time.perf_counter() - start
+        if not find_ret:
+            continue
+        found += 1
+        distance_errors.append(
+            100.0 * abs(marker.distance - truth["distance"]) / truth["distance"]
+        )
+        center_errors.append(
+            np.hypot(
+                marker.center[0] - truth["center"][0],
+                marker.center[1] - truth["center"][1],
+            )
+        )
+    return {
+        "detection_rate": found / len(scenes),
+        "distance_error_mean": float(np.mean(distance_errors)) if found else np.nan,
+        "distance_error_p95": (
+            float(np.percentile(distance_errors, 95)) if found else np.nan
+        ),
+        "center_error": float(np.mean(center_errors)) if found else np.nan,
+        "ms_per_frame": 1000.0 * elapsed / len(scenes),
+    }
+
+
+def print_row(resolution: str, size: float, setting: str, result: dict) -> None:
+    print(
+        f"{resolution:>10} {size:6.0f} {setting:>8}: "
+        f"detected {100 * result['detection_rate']:5.1f}%, "
+        f"distance error {result['distance_error_mean']:5.2f}% "
+        f"(p95 {result['distance_error_p95']:5.2f}%), "
+        f"center error {result['center_error']:5.2f} px, "
+        f"{result['ms_per_frame']:6.2f} ms/frame"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--resolutions", nargs="+", default=["1280x720", "1920x1080"])
+    parser.add_argument("--sizes", nargs="+", type=float, default=None)
+    parser.add_argument(
+        "--settings", nargs="+", choices=SETTINGS, default=list(SETTINGS)
+    )
+    parser.add_argument(
+        "--distances", nargs="+", type=float, default=[500, 1000, 2000, 4000]
+    )
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dataset", help="каталог набора кадров synthetic.py")
+    args = parser.parse_args()
+
+    if args.dataset:
+        if args.sizes is not None:
+            print("--sizes is ignored with --dataset")
+        samples = load_dataset(args.dataset)
+        scenes = [(cv2.imread(sample["path"]), sample) for sample in samples]
+        resolutions = sorted(
+            {f"{frame.shape[1]}x{frame.shape[0]}" for frame, _ in scenes}
+        )
+        size = config.MARKER_TRUE_SIZE
+        for setting in args.settings:
+            result = evaluate(make_marker(setting, size), scenes)
+            print_row("/".join(resolutions), size, setting, result)
+        return
+
+    for resolution in args.resolutions:
+        width, height = (int(value) for value in resolution.split("x"))
+        for size in args.sizes or [150.0]:
+            scenes = generate_sequences(
+                width, height, size, args.distances, args.frames, args.seed
+            )
+            for setting in args.settings:
+                result = evaluate(make_marker(setting, size), scenes)
+                print_row(resolution, size, setting, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Нагрузочный тест рассылки результатов поиска маркера (telemetry.py).
+
+Издатель публикует результаты поиска маркера с частотой кадров камеры,
+каждый подписчик работает в отдельном процессе. Для UDP и Unix сокета и
+разного числа подписчиков выводятся процессорное время publish на кадр
+(и 99-й процентиль полного времени, на одном ядре в него входит
+переключение на процессы подписчиков), доля
+доставленных сообщений и задержка от отправки до получения (p50/p95).
+
+В варианте "stalled" половина подписчиков не читает сообщения: время
+publish не должно расти, а подписчики без продления аренды удаляются
+через TELEMETRY_LEASE.
+
+Запуск:
+    python -m benchmarks.telemetry [--fps 30] [--seconds 5]
+        [--subscribers 1 16 64]
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+from marker import MultiArucoMarker
+from synthetic import generate_scene
+from telemetry import RETRY_INTERVAL, TelemetryPublisher, TelemetrySubscriber
+
+ADDRESSES = {
+    "udp": "udp://127.0.0.1:9111",
+    "unix": "unix:///tmp/nrtk_telemetry_bench.sock",
+}
+
+
+def subscriber(address: str, stalled: bool, results: mp.Queue) -> None:
+    """Процесс подписчика: получение сообщений до паузы издателя."""
+    with TelemetrySubscriber(address) as client:
+        if stalled:
+            # подписка (с повтором, если очередь издателя заполнена), затем
+            # подписчик перестает читать сообщения и продлевать аренду
+            for _ in range(20):
+                client.receive(timeout=0.0)
+                time.sleep(RETRY_INTERVAL)
+            time.sleep(60.0)
+            return
+        delays = []
+        while True:
+            # первое сообщение ждем дольше: издатель ждет всех подписчиков
+            message = client.receive(timeout=10.0 if not delays else 1.0)
+            if message is None:
+                break
+            delays.append(time.monotonic() - message.sent)
+        results.put((client.received, client.missed, delays))
+
+
+def run(address: str, count: int, stalled: bool, fps: float, seconds: float) -> dict:
+    """Публикация seconds секунд с count подписчиками."""
+    frame, _ = generate_scene(distance=1500.0)
+    marker = MultiArucoMarker()
+    for _ in range(marker.valid_frame_count):
+        marker.find_contour(frame)
+        marker.get_direction(frame.shape[1])
+
+    publisher = TelemetryPublisher(address, max_subscribers=count)
+    results = mp.Queue()
+    processes = [
+        mp.Process(
+            target=subscriber,
+            args=(address, stalled and i % 2 == 1, results),
+            daemon=True,
+        )
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    deadline = time.monotonic() + 30.0
+    while len(publisher.subscribers) < count and time.monotonic() < deadline:
+        publisher.poll()
+        time.sleep(0.01)
+
+    frames = int(fps * seconds)
+    publish = []
+    start = time.monotonic()
+    for seq in range(frames):
+        # пропуск до времени кадра, как при захвате камеры
+        time.sleep(max(0.0, start + seq / fps - time.monotonic()))
+        begin = time.perf_counter(), time.thread_time()
+        publisher.publish(marker, seq, time.monotonic())
+        publish.append((time.perf_counter() - begin[0], time.thread_time() - begin[1]))
+    remaining = len(publisher.subscribers)
+
+    readers = count - count // 2 if stalled else count
+    received = missed = 0
+    delays = []
+    for _ in range(readers):
+        got, lost, delay = results.get(timeout=30.0)
+        received += got
+        missed += lost
+        delays.extend(delay)
+    for process in processes:
+        process.terminate()
+        process.join()
+    publisher.close()
+    return {
+        "publish_cpu_us": 1e6 * float(np.mean([cpu for _, cpu in publish])),
+        "publish_p99_us": 1e6 * float(np.percentile([wall for wall, _ in publish], 99)),
+        "delivered": received / (readers * frames),
+        "missed": missed,
+        "delay_p50_ms": 1000.0 * float(np.percentile(delays, 50)),
+        "delay_p95_ms": 1000.0 * float(np.percentile(delays, 95)),
+        "subscribers_left": remaining,
+        "dropped": publisher.dropped,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+
+    for transport, address in ADDRESSES.items():
+        for count in args.subscribers:
+            for stalled in (False, True) if count > 1 else (False,):
+                result = run(address, count, stalled, args.fps, args.seconds)
+                name = f"{transport} x{count}{' stalled' if stalled else ''}"
+                print(
+                    f"{name:>18}: publish CPU {result['publish_cpu_us']:6.1f} us "
+                    f"(wall p99 {result['publish_p99_us']:7.1f}), "
+                    f"delivered {100 * result['delivered']:5.1f}%, "
+                    f"delay p50/p95 {result['delay_p50_ms']:.2f}/"
+                    f"{result['delay_p95_ms']:.2f} ms, "
+                    f"{result['subscribers_left']} subscribers at end, "
+                    f"{result['dropped']} dropped"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+Модуль для калибровки камеры и коррекции дисторсии
+    Классы:
+        CameraCalibration
+
+Параметры камеры вычисляются по кадрам с шахматной доской или ChArUco
+доской и сохраняются в config.CALIBRATION_DIR отдельно для каждой камеры
+и разрешения. Во время работы коррекция дисторсии выполняется только для
+четырех найденных углов маркера, а положение и расстояние до маркера
+определяются через solvePnP. Для просмотра полного кадра без дисторсии
+используются таблицы remap, вычисляемые один раз.
+
+Запуск:
+    python calibration.py source [--camera usb0] [--board chessboard|charuco]
+        [--pattern 9x6] [--square 25] [--marker 18] [--step 10]
+"""
+
+import argparse
+import os
+from typing import Iterable, Optional
+
+import config
+import cv2
+import numpy as np
+
+
+class CameraCalibration:
+    """
+    Класс для представления параметров камеры.
+
+    Атрибуты:
+    ----------
+    camera: str
+        имя камеры
+    resolution: tuple[int, int]
+        разрешение (ширина, высота), для которого получены параметры
+    camera_matrix: np.ndarray
+        матрица камеры 3x3
+    dist_coeffs: np.ndarray
+        коэффициенты дисторсии
+    rms: float
+        среднеквадратичная ошибка репроекции при калибровке (пиксели)
+
+    Методы:
+    ----------
+    from_chessboard(frames, pattern_size, square_size, camera): CameraCalibration
+        калибровка по кадрам с шахматной доской
+    from_charuco(frames, board_size, square_length, marker_length, camera): CameraCalibration
+        калибровка по кадрам с ChArUco доской
+    load(camera, resolution, directory): CameraCalibration
+        чтение параметров камеры из файла
+    save(directory): str
+        запись параметров камеры в файл
+    scaled(resolution): CameraCalibration
+        параметры камеры для другого разрешения
+    undistort_points(points): np.ndarray
+        коррекция дисторсии точек
+    undistort_frame(frame): np.ndarray
+        коррекция дисторсии кадра
+    estimate_pose(points, marker_true_size): tuple[np.ndarray, np.ndarray] | None
+        определение положения маркера
+    """
+
+    def __init__(
+        self,
+        camera_matrix: np.ndarray,
+        dist_coeffs: np.ndarray,
+        resolution: tuple[int, int],
+        camera: str = config.CAMERA_NAME,
+        rms: float = 0.0,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта калибровки.
+
+        Параметры:
+        ----------
+        camera_matrix: np.ndarray
+            матрица камеры 3x3
+        dist_coeffs: np.ndarray
+            коэффициенты дисторсии
+        resolution: tuple[int, int]
+            разрешение (ширина, высота)
+        camera: str, optional
+            имя камеры. По умолчанию config.CAMERA_NAME.
+        rms: float, optional
+            ошибка репроекции при калибровке. По умолчанию 0.
+        """
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).reshape(-1, 1)
+        self.resolution = (int(resolution[0]), int(resolution[1]))
+        self.camera = camera
+        self.rms = rms
+        self._maps: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+    @staticmethod
+    def path_for(
+        camera: str,
+        resolution: tuple[int, int],
+        directory: str = config.CALIBRATION_DIR,
+    ) -> str:
+        """Путь к файлу параметров камеры для заданного разрешения."""
+        return os.path.join(directory, f"{camera}_{resolution[0]}x{resolution[1]}.npz")
+
+    @classmethod
+    def load(
+        cls,
+        camera: str = config.CAMERA_NAME,
+        resolution: tuple[int, int] = (config.FRAME_WIDTH, config.FRAME_HEIGHT),
+        directory: str = config.CALIBRATION_DIR,
+    ) -> "CameraCalibration":
+        """
+        Чтение параметров камеры из файла.
+
+        Параметры:
+        ----------
+        camera: str, optional
+            имя камеры. По умолчанию config.CAMERA_NAME.
+        resolution: tuple[int, int], optional
+            разрешение (ширина, высота). По умолчанию (config.FRAME_WIDTH, config.FRAME_HEIGHT).
+        directory: str, optional
+            каталог с параметрами. По умолчанию config.CALIBRATION_DIR.
+
+        Возвращаемое значение:
+        ----------------------
+        CameraCalibration:
+            параметры камеры
+        """
+        with np.load(cls.path_for(camera, resolution, directory)) as data:
+            return cls(
+                data["camera_matrix"],
+                data["dist_coeffs"],
+                tuple(data["resolution"]),
+                camera,
+                float(data["rms"]),
+            )
+
+    def save(self, directory: str = config.CALIBRATION_DIR) -> str:
+        """
+        Запись параметров камеры в файл.
+
+        Параметры:
+        ----------
+        directory: str, optional
+            каталог с параметрами. По умолчанию config.CALIBRATION_DIR.
+
+        Возвращаемое значение:
+        ----------------------
+        str:
+            путь к файлу
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = self.path_for(self.camera, self.resolution, directory)
+        np.savez(
+            path,
+            camera_matrix=self.camera_matrix,
+            dist_coeffs=self.dist_coeffs,
+            resolution=np.array(self.resolution),
+            rms=self.rms,
+        )
+        return path
+
+    @classmethod
+    def from_chessboard(
+        cls,
+        frames: Iterable[np.ndarray],
+        pattern_size: tuple[int, int] = (9, 6),
+        square_size: float = 25.0,
+        camera: str = config.CAMERA_NAME,
+    ) -> "CameraCalibration":
+        """
+        Калибровка по кадрам с шахматной доской.
+
+        Параметры:
+        ----------
+        frames: Iterable[np.ndarray]
+            кадры
+        pattern_size: tuple[int, int], optional
+            количество внутренних углов доски. По умолчанию (9, 6).
+        square_size: float, optional
+            размер клетки (мм). По умолчанию 25.
+        camera: str, optional
+            имя камеры. По умолчанию config.CAMERA_NAME.
+
+        Возвращаемое значение:
+        ----------------------
+        CameraCalibration:
+            параметры камеры
+        """
+        grid = np.zeros((pattern_size[0] * pattern_size[1], 3), np.float32)
+        grid[:, :2] = np.mgrid[0 : pattern_size[0], 0 : pattern_size[1]].T.reshape(
+            -1, 2
+        )
+        grid *= square_size
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+
+        object_points, image_points = [], []
+        resolution = None
+        for frame in frames:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            resolution = (gray.shape[1], gray.shape[0])
+            found, corners = cv2.findChessboardCorners(gray, pattern_size)
+            if not found:
+                continue
+            corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+            object_points.append(grid)
+            image_points.append(corners)
+        return cls._calibrate(object_points, image_points, resolution, camera)
+
+    @classmethod
+    def from_charuco(
+        cls,
+        frames: Iterable[np.ndarray],
+        board_size: tuple[int, int] = (7, 5),
+        square_length: float = 40.0,
+        marker_length: float = 30.0,
+        camera: str = config.CAMERA_NAME,
+    ) -> "CameraCalibration":
+        """
+        Калибровка по кадрам с ChArUco доской (словарь config.ARUCO_TYPE).
+
+        Параметры:
+        ----------
+        frames: Iterable[np.ndarray]
+            кадры
+        board_size: tuple[int, int], optional
+            количество клеток доски. По умолчанию (7, 5).
+        square_length: float, optional
+            размер клетки (мм). По умолчанию 40.
+        marker_length: float, optional
+            размер маркера (мм). По умолчанию 30.
+        camera: str, optional
+            имя камеры. По умолчанию config.CAMERA_NAME.
+
+        Возвращаемое значение:
+        ----------------------
+        CameraCalibration:
+            параметры камеры
+        """
+        dictionary = cv2.aruco.getPredefinedDictionary(config.ARUCO_TYPE)
+        board = cv2.aruco.CharucoBoard(
+            board_size, square_length, marker_length, dictionary
+        )
+        detector = cv2.aruco.CharucoDetector(board)
+
+        object_points, image_points = [], []
+        resolution = None
+        for frame in frames:
+            resolution = (frame.shape[1], frame.shape[0])
+            charuco_corners, charuco_ids, _, _ = detector.detectBoard(frame)
+            if charuco_ids is None or len(charuco_ids) < 6:
+                continue
+            objects, images = board.matchImagePoints(charuco_corners, charuco_ids)
+            object_points.append(objects)
+            image_points.append(images)
+        return cls._calibrate(object_points, image_points, resolution, camera)
+
+    @classmethod
+    def _calibrate(
+        cls,
+        object_points: list[np.ndarray],
+        image_points: list[np.ndarray],
+        resolution: Optional[tuple[int, int]],
+        camera: str,
+    ) -> "CameraCalibration":
+        """Вычисление параметров камеры по найденным точкам доски."""
+        if len(image_points) < 3:
+            raise ValueError(
+                f"Not enough calibration frames with a board: {len(image_points)}"
+            )
+        rms, camera_matrix, dist_coeffs, _, _ = cv2.calibrateCamera(
+            object_points, image_points, resolution, None, None
+        )
+        return cls(camera_matrix, dist_coeffs, resolution, camera, rms)
+
+    def scaled(self, resolution: tuple[int, int]) -> "CameraCalibration":
+        """
+        Параметры камеры для другого разрешения с тем же соотношением сторон.
+
+        Параметры:
+        ----------
+        resolution: tuple[int, int]
+            разрешение (ширина, высота)
+
+        Возвращаемое значение:
+        ----------------------
+        CameraCalibration:
+            параметры камеры
+        """
+        if tuple(resolution) == self.resolution:
+            return self
+        scale = np.diag(
+            [resolution[0] / self.resolution[0], resolution[1] / self.resolution[1], 1]
+        )
+        return CameraCalibration(
+            scale @ self.camera_matrix,
+            self.dist_coeffs,
+            resolution,
+            self.camera,
+            self.rms,
+        )
+
+    def undistort_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        Коррекция дисторсии точек (координаты остаются в пикселях).
+
+        Параметры:
+        ----------
+        points: np.ndarray
+            координаты точек, форма (..., 2)
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray:
+            координаты точек без дисторсии, той же формы
+        """
+        shape = points.shape
+        undistorted = cv2.undistortPoints(
+            points.reshape(-1, 1, 2).astype(np.float64),
+            self.camera_matrix,
+            self.dist_coeffs,
+            P=self.camera_matrix,
+        )
+        return undistorted.reshape(shape).astype(np.float32)
+
+    def undistort_frame(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Коррекция дисторсии кадра по таблицам remap (вычисляются один раз).
+
+        Параметры:
+        ----------
+        frame: np.ndarray
+            кадр
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray:
+            кадр без дисторсии
+        """
+        if self._maps is None:
+            self._maps = cv2.initUndistortRectifyMap(
+                self.camera_matrix,
+                self.dist_coeffs,
+                None,
+                self.camera_matrix,
+                self.resolution,
+                cv2.CV_16SC2,
+            )
+        return cv2.remap(frame, *self._maps, cv2.INTER_LINEAR)
+
+    def estimate_pose(
+        self, points: np.ndarray, marker_true_size: float
+    ) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        Определение положения квадратного маркера через solvePnP.
+
+        Параметры:
+        ----------
+        points: np.ndarray
+            координаты углов маркера на кадре (с дисторсией), форма (1, 4, 2)
+        marker_true_size: float
+            реальный размер маркера (мм)
+
+        Возвращаемое значение:
+        ----------------------
+        tuple[np.ndarray, np.ndarray] | None:
+            вектор поворота и вектор смещения (мм)
+        """
+        half = marker_true_size / 2.0
+        object_points = np.array(
+            [[-half, half, 0], [half, half, 0], [half, -half, 0], [-half, -half, 0]],
+            dtype=np.float64,
+        )
+        ret, rvec, tvec = cv2.solvePnP(
+            object_points,
+            points.reshape(4, 2).astype(np.float64),
+            self.camera_matrix,
+            self.dist_coeffs,
+            flags=cv2.SOLVEPNP_IPPE_SQUARE,
+        )
+        if not ret:
+            return None
+        return rvec, tvec
+
+
+if __name__ == "__main__":
+    from video_capture import FileVideoCapture
+
+    parser = argparse.ArgumentParser(description="Калибровка камеры")
+    parser.add_argument("source", help="видео или каталог изображений с доской")
+    parser.add_argument("--camera", default=config.CAMERA_NAME)
+    parser.add_argument(
+        "--board", choices=["chessboard", "charuco"], default="chessboard"
+    )
+    parser.add_argument(
+        "--pattern", default="9x6", help="углы (шахматы) или клетки (ChArUco)"
+    )
+    parser.add_argument("--square", type=float, default=25.0, help="размер клетки (мм)")
+    parser.add_argument(
+        "--marker", type=float, default=18.0, help="размер маркера ChArUco (мм)"
+    )
+    parser.add_argument(
+        "--step", type=int, default=10, help="использовать каждый N-й кадр"
+    )
+    args = parser.parse_args()
+
+    cap = FileVideoCapture(args.source)
+    frames = []
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % args.step == 0:
+            frames.append(frame.copy())
+        index += 1
+    cap.release()
+
+    pattern = tuple(int(value) for value in args.pattern.split("x"))
+    if args.board == "chessboard":
+        calibration = CameraCalibration.from_chessboard(
+            frames, pattern, args.square, args.camera
+        )
+    else:
+        calibration = CameraCalibration.from_charuco(
+            frames, pattern, args.square, args.marker, args.camera
+        )
+    print(f"RMS reprojection error: {calibration.rms:.3f} px")
+    print(f"Saved to {calibration.save()}")
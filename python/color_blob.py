@@ -0,0 +1,148 @@
+"""
+Модуль для поиска цветных пятен нескольких цветов за один проход
+    Классы:
+        ColorBlobEngine
+
+Кадр уменьшается (INTER_AREA заменяет размытие), переводится в HSV, и все
+цвета классифицируются одной табличной операцией cv2.LUT: канал H
+отображается в битовую маску цветов (до 8 цветов, диапазоны могут
+пересекаться и переходить через 0), каналы S и V - в 0/255 по порогам.
+Для каждого цвета самое большое пятно находится по статистике связных
+компонент, мелкие компоненты отбрасываются по площади вместо эрозии и
+дилатации. Все промежуточные изображения выделяются один раз.
+"""
+
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+
+MAX_COLORS = 8
+
+
+class ColorBlobEngine:
+    """
+    Класс для поиска цветных пятен нескольких цветов.
+
+    Атрибуты:
+    ----------
+    colors: dict[str, tuple[int, int, int]]
+        отслеживаемые цвета (имя: RGB)
+    downscale: int
+        коэффициент уменьшения кадра
+    min_area: int
+        минимальная площадь пятна на уменьшенном кадре (пиксели)
+    lut: np.ndarray
+        таблица классификации HSV, форма (256, 1, 3)
+
+    Методы:
+    ----------
+    find(frame): dict[str, tuple[list[int], float] | None]
+        центр и радиус самого большого пятна каждого цвета
+    """
+
+    def __init__(
+        self,
+        colors: dict[str, tuple[int, int, int]] = config.TRACKED_COLORS,
+        downscale: int = config.COLOR_DOWNSCALE,
+        hue_tolerance: int = config.COLOR_HUE_TOLERANCE,
+        min_saturation: int = config.COLOR_MIN_SATURATION,
+        min_value: int = config.COLOR_MIN_VALUE,
+        min_area: int = config.COLOR_MIN_AREA,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта поиска.
+
+        Параметры:
+        ----------
+        colors: dict[str, tuple[int, int, int]], optional
+            отслеживаемые цвета (имя: RGB). По умолчанию config.TRACKED_COLORS.
+        downscale: int, optional
+            коэффициент уменьшения кадра. По умолчанию config.COLOR_DOWNSCALE.
+        hue_tolerance: int, optional
+            допустимое отклонение тона. По умолчанию config.COLOR_HUE_TOLERANCE.
+        min_saturation: int, optional
+            минимальная насыщенность. По умолчанию config.COLOR_MIN_SATURATION.
+        min_value: int, optional
+            минимальная яркость. По умолчанию config.COLOR_MIN_VALUE.
+        min_area: int, optional
+            минимальная площадь пятна. По умолчанию config.COLOR_MIN_AREA.
+        """
+        if not 0 < len(colors) <= MAX_COLORS:
+            raise ValueError(f"Expected 1..{MAX_COLORS} colors, got {len(colors)}")
+        self.colors = dict(colors)
+        self.downscale = downscale
+        self.min_area = min_area
+        self.lut = np.zeros((256, 1, 3), dtype=np.uint8)
+        self.lut[min_saturation:, 0, 1] = 255
+        self.lut[min_value:, 0, 2] = 255
+        self._bits: dict[str, int] = {}
+        for index, (name, rgb) in enumerate(self.colors.items()):
+            bit = 1 << index
+            hue = int(cv2.cvtColor(np.uint8([[rgb[::-1]]]), cv2.COLOR_BGR2HSV)[0, 0, 0])
+            hues = np.arange(hue - hue_tolerance, hue + hue_tolerance + 1) % 180
+            self.lut[hues, 0, 0] |= bit
+            self._bits[name] = bit
+        self._shape: Optional[tuple[int, ...]] = None
+
+    def _allocate(self, shape: tuple[int, ...]) -> None:
+        """Выделение промежуточных изображений для размера кадра."""
+        height = shape[0] // self.downscale
+        width = shape[1] // self.downscale
+        self._size = (width, height)
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._hsv = np.empty((height, width, 3), dtype=np.uint8)
+        self._classes = np.empty((height, width, 3), dtype=np.uint8)
+        self._mask = np.empty((height, width), dtype=np.uint8)
+        self._color_mask = np.empty((height, width), dtype=np.uint8)
+        self._labels = np.empty((height, width), dtype=np.int32)
+        self._shape = shape
+
+    def find(self, frame: np.ndarray) -> dict[str, Optional[tuple[list[int], float]]]:
+        """
+        Поиск самого большого пятна каждого цвета.
+
+        Параметры:
+        ----------
+        frame: np.ndarray
+            кадр BGR
+
+        Возвращаемое значение:
+        ----------------------
+        dict[str, tuple[list[int], float] | None]:
+            для каждого цвета: центр (x, y) и радиус в координатах кадра
+            или None, если пятно не найдено
+        """
+        if self._shape != frame.shape:
+            self._allocate(frame.shape)
+        cv2.resize(frame, self._size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2HSV, dst=self._hsv)
+        cv2.LUT(self._hsv, self.lut, dst=self._classes)
+        np.bitwise_and(self._classes[..., 0], self._classes[..., 1], out=self._mask)
+        np.bitwise_and(self._mask, self._classes[..., 2], out=self._mask)
+
+        blobs = {}
+        for name, bit in self._bits.items():
+            cv2.bitwise_and(self._mask, bit, dst=self._color_mask)
+            count, _, stats, centroids = cv2.connectedComponentsWithStats(
+                self._color_mask, self._labels, connectivity=8
+            )
+            blobs[name] = None
+            if count < 2:
+                continue
+            areas = stats[1:, cv2.CC_STAT_AREA]
+            largest = int(np.argmax(areas)) + 1
+            if stats[largest, cv2.CC_STAT_AREA] < self.min_area:
+                continue
+            center = ((centroids[largest] + 0.5) * self.downscale).astype(int).tolist()
+            radius = (
+                max(
+                    stats[largest, cv2.CC_STAT_WIDTH],
+                    stats[largest, cv2.CC_STAT_HEIGHT],
+                )
+                * self.downscale
+                / 2.0
+            )
+            blobs[name] = (center, float(radius))
+        return blobs
@@ -24,9 +24,48 @@ FONT_SCALE = 2
 
 CONTOUR_COLOR = (0, 255, 0)
 
+# Поиск цветных пятен (ColorBlobEngine)
+TRACKED_COLORS = {"red": (124, 10, 33)}  # имя: RGB, не более 8 цветов
+COLOR_DOWNSCALE = 2
+COLOR_HUE_TOLERANCE = 10
+COLOR_MIN_SATURATION = 100
+COLOR_MIN_VALUE = 100
+COLOR_MIN_AREA = 20  # минимальная площадь пятна на уменьшенном кадре (пиксели)
+
+# Режим без дисплея и просмотр через локальный MJPEG поток
+HEADLESS = False
+PREVIEW_ENABLED = False
+PREVIEW_HOST = "127.0.0.1"
+PREVIEW_PORT = 8080
+PREVIEW_FPS = 5
+PREVIEW_SCALE = 0.5
+PREVIEW_JPEG_QUALITY = 70
+PREVIEW_UNDISTORT = False  # кадры просмотра без дисторсии (нужна калибровка USE_CALIBRATION)
+
 VALID_FRAME_COUNT = 3
 ARUCO_TYPE = aruco.DICT_4X4_250
 
+# Поиск маркера в предсказанной области кадра (ROI)
+ROI_TRACKING = False
+ROI_PADDING = 0.5  # отступ области поиска в долях размера маркера
+
+# Поиск маркера на уменьшенной копии кадра (пирамида)
+PYRAMID_DETECTION = False
+PYRAMID_MIN_MARKER_SIZE = 80  # минимальный размер маркера (сумма двух сторон, пиксели) на уменьшенном кадре
+PYRAMID_MAX_DOWNSCALE = 4  # максимальный коэффициент уменьшения кадра
+
+# Профиль параметров детектора Aruco (python detector_profile.py <name> ...)
+DETECTOR_PROFILE = None  # имя профиля, None - параметры OpenCV по умолчанию
+DETECTOR_PROFILE_DIR = "profiles"
+TUNING_TARGET_RECALL = 0.98  # наименьшая доля найденных маркеров при подборе
+
+FRAME_RING_SIZE = 4  # количество предвыделенных буферов кадров
+
+# Калибровка камеры (python calibration.py ...)
+USE_CALIBRATION = False
+CAMERA_NAME = "usb0"
+CALIBRATION_DIR = "calibration"
+
 USB_VIDEO_CODEC = VideoWriter_fourcc(*'MJPG')
 USB_PREF_API = CAP_V4L2
 CAMERA_INDEX = 0
@@ -34,8 +73,80 @@ CAMERA_INDEX = 0
 GOPRO_PREF_API = CAP_FFMPEG
 GOPRO_VIDEO_CODEC = VideoWriter_fourcc(*'MJPG')
 GOPRO_SERIAL = '322'
+GOPRO_CONNECT_TIMEOUT = 1.0  # время ожидания соединения с камерой (с)
+GOPRO_READ_TIMEOUT = 2.0  # время ожидания ответа камеры (с)
+GOPRO_RETRIES = 2  # повторы команды при ошибке соединения или ответе 5xx
+GOPRO_KEEP_ALIVE_INTERVAL = 3.0  # период keep-alive запросов (с)
 
+# Многопоточный конвейер обработки кадров
+PIPELINE_FRAME_QUEUE_SIZE = 2
+PIPELINE_RING_SIZE = 8  # буферы кадров с учетом кадров, ожидающих в очередях
+PIPELINE_FRAME_POLICY = "drop_oldest"
+PIPELINE_COMMAND_POLICY = "latest"
+PIPELINE_STATS_INTERVAL = 5  # период вывода статистики (с) в обоих циклах, 0 - не выводить
+
+# Несколько камер (multi_camera.py)
+MULTI_CAMERA_MAX_AGE = 0.5  # максимальный возраст результата камеры (с)
 
 SERIAL_TIMEOUT = 1
 SERIAL_PORT = '/dev/ttyACM0'
 SERIAL_BOUD_RATE = 9600
+SERIAL_ASYNC = True  # отправка команд в фоновом потоке (SerialWriter)
+SERIAL_HEARTBEAT = 0.5  # период повторной отправки одинаковых команд (с)
+SERIAL_PROTOCOL = "text"  # 'text' - символ направления, 'binary' - кадры protocol.py
+
+# Метрики задержек (metrics.py)
+METRICS_WINDOW = 300  # количество последних измерений для процентилей
+METRICS_STALE_AGE = 0.2  # возраст кадра к началу обработки, после которого он устарел (с)
+METRICS_SERVER = False  # HTTP сервер метрик Prometheus (/metrics)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+METRICS_CSV = None  # путь к CSV файлу сводки метрик, None - не записывать
+
+# Подстройка разрешения поиска и пропуска кадров (governor.py)
+GOVERNOR_ENABLED = False
+GOVERNOR_TARGET_FPS = 20  # целевая частота управления (обработанных кадров/с)
+GOVERNOR_MAX_DOWNSCALE = 4  # наибольшее уменьшение кадра при поиске
+GOVERNOR_MAX_SKIP = 2  # наибольшее количество пропускаемых кадров
+GOVERNOR_PATIENCE = 15  # количество кадров подряд для изменения
+GOVERNOR_HEADROOM = 0.6  # доля бюджета времени, ниже которой нагрузка повышается
+
+# Сопровождение маркера оптическим потоком между полными поисками (flow_tracker.py)
+FLOW_TRACKING = False
+FLOW_DETECT_INTERVAL = 5  # период полного поиска (кадры)
+FLOW_WIN_SIZE = 21  # размер окна Лукаса-Канаде на уровне пирамиды (пиксели)
+FLOW_MAX_LEVEL = 3  # количество уровней пирамиды
+FLOW_MAX_ERROR = 1.0  # максимальная ошибка возврата угла (пиксели)
+FLOW_MAX_AREA_CHANGE = 0.2  # максимальное относительное изменение площади за кадр
+
+# Пакетный анализ записей (batch_analysis.py)
+BATCH_PROCESSES = None  # количество процессов, None - по числу ядер
+BATCH_CHUNK_FRAMES = 300  # количество кадров в части записи
+BATCH_FORMAT = "npz"  # формат результатов: 'npz' или 'parquet' (нужен pyarrow)
+
+# Запись кадров и результатов поиска маркера (recorder.py)
+RECORDER_ENABLED = False
+RECORDER_PATH = "recordings/flight"  # путь к записи без расширения (.mjpeg, .idx)
+RECORDER_QUEUE_SIZE = 64  # размер очереди кадров потока записи
+RECORDER_JPEG_QUALITY = 90  # качество JPEG для кадров без сжатого кадра камеры
+
+# Декодирование кадров MJPG камеры (video_capture.py): 'color' - BGR,
+# 'gray' - оттенки серого, 'gray2'/'gray4' - оттенки серого в 2/4 раза меньше.
+# Поиск Aruco и QR работает в оттенках серого, ColorMarker - только 'color'.
+CAPTURE_DECODE = "color"
+
+# Поиск QR кодов (qr_engine.py)
+QR_MULTI = True  # поиск нескольких кодов на кадре
+QR_MAX_SHIFT = 0.25  # смещение кода (доля размера), после которого он декодируется заново
+QR_MAX_AGE = 3  # количество кадров без кода, после которого он забывается
+
+# Запуск системы (tracking.py): порт, камера и прогрев детектора открываются параллельно
+CAMERA_TYPE = "usb"  # 'usb', 'gopro' или 'file'
+CAMERA_FILE = None  # запись для CAMERA_TYPE = 'file' (воспроизводится по кругу)
+STARTUP_WARM_UP = True  # прогрев детектора на пустом кадре до первого кадра камеры
+
+# Рассылка результатов поиска маркера подписчикам (telemetry.py)
+TELEMETRY_ENABLED = False
+TELEMETRY_ADDRESS = "udp://127.0.0.1:9110"  # или 'unix:///tmp/nrtk_telemetry.sock'
+TELEMETRY_LEASE = 2.0  # время подписки без продления (с)
+TELEMETRY_MAX_SUBSCRIBERS = 64  # наибольшее количество подписчиков
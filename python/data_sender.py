@@ -2,10 +2,18 @@
 Модуль для работы с Arduino
     Классы:
         Sender
+        SerialWriter
         
 """
+import time
+from collections import deque
+from threading import Condition, Thread
+from typing import Optional
+
 from serial import Serial
 import config
+import protocol
+from protocol import ControlMessage
 
 
 class Sender:
@@ -20,6 +28,15 @@ class Sender:
         порт usb (директория)
     timeout: int
         задержка(мс)
+    async_write: bool
+        отправка команд в фоновом потоке
+    heartbeat: float
+        период повторной отправки одинаковых команд (с)
+    writer: SerialWriter | None
+        фоновый поток отправки команд
+    protocol: str
+        протокол команд: 'text' - символ направления и перевод строки,
+        'binary' - кадры protocol.py
 
     Методы:
     ----------
@@ -27,6 +44,10 @@ class Sender:
         Создает объект класса Serial, открывает соединение с Arduino.
     send_command(command):
         Отправляет комманду command на Arduino.
+    send_message(message):
+        Отправляет команду message по выбранному протоколу.
+    close():
+        Останавливает фоновый поток и закрывает соединение.
     """
 
     def __init__(
@@ -34,6 +55,9 @@ class Sender:
         bd_rate: int = config.SERIAL_BOUD_RATE,
         usb_port: str | None = config.SERIAL_PORT,
         timeout: int = config.SERIAL_TIMEOUT,
+        async_write: bool = config.SERIAL_ASYNC,
+        heartbeat: float = config.SERIAL_HEARTBEAT,
+        protocol: str = config.SERIAL_PROTOCOL,
     ) -> None:
         """
         Устанавливает все необходимые атрибуты для объекта sender.
@@ -46,20 +70,37 @@ class Sender:
             порт usb. По умолчанию config.SERIAL_PORT.
         timeout: int, optional
             задержка (мс). По умолчанию config.SERIAL_TIMEOUT.
+        async_write: bool, optional
+            отправка команд в фоновом потоке. По умолчанию config.SERIAL_ASYNC.
+        heartbeat: float, optional
+            период повторной отправки одинаковых команд (с).
+            По умолчанию config.SERIAL_HEARTBEAT.
+        protocol: str, optional
+            протокол команд ('text', 'binary'). По умолчанию config.SERIAL_PROTOCOL.
         """
+        if protocol not in ("text", "binary"):
+            raise ValueError(f"Unknown serial protocol {protocol!r}")
 
         self.boud_rate = bd_rate
         self.usb_port = usb_port
         self.timeout = timeout
+        self.async_write = async_write
+        self.heartbeat = heartbeat
+        self.protocol = protocol
+        self.writer: Optional[SerialWriter] = None
 
     def open_connect(self) -> None:
         """Создает объект класса Serial, открывает соединение с Arduino."""
         try:
             self.arduino = Serial(
-                port=self.usb_port, boudrate=self.boud_rate, timeout=self.timeout
+                port=self.usb_port, baudrate=self.boud_rate, timeout=self.timeout
             )
         except:
             print("ERROR - Could not open USB serial port.")
+            return
+        if self.async_write:
+            self.writer = SerialWriter(self.arduino, self.heartbeat)
+            self.writer.start()
 
     def send_command(self, command: str) -> bool:
         """
@@ -77,12 +118,186 @@ class Sender:
         bool:
             результат отправки
         """
+        return self._write(command.encode(encoding="UTF-8"))
+
+    def send_message(self, message: ControlMessage) -> bool:
+        """
+        Отправляет команду на Arduino по протоколу self.protocol.
+
+        В текстовом протоколе отправляется только направление message.direction.
+
+        Параметры:
+        ----------
+        message: ControlMessage
+            команда
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            результат отправки
+        """
+        if self.protocol == "binary":
+            return self._write(protocol.encode(message))
+        return self._write((message.direction + "\n").encode(encoding="UTF-8"))
+
+    def _write(self, data: bytes) -> bool:
+        if self.writer is not None:
+            return self.writer.submit(data)
         try:
-            self.arduino.write(command.encode(encoding="UTF-8"))
+            self.arduino.write(data)
             return True
         except:
             return False
 
+    def close(self) -> None:
+        """Останавливает фоновый поток отправки и закрывает соединение."""
+        if self.writer is not None:
+            self.writer.stop()
+            self.writer = None
+        if hasattr(self, "arduino"):
+            self.arduino.close()
+
+
+class SerialWriter(Thread):
+    """
+    Фоновый поток отправки команд на Arduino.
+
+    Хранится только последняя команда: если предыдущая еще не отправлена,
+    она заменяется новой (устаревшая команда не отправляется). Команда,
+    совпадающая с последней отправленной, отбрасывается, если с момента
+    отправки прошло меньше heartbeat секунд.
+
+    Атрибуты:
+    ----------
+    port: Serial
+        соединение с Arduino
+    heartbeat: float
+        период повторной отправки одинаковых команд (с)
+    written: int
+        количество отправленных команд
+    dropped_stale: int
+        количество команд, замененных более новыми до отправки
+    dropped_duplicate: int
+        количество отброшенных повторных команд
+    errors: int
+        количество ошибок отправки
+
+    Методы:
+    ----------
+    submit(data): bool
+        передача команды для отправки
+    stats(): dict
+        статистика отправки
+    stop():
+        остановка потока
+    """
+
+    def __init__(
+        self, port: Serial, heartbeat: float = config.SERIAL_HEARTBEAT
+    ) -> None:
+        super().__init__(name="serial-writer", daemon=True)
+        self.port = port
+        self.heartbeat = heartbeat
+        self.written = 0
+        self.dropped_stale = 0
+        self.dropped_duplicate = 0
+        self.errors = 0
+        self._pending: Optional[tuple[bytes, float]] = None
+        self._last_data: Optional[bytes] = None
+        self._last_write = 0.0
+        self._latencies: deque = deque(maxlen=1000)
+        self._running = True
+        self._cond = Condition()
+
+    def submit(self, data: bytes) -> bool:
+        """
+        Передача команды для отправки без ожидания.
+
+        Параметры:
+        ----------
+        data: bytes
+            команда
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            True, если команда будет отправлена, False - если отброшена как повторная
+        """
+        now = time.monotonic()
+        with self._cond:
+            pending = self._pending[0] if self._pending is not None else None
+            if data == pending or (
+                pending is None
+                and data == self._last_data
+                and now - self._last_write < self.heartbeat
+            ):
+                self.dropped_duplicate += 1
+                return False
+            if self._pending is not None:
+                self.dropped_stale += 1
+            self._pending = (data, now)
+            self._cond.notify()
+            return True
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._pending is not None or not self._running
+                )
+                if not self._running:
+                    return
+                data, submitted = self._pending
+                self._pending = None
+            try:
+                self.port.write(data)
+            except:
+                self.errors += 1
+                continue
+            now = time.monotonic()
+            with self._cond:
+                self._last_data = data
+                self._last_write = now
+                self.written += 1
+                self._latencies.append(now - submitted)
+
+    def stats(self) -> dict:
+        """
+        Статистика отправки.
+
+        Возвращаемое значение:
+        ----------------------
+        dict:
+            written, dropped_stale, dropped_duplicate, errors и задержка
+            от передачи команды до окончания записи (latency_mean_ms,
+            latency_p95_ms, latency_max_ms) по последним 1000 командам
+        """
+        with self._cond:
+            latencies = sorted(self._latencies)
+        stats = {
+            "written": self.written,
+            "dropped_stale": self.dropped_stale,
+            "dropped_duplicate": self.dropped_duplicate,
+            "errors": self.errors,
+            "latency_mean_ms": 0.0,
+            "latency_p95_ms": 0.0,
+            "latency_max_ms": 0.0,
+        }
+        if latencies:
+            stats["latency_mean_ms"] = 1000.0 * sum(latencies) / len(latencies)
+            stats["latency_p95_ms"] = (
+                1000.0 * latencies[int(0.95 * (len(latencies) - 1))]
+            )
+            stats["latency_max_ms"] = 1000.0 * latencies[-1]
+        return stats
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Остановка потока."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.join(timeout)
+
 
 if __name__ == "__main__":
     sender = Sender()
@@ -0,0 +1,481 @@
+"""
+Модуль для подбора и хранения параметров детектора Aruco маркеров
+    Классы:
+        DetectorProfile
+    Функции:
+        candidate_parameters
+        evaluate
+        tune
+
+Профиль - именованный набор значений cv2.aruco.DetectorParameters с
+метриками подбора в файле <DETECTOR_PROFILE_DIR>/<name>.json;
+ArucoMarker(profile=name) применяет профиль к детектору.
+
+Основное время detectMarkers занимают адаптивная бинаризация (проход на
+каждый размер окна от adaptiveThreshWinSizeMin до adaptiveThreshWinSizeMax
+с шагом adaptiveThreshWinSizeStep) и фильтрация контуров. Подбор
+перебирает размеры окон, минимальный периметр маркера, разрешение чтения
+битов и поиск Aruco3 (на уменьшенном кадре) на кадрах записи или
+синтетических кадрах: сначала все варианты на части кадров, затем самые
+быстрые из прошедших - на всех кадрах. Выбирается самый быстрый вариант,
+доля найденных маркеров (recall) которого не ниже заданной, а ложных
+срабатываний не больше, чем у параметров по умолчанию.
+
+На синтетических кадрах и в наборе synthetic.generate_dataset положение
+маркера известно. Для записи эталоном служит поиск с расширенным
+перебором окон (REFERENCE_PARAMETERS): recall считается по кадрам, где
+эталон нашел маркер.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+
+# варианты параметров: вариант подбора - по одному элементу из каждой группы,
+# первые элементы групп - значения OpenCV по умолчанию
+SEARCH_SPACE = (
+    # размеры окон адаптивной бинаризации (проход на каждый размер)
+    [
+        {
+            "adaptiveThreshWinSizeMin": low,
+            "adaptiveThreshWinSizeMax": high,
+            "adaptiveThreshWinSizeStep": 10,
+        }
+        for low, high in (
+            (3, 23),
+            (3, 13),
+            (5, 15),
+            (7, 7),
+            (11, 11),
+            (15, 15),
+            (23, 23),
+        )
+    ],
+    [{"minMarkerPerimeterRate": rate} for rate in (0.03, 0.01, 0.05)],
+    [{"perspectiveRemovePixelPerCell": cell} for cell in (4, 2)],
+    [
+        {"useAruco3Detection": False, "minMarkerLengthRatioOriginalImg": 0.0},
+        {"useAruco3Detection": True, "minMarkerLengthRatioOriginalImg": 0.02},
+        {"useAruco3Detection": True, "minMarkerLengthRatioOriginalImg": 0.05},
+    ],
+)
+
+# эталонный поиск для записей без известного положения маркера
+REFERENCE_PARAMETERS = {
+    "adaptiveThreshWinSizeMin": 3,
+    "adaptiveThreshWinSizeMax": 53,
+    "adaptiveThreshWinSizeStep": 4,
+    "minMarkerPerimeterRate": 0.01,
+}
+
+MAX_CENTER_ERROR = 0.25  # наибольшая ошибка центра найденного маркера (доли стороны)
+RECALL_SLACK = 0.05  # запас recall при отборе на части кадров
+
+
+class DetectorProfile:
+    """
+    Класс именованного набора параметров детектора Aruco маркеров.
+
+    Атрибуты:
+    ----------
+    name: str
+        имя профиля
+    parameters: dict
+        значения атрибутов cv2.aruco.DetectorParameters
+    metrics: dict
+        метрики подбора (recall, время на кадр, источник кадров)
+
+    Методы:
+    ----------
+    load(name, directory): DetectorProfile
+        чтение профиля из файла
+    save(directory): str
+        запись профиля в файл
+    apply(detector):
+        установка параметров детектору
+    """
+
+    def __init__(
+        self, name: str, parameters: dict, metrics: Optional[dict] = None
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта профиля.
+
+        Параметры:
+        ----------
+        name: str
+            имя профиля
+        parameters: dict
+            значения атрибутов cv2.aruco.DetectorParameters
+        metrics: dict | None, optional
+            метрики подбора. По умолчанию None.
+        """
+        self.name = name
+        self.parameters = dict(parameters)
+        self.metrics = dict(metrics or {})
+
+    @staticmethod
+    def path_for(name: str, directory: str = config.DETECTOR_PROFILE_DIR) -> str:
+        """Путь к файлу профиля."""
+        return os.path.join(directory, f"{name}.json")
+
+    @classmethod
+    def load(
+        cls, name: str, directory: str = config.DETECTOR_PROFILE_DIR
+    ) -> "DetectorProfile":
+        """
+        Чтение профиля из файла.
+
+        Параметры:
+        ----------
+        name: str
+            имя профиля
+        directory: str, optional
+            каталог профилей. По умолчанию config.DETECTOR_PROFILE_DIR.
+
+        Возвращаемое значение:
+        ----------------------
+        DetectorProfile:
+            профиль
+        """
+        with open(cls.path_for(name, directory)) as file:
+            data = json.load(file)
+        return cls(data["name"], data["parameters"], data.get("metrics"))
+
+    def save(self, directory: str = config.DETECTOR_PROFILE_DIR) -> str:
+        """
+        Запись профиля в файл.
+
+        Параметры:
+        ----------
+        directory: str, optional
+            каталог профилей. По умолчанию config.DETECTOR_PROFILE_DIR.
+
+        Возвращаемое значение:
+        ----------------------
+        str:
+            путь к файлу
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = self.path_for(self.name, directory)
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    "name": self.name,
+                    "parameters": self.parameters,
+                    "metrics": self.metrics,
+                },
+                file,
+                indent=2,
+            )
+        return path
+
+    def apply(self, detector: cv2.aruco.ArucoDetector) -> None:
+        """
+        Установка параметров профиля детектору.
+
+        Параметры:
+        ----------
+        detector: cv2.aruco.ArucoDetector
+            детектор
+        """
+        parameters = detector.getDetectorParameters()
+        for name, value in self.parameters.items():
+            setattr(parameters, name, value)
+        detector.setDetectorParameters(parameters)
+
+
+def candidate_parameters() -> list[dict]:
+    """Все варианты параметров SEARCH_SPACE (первый - параметры по умолчанию)."""
+    candidates = []
+    for options in itertools.product(*SEARCH_SPACE):
+        parameters = {}
+        for option in options:
+            parameters.update(option)
+        candidates.append(parameters)
+    return candidates
+
+
+def _make_marker(parameters: dict, valid_id: int):
+    """Маркер с поиском по всему кадру и заданными параметрами детектора."""
+    from marker import ArucoMarker
+
+    marker = ArucoMarker(valid_id=valid_id, roi_tracking=False, pyramid=False)
+    DetectorProfile("candidate", parameters).apply(marker.detector)
+    return marker
+
+
+def evaluate(
+    parameters: dict,
+    frames: list[np.ndarray],
+    centers: list[Optional[tuple[float, float]]],
+    valid_id: int = config.CORRECT_ID,
+) -> dict:
+    """
+    Время поиска и доля найденных маркеров на кадрах.
+
+    Параметры:
+    ----------
+    parameters: dict
+        значения атрибутов cv2.aruco.DetectorParameters
+    frames: list[np.ndarray]
+        кадры
+    centers: list[tuple[float, float] | None]
+        центры маркера на кадрах (None - маркера нет)
+    valid_id: int, optional
+        id маркера. По умолчанию config.CORRECT_ID.
+
+    Возвращаемое значение:
+    ----------------------
+    dict:
+        recall, ложные срабатывания (false_positives), средняя ошибка центра
+        (center_error, пиксели), время на кадр (frame_ms, p95_ms)
+    """
+    marker = _make_marker(parameters, valid_id)
+    marker.find_contour(frames[0])  # первый вызов выделяет буферы
+    times = []
+    errors = []
+    false_positives = 0
+    for frame, center in zip(frames, centers):
+        start = time.perf_counter()
+        marker.find_contour(frame)
+        times.append(time.perf_counter() - start)
+        if marker.center is None:
+            continue
+        if center is None:
+            false_positives += 1
+            continue
+        error = float(np.hypot(*np.subtract(marker.center, center)))
+        side = np.sqrt(cv2.contourArea(marker.points.reshape(-1, 2)))
+        if error <= MAX_CENTER_ERROR * side:
+            errors.append(error)
+        else:
+            false_positives += 1
+    positives = sum(center is not None for center in centers)
+    return {
+        "recall": len(errors) / positives if positives else 1.0,
+        "false_positives": false_positives,
+        "center_error": float(np.mean(errors)) if errors else float("nan"),
+        "frame_ms": 1000.0 * float(np.mean(times)),
+        "p95_ms": 1000.0 * float(np.percentile(times, 95)),
+    }
+
+
+def tune(
+    frames: list[np.ndarray],
+    centers: list[Optional[tuple[float, float]]],
+    target_recall: float = config.TUNING_TARGET_RECALL,
+    valid_id: int = config.CORRECT_ID,
+    sample: int = 30,
+    finalists: int = 8,
+    log=print,
+) -> tuple[Optional[dict], dict, list[tuple[dict, dict]]]:
+    """
+    Подбор самых быстрых параметров детектора с recall не ниже target_recall.
+
+    Все варианты candidate_parameters проверяются на sample кадрах, равномерно
+    взятых из frames; finalists самых быстрых вариантов с recall не ниже
+    target_recall - RECALL_SLACK и параметры по умолчанию проверяются на всех
+    кадрах.
+
+    Параметры:
+    ----------
+    frames: list[np.ndarray]
+        кадры
+    centers: list[tuple[float, float] | None]
+        центры маркера на кадрах (None - маркера нет)
+    target_recall: float, optional
+        наименьшая доля найденных маркеров. По умолчанию config.TUNING_TARGET_RECALL.
+    valid_id: int, optional
+        id маркера. По умолчанию config.CORRECT_ID.
+    sample: int, optional
+        количество кадров для первого отбора. По умолчанию 30.
+    finalists: int, optional
+        количество вариантов, проверяемых на всех кадрах. По умолчанию 8.
+    log: Callable, optional
+        вывод хода подбора. По умолчанию print.
+
+    Возвращаемое значение:
+    ----------------------
+    tuple[dict | None, dict, list[tuple[dict, dict]]]:
+        лучшие параметры (None - ни один вариант не достиг target_recall),
+        метрики параметров по умолчанию, параметры и метрики всех финалистов
+    """
+    candidates = candidate_parameters()
+    indices = np.linspace(0, len(frames) - 1, min(sample, len(frames))).astype(int)
+    sample_frames = [frames[i] for i in indices]
+    sample_centers = [centers[i] for i in indices]
+    quick = []
+    for parameters in candidates:
+        quick.append(
+            (evaluate(parameters, sample_frames, sample_centers, valid_id), parameters)
+        )
+    log(f"{len(candidates)} candidates on {len(sample_frames)} frames")
+    passed = [
+        (result["frame_ms"], index)
+        for index, (result, _) in enumerate(quick)
+        if result["recall"] >= target_recall - RECALL_SLACK
+    ]
+    chosen = [index for _, index in sorted(passed)[:finalists]]
+    if 0 not in chosen:
+        chosen.append(0)
+
+    results = []
+    baseline = None
+    for index in chosen:
+        parameters = candidates[index]
+        result = evaluate(parameters, frames, centers, valid_id)
+        results.append((parameters, result))
+        if index == 0:
+            baseline = result
+        log(
+            f"recall {100 * result['recall']:5.1f}%, "
+            f"{result['frame_ms']:6.2f} ms/frame, "
+            f"false positives {result['false_positives']}: {parameters}"
+        )
+    acceptable = [
+        (result["frame_ms"], i)
+        for i, (_, result) in enumerate(results)
+        if result["recall"] >= target_recall
+        and result["false_positives"] <= baseline["false_positives"]
+    ]
+    if not acceptable:
+        return None, baseline, results
+    return results[min(acceptable)[1]][0], baseline, results
+
+
+def synthetic_footage(
+    count: int, width: int, height: int, seed: int = 0
+) -> tuple[list[np.ndarray], list[tuple[float, float]]]:
+    """Синтетические кадры (оттенки серого) со случайными сценами и центры маркера."""
+    from synthetic import generate_scene, random_scene_params
+
+    rng = np.random.default_rng(seed)
+    frames, centers = [], []
+    for _ in range(count):
+        frame, truth = generate_scene(
+            width, height, rng=rng, **random_scene_params(rng)
+        )
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        centers.append(tuple(truth["center"]))
+    return frames, centers
+
+
+def dataset_footage(
+    path: str, count: int
+) -> tuple[list[np.ndarray], list[tuple[float, float]]]:
+    """Кадры набора synthetic.generate_dataset и центры маркера."""
+    from synthetic import load_dataset
+
+    samples = load_dataset(path)[:count]
+    frames = [cv2.imread(sample["path"], cv2.IMREAD_GRAYSCALE) for sample in samples]
+    return frames, [tuple(sample["center"]) for sample in samples]
+
+
+def video_footage(
+    path: str, count: int, valid_id: int = config.CORRECT_ID
+) -> tuple[list[np.ndarray], list[Optional[tuple[float, float]]]]:
+    """
+    Кадры записи (равномерно по всей записи) и центры маркера эталонного поиска.
+    """
+    from video_capture import FileVideoCapture
+
+    cap = FileVideoCapture(path, decode="gray")
+    step = max(1, len(cap) // count) if len(cap) > 0 else 1
+    frames = []
+    index = 0
+    while len(frames) < count:
+        frame = cap.read_frame()
+        if frame is None:
+            break
+        if index % step == 0:
+            image = frame.image
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            frames.append(image.copy())  # буфер кадра переиспользуется захватом
+        index += 1
+    cap.release()
+    reference = _make_marker(REFERENCE_PARAMETERS, valid_id)
+    centers = []
+    for frame in frames:
+        reference.find_contour(frame)
+        center = reference.center
+        centers.append(tuple(center) if center is not None else None)
+    return frames, centers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Подбор параметров детектора Aruco маркеров"
+    )
+    parser.add_argument("name", help="имя профиля")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="запись или каталог изображений")
+    source.add_argument("--dataset", help="набор synthetic.generate_dataset")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument(
+        "--resolution",
+        default=f"{config.FRAME_WIDTH}x{config.FRAME_HEIGHT}",
+        help="разрешение синтетических кадров",
+    )
+    parser.add_argument(
+        "--target-recall", type=float, default=config.TUNING_TARGET_RECALL
+    )
+    parser.add_argument("--sample", type=int, default=30)
+    parser.add_argument("--finalists", type=int, default=8)
+    parser.add_argument("--directory", default=config.DETECTOR_PROFILE_DIR)
+    args = parser.parse_args()
+
+    if args.video:
+        frames, centers = video_footage(args.video, args.frames)
+        source_name = args.video
+    elif args.dataset:
+        frames, centers = dataset_footage(args.dataset, args.frames)
+        source_name = args.dataset
+    else:
+        width, height = map(int, args.resolution.split("x"))
+        frames, centers = synthetic_footage(args.frames, width, height)
+        source_name = f"synthetic {args.resolution}"
+    if not frames:
+        raise SystemExit("No frames to tune on")
+
+    best, baseline, results = tune(
+        frames,
+        centers,
+        args.target_recall,
+        sample=args.sample,
+        finalists=args.finalists,
+    )
+    if best is None:
+        raise SystemExit(
+            f"No parameters reach recall {args.target_recall:.2f} "
+            f"(default: {baseline['recall']:.3f})"
+        )
+    result = dict(next(r for p, r in results if p is best))
+    result.update(
+        {
+            "baseline_frame_ms": baseline["frame_ms"],
+            "baseline_recall": baseline["recall"],
+            "target_recall": args.target_recall,
+            "frames": len(frames),
+            "source": source_name,
+            "resolution": list(frames[0].shape[1::-1]),
+            "opencv": cv2.__version__,
+        }
+    )
+    path = DetectorProfile(args.name, best, result).save(args.directory)
+    print(
+        f"{args.name}: recall {100 * result['recall']:.1f}% "
+        f"(default {100 * baseline['recall']:.1f}%), "
+        f"{result['frame_ms']:.2f} ms/frame "
+        f"(default {baseline['frame_ms']:.2f} ms, "
+        f"x{baseline['frame_ms'] / result['frame_ms']:.2f})"
+    )
+    print(f"Saved to {path}")
@@ -0,0 +1,155 @@
+"""
+Модуль с имитацией Arduino на псевдотерминале (pty) для проверки отправки
+команд без платы
+    Классы:
+        FakeArduino
+
+Sender открывает путь FakeArduino.port как обычный последовательный порт.
+Имитация читает данные со скоростью линии (10 бит на байт при baud_rate),
+поэтому при отправке быстрее скорости линии буфер pty заполняется и запись
+блокируется так же, как с реальной платой.
+
+Запуск:
+    python fake_arduino.py [--baud 9600] [--binary]
+"""
+
+import argparse
+import os
+import select
+import time
+import tty
+from threading import Lock, Thread
+
+import config
+from protocol import FrameDecoder
+
+
+class FakeArduino:
+    """
+    Класс имитации Arduino на псевдотерминале.
+
+    Атрибуты:
+    ----------
+    port: str
+        путь к подчиненному терминалу (для Sender)
+    baud_rate: int
+        имитируемая скорость линии
+    received: int
+        количество принятых байт
+
+    Методы:
+    ----------
+    start(): FakeArduino
+        запуск потока чтения
+    lines(): list[tuple[float, bytes]]
+        принятые строки и время приема (time.monotonic)
+    data(): bytes
+        все принятые данные (для двоичного протокола)
+    close():
+        остановка потока и закрытие терминала
+    """
+
+    def __init__(self, baud_rate: int = config.SERIAL_BOUD_RATE) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта имитации.
+
+        Параметры:
+        ----------
+        baud_rate: int, optional
+            имитируемая скорость линии. По умолчанию config.SERIAL_BOUD_RATE.
+        """
+        self.baud_rate = baud_rate
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.received = 0
+        self._lines: list[tuple[float, bytes]] = []
+        self._partial = b""
+        self._data = bytearray()
+        self._lock = Lock()
+        self._running = False
+        self._thread = Thread(target=self._run, name="fake-arduino", daemon=True)
+
+    def start(self) -> "FakeArduino":
+        """Запуск потока чтения."""
+        self._running = True
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        byte_time = 10.0 / self.baud_rate
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._master, 64)
+            except OSError:
+                return
+            # линия передает не больше baud_rate / 10 байт в секунду
+            time.sleep(len(data) * byte_time)
+            now = time.monotonic()
+            with self._lock:
+                self.received += len(data)
+                self._data += data
+                *lines, self._partial = (self._partial + data).split(b"\n")
+                self._lines.extend((now, line) for line in lines)
+
+    def lines(self) -> list[tuple[float, bytes]]:
+        """
+        Принятые строки.
+
+        Возвращаемое значение:
+        ----------------------
+        list[tuple[float, bytes]]:
+            время приема (time.monotonic) и строка без перевода строки
+        """
+        with self._lock:
+            return list(self._lines)
+
+    def data(self) -> bytes:
+        """Все принятые данные."""
+        with self._lock:
+            return bytes(self._data)
+
+    def close(self) -> None:
+        """Остановка потока и закрытие терминала."""
+        self._running = False
+        if self._thread.is_alive():
+            self._thread.join(1.0)
+        os.close(self._slave)
+        os.close(self._master)
+
+    def __enter__(self) -> "FakeArduino":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Имитация Arduino на pty")
+    parser.add_argument("--baud", type=int, default=config.SERIAL_BOUD_RATE)
+    parser.add_argument(
+        "--binary", action="store_true", help="декодировать кадры protocol.py"
+    )
+    args = parser.parse_args()
+    decoder = FrameDecoder()
+    with FakeArduino(args.baud) as arduino:
+        print(f"port: {arduino.port}")
+        shown = 0
+        try:
+            while True:
+                time.sleep(0.1)
+                if args.binary:
+                    data = arduino.data()
+                    for message in decoder.feed(data[shown:]):
+                        print(message)
+                    shown = len(data)
+                    continue
+                lines = arduino.lines()
+                for _, line in lines[shown:]:
+                    print(line.decode(errors="replace"))
+                shown = len(lines)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,190 @@
+"""
+Модуль с локальной имитацией HTTP API камеры GoPro для проверки времени
+запуска и восстановления потока без камеры
+    Классы:
+        FakeGoPro
+
+Имитация отвечает на команды gopro_stream.gopro с заданной задержкой
+(отдельно задается задержка установки нового соединения, как у Wi-Fi),
+считает запросы и TCP соединения и может имитировать недоступность
+камеры (ответ 503 на все запросы).
+
+Запуск:
+    python fake_gopro.py [--port 8090] [--latency 0.05] [--connect-latency 0.05]
+"""
+
+import argparse
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+PATHS = (
+    "/gopro/camera/stream/start",
+    "/gopro/camera/stream/stop",
+    "/gopro/camera/keep_alive",
+    "/gopro/webcam/exit",
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        time.sleep(self.server.camera.connect_latency)
+
+    def do_GET(self) -> None:
+        camera: FakeGoPro = self.server.camera
+        time.sleep(camera.latency)
+        status = camera.handle(self.path)
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def process_request(self, request, client_address) -> None:
+        with self.camera.lock:
+            self.camera.connections += 1
+        super().process_request(request, client_address)
+
+
+class FakeGoPro:
+    """
+    Класс имитации HTTP API камеры GoPro.
+
+    Атрибуты:
+    ----------
+    url: str
+        адрес имитации (base_url для gopro_stream.gopro)
+    latency: float
+        задержка ответа (с)
+    connect_latency: float
+        задержка нового соединения (с)
+    available: bool
+        камера отвечает на запросы (иначе ответ 503)
+    streaming: bool
+        поток запущен
+    requests: Counter
+        количество запросов по пути
+    connections: int
+        количество принятых TCP соединений
+    stream_started: list[float]
+        время каждого старта потока (time.monotonic)
+
+    Методы:
+    ----------
+    start(): FakeGoPro
+        запуск сервера
+    handle(path): int
+        обработка команды, возвращает HTTP статус
+    close():
+        остановка сервера
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        connect_latency: float = 0.05,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта имитации.
+
+        Параметры:
+        ----------
+        host: str, optional
+            адрес. По умолчанию "127.0.0.1".
+        port: int, optional
+            порт, 0 - свободный порт. По умолчанию 0.
+        latency: float, optional
+            задержка ответа (с). По умолчанию 0.05.
+        connect_latency: float, optional
+            задержка нового соединения (с). По умолчанию 0.05.
+        """
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.available = True
+        self.streaming = False
+        self.requests: Counter = Counter()
+        self.connections = 0
+        self.stream_started: list[float] = []
+        self.lock = Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.camera = self
+        self.url = "http://{0}:{1}".format(*self._server.server_address)
+        self._thread = Thread(
+            target=self._server.serve_forever, name="fake-gopro", daemon=True
+        )
+
+    def start(self) -> "FakeGoPro":
+        """Запуск сервера."""
+        self._thread.start()
+        return self
+
+    def handle(self, path: str) -> int:
+        """
+        Обработка команды.
+
+        Параметры:
+        ----------
+        path: str
+            путь запроса
+
+        Возвращаемое значение:
+        ----------------------
+        int:
+            HTTP статус
+        """
+        with self.lock:
+            self.requests[path] += 1
+            if not self.available:
+                return 503
+            if path not in PATHS:
+                return 404
+            if path == "/gopro/camera/stream/start":
+                self.streaming = True
+                self.stream_started.append(time.monotonic())
+            elif path in ("/gopro/camera/stream/stop", "/gopro/webcam/exit"):
+                self.streaming = False
+            return 200
+
+    def close(self) -> None:
+        """Остановка сервера."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGoPro":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Имитация HTTP API GoPro")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--connect-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    with FakeGoPro(
+        port=args.port, latency=args.latency, connect_latency=args.connect_latency
+    ) as camera:
+        print(f"url: {camera.url}")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        print(dict(camera.requests), f"connections: {camera.connections}")
@@ -0,0 +1,259 @@
+"""
+Модуль для сопровождения маркера оптическим потоком между полными поисками
+    Классы:
+        FlowTracker
+
+Полный поиск маркера (ArucoMarker, QRMarker) выполняется раз в
+detect_interval кадров или при потере уверенности сопровождения. На
+остальных кадрах четыре угла маркера переносятся пирамидальным методом
+Лукаса-Канаде (cv2.calcOpticalFlowPyrLK). Сопровождение считается
+надежным, если все углы найдены в прямом и обратном направлении, ошибка
+возврата (forward-backward) не больше max_error пикселей, а
+четырехугольник остался выпуклым и его площадь изменилась не больше чем
+на max_area_change. Кадры в оттенках серого хранятся в двух буферах,
+которые меняются местами, без выделения памяти на каждый кадр.
+
+Результат записывается в points/center, поэтому get_direction и
+get_distance работают без изменений.
+"""
+
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+from marker import Marker
+
+
+class FlowTracker(Marker):
+    """
+    Класс сопровождения маркера оптическим потоком.
+
+    Атрибуты:
+    ----------
+    detector: Marker
+        маркер для полного поиска (ArucoMarker, QRMarker)
+    detect_interval: int
+        период полного поиска (кадры)
+    max_error: float
+        максимальная ошибка возврата угла (пиксели)
+    max_area_change: float
+        максимальное относительное изменение площади маркера за кадр
+    tracked: bool
+        углы на последнем кадре получены сопровождением
+    fb_error: float
+        ошибка возврата на последнем кадре сопровождения (пиксели)
+    detections: int
+        количество полных поисков
+    tracked_frames: int
+        количество кадров, обработанных сопровождением
+
+    Методы:
+    -------
+    find_contour(frame): bool
+        поиск или сопровождение маркера, возвращает True если маркер найден
+    draw_contour(frame): None
+        изображение контура маркера на кадре
+    """
+
+    def __init__(
+        self,
+        detector: Marker,
+        detect_interval: int = config.FLOW_DETECT_INTERVAL,
+        win_size: int = config.FLOW_WIN_SIZE,
+        max_level: int = config.FLOW_MAX_LEVEL,
+        max_error: float = config.FLOW_MAX_ERROR,
+        max_area_change: float = config.FLOW_MAX_AREA_CHANGE,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта сопровождения.
+
+        Параметры маркера (мертвая зона, размер, id, параметры камеры)
+        берутся у detector.
+
+        Параметры:
+        ----------
+        detector: Marker
+            маркер для полного поиска
+        detect_interval: int, optional
+            период полного поиска (кадры). По умолчанию config.FLOW_DETECT_INTERVAL.
+        win_size: int, optional
+            размер окна поиска на уровне пирамиды. По умолчанию config.FLOW_WIN_SIZE.
+        max_level: int, optional
+            количество уровней пирамиды. По умолчанию config.FLOW_MAX_LEVEL.
+        max_error: float, optional
+            максимальная ошибка возврата (пиксели). По умолчанию config.FLOW_MAX_ERROR.
+        max_area_change: float, optional
+            максимальное изменение площади за кадр. По умолчанию config.FLOW_MAX_AREA_CHANGE.
+        """
+        super().__init__(
+            detector.dead_zone,
+            detector.start_distance,
+            detector.marker_true_size,
+            detector.valid_id,
+            detector.valid_frame_count,
+            detector.calibration,
+        )
+        self.detector = detector
+        self.detect_interval = detect_interval
+        self.win_size = (win_size, win_size)
+        self.max_level = max_level
+        self.max_error = max_error
+        self.max_area_change = max_area_change
+        self.criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        self.tracked = False
+        self.fb_error = 0.0
+        self.detections = 0
+        self.tracked_frames = 0
+        self._since_detection = 0
+        self._gray: Optional[np.ndarray] = None
+        self._previous_gray: Optional[np.ndarray] = None
+        # углы в координатах кадра поиска (points переводятся rescale)
+        self._corners: Optional[np.ndarray] = None
+        self._area = 0.0
+
+    # параметры поиска на уменьшенном кадре передаются детектору, чтобы
+    # DetectionGovernor мог менять разрешение поиска через FlowTracker
+    @property
+    def pyramid(self) -> bool:
+        return self.detector.pyramid
+
+    @pyramid.setter
+    def pyramid(self, value: bool) -> None:
+        self.detector.pyramid = value
+
+    @property
+    def pyramid_max_downscale(self) -> int:
+        return self.detector.pyramid_max_downscale
+
+    @pyramid_max_downscale.setter
+    def pyramid_max_downscale(self, value: int) -> None:
+        self.detector.pyramid_max_downscale = value
+
+    @property
+    def pyramid_min_marker_size(self) -> int:
+        return self.detector.pyramid_min_marker_size
+
+    def find_contour(self, frame: np.ndarray) -> bool:
+        # два буфера: текущий и предыдущий кадр в оттенках серого
+        previous, gray = self._gray, self._previous_gray
+        if previous is not None and previous.shape != frame.shape[:2]:
+            previous = None
+        if gray is None or gray.shape != frame.shape[:2]:
+            gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        if frame.ndim == 2:
+            np.copyto(gray, frame)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        self._gray, self._previous_gray = gray, previous
+
+        self.tracked = False
+        points = None
+        if (
+            self._corners is not None
+            and previous is not None
+            and self._since_detection < self.detect_interval - 1
+        ):
+            points = self._track(previous, gray)
+        if points is not None:
+            self.tracked = True
+            self.tracked_frames += 1
+            self._since_detection += 1
+        else:
+            points = self._detect(frame)
+
+        self._corners = self.points = points
+        self.center = None
+        if self.points is not None:
+            self.center = [
+                (int(self.points[0][0][0] + self.points[0][2][0])) // 2,
+                (int(self.points[0][0][1] + self.points[0][2][1])) // 2,
+            ]
+            self._area = abs(cv2.contourArea(self.points[0]))
+        self.check_valid()
+        return self.points is not None
+
+    def _detect(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Полный поиск маркера детектором."""
+        detector = self.detector
+        detector.marker_size = self.marker_size
+        detector.scale = self.scale
+        if getattr(detector, "roi_tracking", False) and self._corners is not None:
+            # область поиска по сопровожденным углам, а не по последнему поиску
+            detector.points = self._corners
+            detector._predict_roi(frame.shape[1], frame.shape[0])
+        detector.find_contour(frame)
+        self.detections += 1
+        self._since_detection = 0
+        if detector.points is None or len(detector.points) == 0:
+            return None
+        return np.asarray(detector.points, dtype=np.float32).reshape(1, 4, 2)
+
+    def _track(self, previous: np.ndarray, current: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Перенос углов маркера с предыдущего кадра на текущий.
+
+        Параметры:
+        ----------
+        previous: np.ndarray
+            предыдущий кадр в оттенках серого
+        current: np.ndarray
+            текущий кадр в оттенках серого
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray | None:
+            углы маркера или None, если сопровождение ненадежно
+        """
+        start = self._corners.reshape(4, 1, 2).astype(np.float32)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(
+            previous,
+            current,
+            start,
+            None,
+            winSize=self.win_size,
+            maxLevel=self.max_level,
+            criteria=self.criteria,
+        )
+        if moved is None or not status.all():
+            return None
+        back, status, _ = cv2.calcOpticalFlowPyrLK(
+            current,
+            previous,
+            moved,
+            None,
+            winSize=self.win_size,
+            maxLevel=self.max_level,
+            criteria=self.criteria,
+        )
+        if back is None or not status.all():
+            return None
+        self.fb_error = float(np.linalg.norm(back - start, axis=2).max())
+        if self.fb_error > self.max_error:
+            return None
+        quad = moved.reshape(4, 2)
+        if not cv2.isContourConvex(quad):
+            return None
+        area = abs(cv2.contourArea(quad))
+        if self._area > 0 and abs(area / self._area - 1.0) > self.max_area_change:
+            return None
+        return quad.reshape(1, 4, 2)
+
+    def draw_contour(self, frame: np.ndarray) -> None:
+        if not self.valid:
+            return
+        color = config.CONTOUR_COLOR
+        cv2.polylines(frame, [self.points[0].astype(np.int32)], True, color, 2)
+        cv2.circle(frame, self.center, 2, color, -1)
+
+    def print_info(self, frame: np.ndarray) -> None:
+        super().print_info(frame)
+        cv2.putText(
+            frame,
+            "tracked" if self.tracked else "detected",
+            (0, 150),
+            config.FONT_STYLE,
+            config.FONT_SIZE,
+            config.FONT_COLOR,
+            config.FONT_THICKNESS,
+        )
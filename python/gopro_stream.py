@@ -1,5 +1,11 @@
-""" Модуль для работы с камерой GoPro"""
+"""Модуль для работы с камерой GoPro"""
+
+from threading import Event, Thread
+from typing import Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import config
 
 
@@ -7,17 +13,64 @@ class gopro:
     """
     Класс для предоставления камеры GoPro.
 
+    Команды отправляются через одно постоянное соединение (requests.Session)
+    с ограниченным временем ожидания и повтором при ошибке соединения или
+    ответе 5xx. Фоновый поток keep-alive не дает камере уснуть и заново
+    запускает поток после потери связи.
+
     Атрибуты:
     ---------
     ip: str
         ip адрес камеры
     protocol: str
         протокол для отправки команд
+    base_url: str
+        адрес для команд (protocol://ip или заданный адрес)
+    timeout: tuple[float, float]
+        время ожидания соединения и ответа (с)
+    session: requests.Session
+        пул соединений с камерой
+    connected: bool
+        последняя команда выполнена успешно
+    streaming: bool
+        поток запущен командой stream_start
+    stream_wanted: bool
+        поток должен работать (была команда stream_start без stream_stop)
+    keep_alive_failures: int
+        количество неудачных keep-alive запросов
+    reconnects: int
+        количество перезапусков потока после восстановления связи
 
+    Методы:
+    ---------
+    stream_start(): requests.Response
+        старт потока
+    stream_stop(): requests.Response
+        остановка потока
+    stream_exit(): requests.Response
+        выход из режима потоковой передачи
+    keep_alive(): requests.Response
+        сигнал активности
+    restart_stream(): bool
+        остановка и старт потока, без исключений
+    start_keep_alive(interval):
+        запуск фонового keep-alive
+    stop_keep_alive():
+        остановка фонового keep-alive
+    close():
+        остановка keep-alive и закрытие соединений
     """
 
     def __init__(
-        self, serial: str = config.GOPRO_SERIAL, protocol: str = "http"
+        self,
+        serial: str = config.GOPRO_SERIAL,
+        protocol: str = "http",
+        base_url: Optional[str] = None,
+        timeout: tuple[float, float] = (
+            config.GOPRO_CONNECT_TIMEOUT,
+            config.GOPRO_READ_TIMEOUT,
+        ),
+        retries: int = config.GOPRO_RETRIES,
     ) -> None:
         """
         Устанавливает все необходимые атрибуты для объекта gopro.
@@ -28,9 +81,46 @@ class gopro:
             3 последних цифры серийного номера камеры GoPro. По умолчанию config.GOPRO_SERIAL.
         protocol: str, optional
             используемый протокол для отправки команд. По умолчанию "http".
+        base_url: str | None, optional
+            адрес для команд вместо protocol://ip (например, fake_gopro). По умолчанию None.
+        timeout: tuple[float, float], optional
+            время ожидания соединения и ответа (с).
+            По умолчанию (config.GOPRO_CONNECT_TIMEOUT, config.GOPRO_READ_TIMEOUT).
+        retries: int, optional
+            количество повторов запроса. По умолчанию config.GOPRO_RETRIES.
         """
         self.ip = "172.2{0}.1{1}{2}.51".format(*serial)
         self.protocol = protocol
+        self.base_url = base_url or self.protocol + "://" + self.ip
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.1,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=("GET",),
+            raise_on_status=False,
+        )
+        self.session.mount(
+            self.base_url, HTTPAdapter(max_retries=retry, pool_maxsize=2)
+        )
+        self.connected = False
+        self.streaming = False
+        self.stream_wanted = False
+        self.keep_alive_failures = 0
+        self.reconnects = 0
+        self._stop_keep_alive = Event()
+        self._keep_alive_thread: Optional[Thread] = None
+
+    def _get(self, path: str) -> requests.Response:
+        try:
+            response = self.session.get(self.base_url + path, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            self.connected = False
+            raise
+        self.connected = True
+        return response
 
     def stream_start(self) -> requests.Response:
         """
@@ -41,9 +131,10 @@ class gopro:
         requests.Response:
             ответ сервера на запрос
         """
-        return requests.get(
-            self.protocol + "://" + self.ip + "/gopro/camera/stream/start"
-        )
+        self.stream_wanted = True
+        response = self._get("/gopro/camera/stream/start")
+        self.streaming = True
+        return response
 
     def stream_stop(self) -> requests.Response:
         """
@@ -54,9 +145,9 @@ class gopro:
         requests.Response:
             ответ сервера на запрос
         """
-        return requests.get(
-            self.protocol + "://" + self.ip + "/gopro/camera/stream/stop"
-        )
+        self.streaming = False
+        self.stream_wanted = False
+        return self._get("/gopro/camera/stream/stop")
 
     def stream_exit(self) -> requests.Response:
         """
@@ -67,9 +158,89 @@ class gopro:
         requests.Response:
             ответ сервера на запрос
         """
-        return requests.get(
-            self.protocol + "://" + self.ip + "/gopro/camera/stream/start"
+        self.streaming = False
+        self.stream_wanted = False
+        return self._get("/gopro/webcam/exit")
+
+    def keep_alive(self) -> requests.Response:
+        """
+        Отправляет сигнал активности, чтобы камера не перешла в режим сна.
+
+        Возвращаемое значение:
+        ----------------------
+        requests.Response:
+            ответ сервера на запрос
+        """
+        return self._get("/gopro/camera/keep_alive")
+
+    def restart_stream(self) -> bool:
+        """
+        Остановка и старт потока. Ошибка остановки не прерывает старт.
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            поток запущен
+        """
+        try:
+            self.stream_stop()
+        except requests.RequestException:
+            pass
+        try:
+            self.stream_start()
+        except requests.RequestException:
+            return False
+        return True
+
+    def start_keep_alive(
+        self, interval: float = config.GOPRO_KEEP_ALIVE_INTERVAL
+    ) -> None:
+        """
+        Запуск фонового keep-alive.
+
+        Если поток должен работать (stream_wanted), он запускается заново
+        после восстановления связи или после неудачного старта.
+
+        Параметры:
+        ----------
+        interval: float, optional
+            период запросов (с). По умолчанию config.GOPRO_KEEP_ALIVE_INTERVAL.
+        """
+        if self._keep_alive_thread is not None:
+            return
+        self._stop_keep_alive.clear()
+        self._keep_alive_thread = Thread(
+            target=self._keep_alive_loop,
+            args=(interval,),
+            name="gopro-keep-alive",
+            daemon=True,
         )
+        self._keep_alive_thread.start()
+
+    def _keep_alive_loop(self, interval: float) -> None:
+        while not self._stop_keep_alive.wait(interval):
+            lost = not self.connected
+            try:
+                self.keep_alive()
+            except requests.RequestException:
+                self.keep_alive_failures += 1
+                continue
+            if self.stream_wanted and (lost or not self.streaming):
+                if self.restart_stream():
+                    self.reconnects += 1
+
+    def stop_keep_alive(self) -> None:
+        """Остановка фонового keep-alive."""
+        if self._keep_alive_thread is None:
+            return
+        self._stop_keep_alive.set()
+        self._keep_alive_thread.join()
+        self._keep_alive_thread = None
+
+    def close(self) -> None:
+        """Остановка keep-alive и закрытие соединений."""
+        self.stop_keep_alive()
+        self.session.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+"""
+Модуль для подстройки разрешения поиска маркера и пропуска кадров под
+заданную частоту управления
+    Классы:
+        DetectionGovernor
+
+Время обработки кадра, интервал между обработанными кадрами (частота
+управления) и интервал между кадрами камеры сглаживаются (EWMA). Время
+обработки сравнивается с бюджетом 1 / target_fps. Если время больше
+бюджета patience кадров подряд (или из-за пропуска кадров частота
+управления ниже целевой), сначала отменяется пропуск кадров, затем
+увеличивается максимальное уменьшение кадра при поиске
+(ArucoMarker.pyramid_max_downscale), но не больше, чем позволяет последний
+размер маркера (маркер на уменьшенном кадре не меньше
+pyramid_min_marker_size). На этом пределе подстройка останавливается и
+записывает предупреждение: пропуск кадров не сокращает время обработки
+кадра и только снизил бы частоту управления.
+
+Если время меньше headroom * бюджет, медленнее (2 * patience кадров)
+восстанавливается разрешение поиска, а при полном разрешении пропускаются
+кадры - только если камера дает кадры чаще целевой частоты, так что
+частота управления остается не ниже target_fps, а освободившееся время
+процессора достается остальным потокам. Если изменение после этого снова
+пришлось отменить, следующее выполняется еще в 2 раза реже.
+
+Разрешение захвата (FRAME_WIDTH, FRAME_HEIGHT) не меняется: для этого
+пришлось бы заново открывать камеру. Каждое изменение записывается в
+журнал (logging, логгер "governor") с причиной и в history.
+"""
+
+import logging
+import time
+from typing import Optional
+
+import config
+from marker import Marker
+
+logger = logging.getLogger("governor")
+
+
+class DetectionGovernor:
+    """
+    Класс подстройки разрешения поиска и пропуска кадров.
+
+    Атрибуты:
+    ----------
+    marker: Marker
+        маркер; разрешение поиска меняется только у маркеров с pyramid_max_downscale
+    target_fps: float
+        целевая частота управления (обработанных кадров в секунду)
+    max_downscale: int
+        наибольшее уменьшение кадра при поиске
+    max_skip: int
+        наибольшее количество пропускаемых кадров между обработанными
+    downscale: int
+        текущее наибольшее уменьшение кадра при поиске
+    skip: int
+        текущее количество пропускаемых кадров
+    frame_time: float
+        сглаженное время обработки кадра (с)
+    interval: float
+        сглаженный интервал между обработанными кадрами (с)
+    capture_interval: float
+        сглаженный интервал между кадрами камеры (с)
+    history: list[dict]
+        изменения: time, downscale, skip, reason
+
+    Методы:
+    ----------
+    should_process(): bool
+        обрабатывать ли очередной кадр
+    update(elapsed):
+        учет времени обработки кадра и подстройка
+    """
+
+    def __init__(
+        self,
+        marker: Marker,
+        target_fps: float = config.GOVERNOR_TARGET_FPS,
+        max_downscale: int = config.GOVERNOR_MAX_DOWNSCALE,
+        max_skip: int = config.GOVERNOR_MAX_SKIP,
+        patience: int = config.GOVERNOR_PATIENCE,
+        headroom: float = config.GOVERNOR_HEADROOM,
+        smoothing: float = 0.1,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта подстройки.
+
+        Параметры:
+        ----------
+        marker: Marker
+            маркер
+        target_fps: float, optional
+            целевая частота управления. По умолчанию config.GOVERNOR_TARGET_FPS.
+        max_downscale: int, optional
+            наибольшее уменьшение кадра (степень двойки). По умолчанию config.GOVERNOR_MAX_DOWNSCALE.
+        max_skip: int, optional
+            наибольший пропуск кадров. По умолчанию config.GOVERNOR_MAX_SKIP.
+        patience: int, optional
+            количество кадров подряд для изменения. По умолчанию config.GOVERNOR_PATIENCE.
+        headroom: float, optional
+            доля бюджета, ниже которой нагрузка повышается. По умолчанию config.GOVERNOR_HEADROOM.
+        smoothing: float, optional
+            коэффициент сглаживания времени обработки. По умолчанию 0.1.
+        """
+        self.marker = marker
+        self.target_fps = target_fps
+        self.max_downscale = max_downscale
+        self.max_skip = max_skip
+        self.patience = patience
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.scalable = hasattr(marker, "pyramid_max_downscale")
+        self.downscale = 1
+        self.skip = 0
+        self.frame_time: Optional[float] = None
+        self.interval: Optional[float] = None
+        self.capture_interval: Optional[float] = None
+        self.history: list[dict] = []
+        self._over = 0
+        self._under = 0
+        self._skipped = 0
+        self._frames = 0
+        self._limited = False
+        self._last_frame: Optional[float] = None
+        self._last_processed: Optional[float] = None
+        self._last_up = -(10**9)
+        self._up_patience = 2 * patience
+        if self.scalable:
+            marker.pyramid = True
+            marker.pyramid_max_downscale = self.downscale
+
+    @property
+    def budget(self) -> float:
+        """Бюджет времени обработки кадра (с)."""
+        return 1.0 / self.target_fps
+
+    @property
+    def fps(self) -> float:
+        """Частота управления (обработанных кадров в секунду), 0 - не измерена."""
+        return 1.0 / self.interval if self.interval else 0.0
+
+    @property
+    def capture_fps(self) -> float:
+        """Частота кадров камеры, 0 - не измерена."""
+        return 1.0 / self.capture_interval if self.capture_interval else 0.0
+
+    def _smooth(self, value: Optional[float], sample: float) -> float:
+        """Сглаживание (EWMA)."""
+        if value is None:
+            return sample
+        return value + self.smoothing * (sample - value)
+
+    def should_process(self) -> bool:
+        """
+        Обрабатывать ли очередной кадр (с учетом пропуска кадров).
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            True - кадр нужно обработать
+        """
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self.capture_interval = self._smooth(
+                self.capture_interval, now - self._last_frame
+            )
+        self._last_frame = now
+        if self._skipped < self.skip:
+            self._skipped += 1
+            return False
+        self._skipped = 0
+        return True
+
+    def reliable_downscale(self) -> int:
+        """
+        Наибольшее уменьшение кадра, при котором последний найденный маркер
+        не меньше pyramid_min_marker_size.
+
+        Возвращаемое значение:
+        ----------------------
+        int:
+            уменьшение кадра (степень двойки), 1 - если маркер не найден
+        """
+        if not self.scalable:
+            return 1
+        factor = 1
+        size = self.marker.marker_size / self.marker.scale
+        while (
+            factor * 2 <= self.max_downscale
+            and size / (factor * 2) >= self.marker.pyramid_min_marker_size
+        ):
+            factor *= 2
+        return factor
+
+    def update(self, elapsed: float) -> None:
+        """
+        Учет времени обработки кадра и подстройка.
+
+        Параметры:
+        ----------
+        elapsed: float
+            время обработки кадра (с)
+        """
+        self._frames += 1
+        now = time.perf_counter()
+        if self._last_processed is not None:
+            self.interval = self._smooth(self.interval, now - self._last_processed)
+        self._last_processed = now
+        self.frame_time = self._smooth(self.frame_time, elapsed)
+        # пропуск кадров снизил частоту управления ниже целевой
+        slow_rate = self.skip > 0 and self.fps and self.fps < self.target_fps
+        if self.frame_time > self.budget or slow_rate:
+            self._over += 1
+            self._under = 0
+        elif self.frame_time < self.headroom * self.budget:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.patience:
+            self._step_down()
+        elif self._under >= self._up_patience:
+            self._step_up()
+
+    def _load(self) -> str:
+        """Описание нагрузки для журнала."""
+        return (
+            f"frame time {1000 * self.frame_time:.1f} ms, "
+            f"budget {1000 * self.budget:.1f} ms, "
+            f"control {self.fps:.1f} fps, capture {self.capture_fps:.1f} fps"
+        )
+
+    def _step_down(self) -> None:
+        """
+        Снижение времени обработки: отмена пропуска кадров, затем уменьшение
+        кадра при поиске.
+        """
+        self._over = 0
+        if self._frames - self._last_up < 2 * self._up_patience:
+            # изменение не удержалось - следующее реже
+            self._up_patience = min(2 * self._up_patience, 64 * self.patience)
+        size = self.marker.marker_size
+        reliable = self.reliable_downscale()
+        if self.skip > 0:
+            reason = f"{self._load()}, skipping lowers control rate"
+            self._apply(self.downscale, self.skip - 1, reason)
+        elif self.downscale < reliable:
+            allows = f"marker {size:.0f} px allows downscale {reliable}"
+            reason = f"{self._load()}, {allows}"
+            self._apply(self.downscale * 2, self.skip, reason)
+        elif not self._limited:
+            if not self.scalable:
+                limit = "marker has no scaled search"
+            elif reliable < self.max_downscale:
+                limit = f"marker {size:.0f} px limits downscale to {reliable}"
+            else:
+                limit = "downscale at maximum"
+            logger.warning(
+                "control rate below target at downscale %d: %s, %s",
+                self.downscale,
+                self._load(),
+                limit,
+            )
+            self._limited = True
+
+    def _step_up(self) -> None:
+        """
+        Использование запаса времени: полное разрешение поиска, затем пропуск
+        кадров, если камера дает кадры чаще целевой частоты.
+        """
+        self._under = 0
+        load = f"{self._load()}, below {self.headroom:.0%} of budget"
+        # после пропуска еще одного кадра частота управления не ниже целевой
+        spare = self.capture_fps >= self.target_fps * (self.skip + 2)
+        if self.downscale > 1:
+            self._apply(self.downscale // 2, self.skip, load)
+        elif self.skip < self.max_skip and spare:
+            reason = f"{load}, skip {self.skip + 1} keeps target rate"
+            self._apply(self.downscale, self.skip + 1, reason)
+        else:
+            return
+        self._last_up = self._frames
+
+    def _apply(self, downscale: int, skip: int, reason: str) -> None:
+        """Применение и запись изменения."""
+        logger.info(
+            "downscale %d -> %d, skip %d -> %d: %s",
+            self.downscale,
+            downscale,
+            self.skip,
+            skip,
+            reason,
+        )
+        self.history.append(
+            {
+                "time": time.time(),
+                "downscale": downscale,
+                "skip": skip,
+                "reason": reason,
+            }
+        )
+        self.downscale = downscale
+        self.skip = skip
+        # время обработки и частота управления при новых настройках
+        self.frame_time = None
+        self.interval = None
+        self._last_processed = None
+        self._limited = False
+        if self.scalable:
+            self.marker.pyramid_max_downscale = downscale
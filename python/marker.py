@@ -1,13 +1,51 @@
 """Модуль с основной логикой для обнаружения маркеров"""
 
 from abc import ABC, abstractmethod
-from math import hypot
-from typing import Optional
+from typing import Iterable, Optional
 
 import config
 import cv2
 import imutils
 import numpy as np
+from calibration import CameraCalibration
+from color_blob import ColorBlobEngine
+from detector_profile import DetectorProfile
+from qr_engine import QRCodeEngine
+
+
+def marker_centers(corners: np.ndarray) -> np.ndarray:
+    """
+    Координаты центров маркеров (середина диагонали 0-2).
+
+    Параметры:
+    ----------
+    corners: np.ndarray
+        координаты углов маркеров, форма (N, 4, 2)
+
+    Возвращаемое значение:
+    ----------------------
+    np.ndarray:
+        координаты центров, форма (N, 2), int
+    """
+    return (corners[:, 0] + corners[:, 2]).astype(int) // 2
+
+
+def marker_sizes(corners: np.ndarray) -> np.ndarray:
+    """
+    Видимые размеры маркеров (сумма длин сторон 0-1 и 1-2).
+
+    Параметры:
+    ----------
+    corners: np.ndarray
+        координаты углов маркеров, форма (N, 4, 2)
+
+    Возвращаемое значение:
+    ----------------------
+    np.ndarray:
+        размеры маркеров (пиксели), форма (N,)
+    """
+    sides = np.diff(corners[:, :3], axis=1).astype(np.float64)
+    return np.hypot(sides[..., 0], sides[..., 1]).sum(axis=1)
 
 
 class Marker(ABC):
@@ -28,16 +66,31 @@ class Marker(ABC):
         id маркера для распознавания
     valid_frame_count: int
         минимальное количество подряд идущих кадров с рапознанным маркером, для защиты от случайных срабатываний
+    found_frames: int
+        количество подряд идущих кадров с маркером
     center: list[int]
         координаты точки цетра маркера на кадре
     points: np.ndarray
         координаты точек углов маркера на кадре
     distance: float
         расстояние до маркера (мм)
+    eps: float
+        отклонение центра маркера от центра кадра [-1.0;1.0]
+    marker_size: float
+        видимый размер маркера (сумма длин двух сторон, пиксели)
+    scale: int
+        во сколько раз кадр поиска меньше кадра камеры
     direction: str
         направление движения
     valid: bool
         флаг
+    calibration: CameraCalibration | None
+        параметры камеры. Если заданы, расстояние определяется через solvePnP,
+        а отклонение от центра кадра - по углам маркера без дисторсии
+    rvec: np.ndarray | None
+        вектор поворота маркера (при заданных параметрах камеры)
+    tvec: np.ndarray | None
+        вектор смещения маркера, мм (при заданных параметрах камеры)
 
     Методы:
     -------
@@ -51,6 +104,8 @@ class Marker(ABC):
         определение расстояния до маркера
     check_valid: None
         проверка кадра на условие минимально подряд идущих кадров с маркером
+    rescale(scale): None
+        перевод координат маркера в координаты кадра камеры
     print_info(frame): None
         изображение ключевой информации на кадре
     """
@@ -62,6 +117,7 @@ class Marker(ABC):
         marker_true_size: int = config.MARKER_TRUE_SIZE,
         valid_id: int = config.CORRECT_ID,
         valid_frame_count: int = config.VALID_FRAME_COUNT,
+        calibration: Optional[CameraCalibration] = None,
     ) -> None:
         """
         Устанавливает все необходимые атрибуты для объекта marker.
@@ -78,18 +134,26 @@ class Marker(ABC):
             id маркера для распознавания. По умолчанию config.CORRECT_ID
         valid_frame_count: int, optional
             минимальное количество подряд идущих кадров с рапознанным маркером. По умолчанию config.VALID_FRAME_COUNT
+        calibration: CameraCalibration | None, optional
+            параметры камеры для разрешения кадра. По умолчанию None
         """
         self.dead_zone: float = dead_zone
         self.start_distance: int = start_distance
         self.marker_true_size: int = marker_true_size
         self.valid_id: int = valid_id
         self.valid_frame_count = valid_frame_count
-        self.last_frames: list[bool] = [False] * valid_frame_count
+        self.found_frames: int = 0
         self.center: list[int] = None
         self.points: np.ndarray = None
         self.distance: float = 0
+        self.eps: float = 0.0
+        self.marker_size: float = 0
+        self.scale: int = 1
         self.direction: str = "S"
         self.valid: bool = False
+        self.calibration: Optional[CameraCalibration] = calibration
+        self.rvec: Optional[np.ndarray] = None
+        self.tvec: Optional[np.ndarray] = None
 
     @abstractmethod
     def find_contour(self, frame: np.ndarray) -> bool:
@@ -138,8 +202,16 @@ class Marker(ABC):
         """
         self.direction = "S"
         self.distance = 0
+        self.eps = 0.0
+        self.marker_size = 0
+        self._match_calibration(frame_width)
         if self.center is not None:
-            eps = (2.0 * self.center[0]) / frame_width - 1.0
+            center_x = self.center[0]
+            if self.calibration is not None and self.points is not None:
+                undistorted = self.calibration.undistort_points(self.points[:1])
+                center_x = marker_centers(undistorted)[0][0]
+            eps = (2.0 * center_x) / frame_width - 1.0
+            self.eps = float(eps)
             distance = self.get_distance(frame_width / 720)
             if -self.dead_zone <= eps <= self.dead_zone:
                 if distance > self.start_distance:
@@ -148,6 +220,20 @@ class Marker(ABC):
                 self.direction = "L" if eps < 0 else "R"
         return self.direction
 
+    def _match_calibration(self, frame_width: int) -> None:
+        """
+        Параметры камеры для разрешения кадра, если оно отличается от
+        разрешения калибровки (запись или камера с другим разрешением при том
+        же соотношении сторон). Координаты маркера после rescale - в кадре
+        камеры, поэтому уменьшение кадра при декодировании не учитывается.
+        """
+        if self.calibration is None or self.calibration.resolution[0] == frame_width:
+            return
+        width, height = self.calibration.resolution
+        self.calibration = self.calibration.scaled(
+            (frame_width, round(height * frame_width / width))
+        )
+
     def get_distance(self, distance_coefficient: float) -> int:
         """
         Определение расстояния до маркера.
@@ -155,7 +241,8 @@ class Marker(ABC):
         Параметры:
         ----------
         distance_coefficient: float
-            коэффициент расстояния (зависит от разрешения и камеры)
+            коэффициент расстояния (зависит от разрешения и камеры),
+            не используется при заданных параметрах камеры
 
         Возвращаемое значение:
         ----------------------
@@ -164,14 +251,19 @@ class Marker(ABC):
 
         """
         self.distance = 0
+        self.marker_size = 0
         if self.points is not None and len(self.points) > 0:
-            marker_size = hypot(
-                self.points[0][1][0] - self.points[0][0][0],
-                self.points[0][1][1] - self.points[0][0][1],
-            ) + hypot(
-                self.points[0][2][0] - self.points[0][1][0],
-                self.points[0][2][1] - self.points[0][1][1],
-            )
+            marker_size = float(marker_sizes(self.points)[0])
+            self.marker_size = marker_size
+            if self.calibration is not None:
+                pose = self.calibration.estimate_pose(
+                    self.points[:1], self.marker_true_size
+                )
+                if pose is not None:
+                    self.rvec, self.tvec = pose
+                    # расстояние вдоль оптической оси, как и у оценки по размеру
+                    self.distance = float(self.tvec[2][0])
+                    return self.distance
             # TODO Изменить коэффициент, добавить коэффициент камеры
             self.distance = (
                 distance_coefficient * 1000.0 * self.marker_true_size / marker_size
@@ -180,10 +272,30 @@ class Marker(ABC):
 
     def check_valid(self) -> None:
         """Проверка кадра на условие минимально подряд идущих кадров с маркером."""
-        if len(self.last_frames) > self.valid_frame_count - 1:
-            self.last_frames = self.last_frames[1:]
-        self.last_frames.append(bool(self.center))
-        self.valid = self.last_frames == [True] * self.valid_frame_count
+        self.found_frames = self.found_frames + 1 if self.center is not None else 0
+        self.valid = self.found_frames >= self.valid_frame_count
+
+    def rescale(self, scale: int) -> None:
+        """
+        Перевод координат маркера из кадра поиска в координаты кадра камеры.
+
+        Вызывается после find_contour, если кадр поиска уменьшен при
+        декодировании (Frame.scale). Внутреннее состояние поиска (область
+        поиска, сопровождение) остается в координатах кадра поиска.
+
+        Параметры:
+        ----------
+        scale: int
+            во сколько раз кадр поиска меньше кадра камеры
+        """
+        self.scale = scale
+        if scale == 1:
+            return
+        if self.points is not None and len(self.points) > 0:
+            self.points = (self.points + 0.5) * scale - 0.5
+            self.center = marker_centers(self.points[:1])[0].tolist()
+        elif self.center is not None:
+            self.center = [int(value * scale) for value in self.center]
 
     def print_info(self, frame: np.ndarray) -> None:
         """
@@ -290,6 +402,46 @@ class ColorMarker(Marker):
         return super().print_info(frame)
 
 
+class MultiColorMarker(ColorMarker):
+    """
+    Класс для одновременного поиска пятен нескольких цветов.
+
+    Все цвета обрабатываются за один проход ColorBlobEngine на уменьшенном
+    кадре. Цвет target заполняет center/radius, поэтому методы ColorMarker
+    работают без изменений, остальные цвета доступны в blobs.
+
+    Параметры:
+    ----------
+    engine: ColorBlobEngine
+        объект поиска цветных пятен
+    target: str
+        имя цвета, определяющего направление движения
+    blobs: dict[str, tuple[list[int], float] | None]
+        центр и радиус пятна каждого цвета на последнем кадре
+    """
+
+    def __init__(
+        self,
+        colors: dict[str, tuple[int, int, int]] = config.TRACKED_COLORS,
+        target: Optional[str] = None,
+    ) -> None:
+        self.target = target if target is not None else next(iter(colors))
+        super().__init__(colors[self.target])
+        self.engine = ColorBlobEngine(colors)
+        self.blobs: dict[str, Optional[tuple[list[int], float]]] = {}
+        self.radius = 0.0
+
+    def find_contour(self, frame: np.ndarray) -> bool:
+        self.blobs = self.engine.find(frame)
+        blob = self.blobs[self.target]
+        self.center = None
+        self.radius = 0.0
+        if blob is not None:
+            self.center, self.radius = blob
+        self.check_valid()
+        return blob is not None
+
+
 class QRMarker(Marker):
     """
     Класс для представления маркера QR кода.
@@ -318,8 +470,12 @@ class QRMarker(Marker):
         направление движения
     valid: bool
         флаг
+    engine: QRCodeEngine
+        поиск QR кодов с кэшем декодированных данных
     detector: cv2.QRCodeDetector
         объект класса cv2.QRCodeDetector, детектор QR кода
+    codes: list[tuple[str, np.ndarray]]
+        данные и углы всех кодов, найденных на последнем кадре
 
     Методы:
     -------
@@ -345,17 +501,30 @@ class QRMarker(Marker):
         marker_true_size: int = config.MARKER_TRUE_SIZE,
         valid_id: int = config.CORRECT_ID,
         valid_frame_count: int = config.VALID_FRAME_COUNT,
+        calibration: Optional[CameraCalibration] = None,
+        engine: Optional[QRCodeEngine] = None,
     ) -> None:
         super().__init__(
-            dead_zone, start_distance, marker_true_size, valid_id, valid_frame_count
+            dead_zone,
+            start_distance,
+            marker_true_size,
+            valid_id,
+            valid_frame_count,
+            calibration,
         )
-        self.detector = cv2.QRCodeDetector()
+        self.engine = engine if engine is not None else QRCodeEngine()
+        self.detector = self.engine.detector
+        self.codes: list[tuple[str, np.ndarray]] = []
 
     def find_contour(self, frame: np.ndarray) -> bool:
+        self.points = None
         try:
-            id, self.points, _ = self.detector.detectAndDecode(frame)
-            if id != self.valid_id:
-                self.points = None
+            self.codes = self.engine.find(frame)
+            # данные QR кода - строка, valid_id задается числом
+            for payload, corners in self.codes:
+                if payload == str(self.valid_id):
+                    self.points = corners[np.newaxis]
+                    break
         except:
             print("ERROR - QR detect error")
 
@@ -419,7 +588,26 @@ class ArucoMarker(Marker):
         флаг
     detector: cv2.aruco.ArucoDetector
         объект класса cv2.aruco.ArucoDetector, детектор Aruco маркера
-    id 
+    roi_tracking: bool
+        флаг поиска маркера в предсказанной области кадра
+    roi_padding: float
+        отступ области поиска в долях размера маркера
+    roi: tuple[int, int, int, int] | None
+        предсказанная область поиска (x0, y0, x1, y1)
+    roi_searches: int
+        количество поисков в предсказанной области
+    roi_hits: int
+        количество успешных поисков в предсказанной области
+    pyramid: bool
+        флаг поиска маркера на уменьшенной копии кадра
+    pyramid_min_marker_size: int
+        минимальный размер маркера (сумма двух сторон, пиксели) на уменьшенном кадре
+    pyramid_max_downscale: int
+        максимальный коэффициент уменьшения кадра
+    pyramid_factor: int
+        коэффициент уменьшения кадра, использованный при последнем поиске
+    profile: str | None
+        имя профиля параметров детектора (detector_profile.py), None - параметры по умолчанию
 
     Методы:
     -------
@@ -435,6 +623,8 @@ class ArucoMarker(Marker):
         проверка кадра на условие минимально подряд идущих кадров с маркером
     print_info(frame): None
         изображение ключевой информации на кадре
+    roi_hit_rate: float
+        доля успешных поисков в предсказанной области
 
     """
 
@@ -445,23 +635,57 @@ class ArucoMarker(Marker):
         marker_true_size: int = config.MARKER_TRUE_SIZE,
         valid_id: int = config.CORRECT_ID,
         valid_frame_count: int = config.VALID_FRAME_COUNT,
+        roi_tracking: bool = config.ROI_TRACKING,
+        roi_padding: float = config.ROI_PADDING,
+        pyramid: bool = config.PYRAMID_DETECTION,
+        pyramid_min_marker_size: int = config.PYRAMID_MIN_MARKER_SIZE,
+        pyramid_max_downscale: int = config.PYRAMID_MAX_DOWNSCALE,
+        calibration: Optional[CameraCalibration] = None,
+        profile: Optional[str] = config.DETECTOR_PROFILE,
     ) -> None:
         super().__init__(
-            dead_zone, start_distance, marker_true_size, valid_id, valid_frame_count
+            dead_zone,
+            start_distance,
+            marker_true_size,
+            valid_id,
+            valid_frame_count,
+            calibration,
         )
         dictionary = cv2.aruco.getPredefinedDictionary(config.ARUCO_TYPE)
         parameters = cv2.aruco.DetectorParameters()
         self.detector = cv2.aruco.ArucoDetector(dictionary, parameters)
+        self.profile: Optional[str] = profile
+        if profile is not None:
+            DetectorProfile.load(profile).apply(self.detector)
+        self.roi_tracking: bool = roi_tracking
+        self.roi_padding: float = roi_padding
+        self.roi: Optional[tuple[int, int, int, int]] = None
+        self.roi_searches: int = 0
+        self.roi_hits: int = 0
+        self._last_points: Optional[np.ndarray] = None
+        self._velocity: np.ndarray = np.zeros(2, dtype=np.float32)
+        self.pyramid: bool = pyramid
+        self.pyramid_min_marker_size: int = pyramid_min_marker_size
+        self.pyramid_max_downscale: int = pyramid_max_downscale
+        self.pyramid_factor: int = 1
+
+    @property
+    def roi_hit_rate(self) -> float:
+        """Доля успешных поисков в предсказанной области."""
+        if self.roi_searches == 0:
+            return 0.0
+        return self.roi_hits / self.roi_searches
 
     def find_contour(self, frame: np.ndarray) -> bool:
         self.points = None
         try:
-            detected_points, detected_ids, _ = self.detector.detectMarkers(frame)
-            if detected_points is not None and detected_ids is not None:
-                for points, id in zip(detected_points, detected_ids):
-                    if id == self.valid_id:
-                        self.points = points
-                        break
+            if self.roi_tracking and self.roi is not None:
+                self.roi_searches += 1
+                self.points = self._find_points_roi(frame)
+                if self.points is not None:
+                    self.roi_hits += 1
+            if self.points is None:
+                self.points = self._find_points(frame)
         except:
             print("ERROR - Aruco detect error")
 
@@ -471,9 +695,205 @@ class ArucoMarker(Marker):
                 (int(self.points[0][0][0] + self.points[0][2][0])) // 2,
                 (int(self.points[0][0][1] + self.points[0][2][1])) // 2,
             ]
+        if self.roi_tracking:
+            self._predict_roi(frame.shape[1], frame.shape[0])
         self.check_valid()
         return self.points is not None
 
+    def _find_points(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Поиск маркера с id valid_id на изображении.
+
+        В режиме пирамиды сначала выполняется поиск на уменьшенной копии
+        изображения, при неудаче - на изображении в полном разрешении.
+
+        Параметры:
+        ----------
+        image: np.ndarray
+            изображение (кадр или его часть)
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray | None:
+            координаты углов маркера на изображении
+        """
+        self.pyramid_factor = self._get_pyramid_factor() if self.pyramid else 1
+        if self.pyramid_factor > 1:
+            points = self._find_points_scaled(image, self.pyramid_factor)
+            if points is not None:
+                return points
+            self.pyramid_factor = 1
+        return self._detect_points(image)
+
+    def _get_pyramid_factor(self) -> int:
+        """
+        Выбор коэффициента уменьшения кадра по последнему размеру маркера.
+
+        Выбирается наибольшая степень двойки, при которой размер маркера на
+        уменьшенном кадре не меньше pyramid_min_marker_size. Если маркер
+        не был найден, поиск выполняется в полном разрешении.
+
+        Возвращаемое значение:
+        ----------------------
+        int:
+            коэффициент уменьшения кадра
+        """
+        factor = 1
+        # marker_size в пикселях кадра камеры, поиск - на кадре в scale раз меньше
+        size = self.marker_size / self.scale
+        while (
+            factor * 2 <= self.pyramid_max_downscale
+            and size / (factor * 2) >= self.pyramid_min_marker_size
+        ):
+            factor *= 2
+        return factor
+
+    def _find_points_scaled(
+        self, image: np.ndarray, factor: int
+    ) -> Optional[np.ndarray]:
+        """
+        Поиск маркера на уменьшенной копии изображения.
+
+        Найденные углы переводятся в координаты исходного изображения и
+        уточняются с субпиксельной точностью в полном разрешении
+        (только в окрестности маркера).
+
+        Параметры:
+        ----------
+        image: np.ndarray
+            изображение (кадр или его часть)
+        factor: int
+            коэффициент уменьшения
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray | None:
+            координаты углов маркера на изображении
+        """
+        height, width = image.shape[:2]
+        small = cv2.resize(
+            image, (width // factor, height // factor), interpolation=cv2.INTER_AREA
+        )
+        points = self._detect_points(small)
+        if points is None:
+            return None
+        corners = (points[0] + 0.5) * factor - 0.5
+
+        # уточнение углов только в области маркера
+        win = factor + 1
+        margin = 2 * win + 1
+        x0, y0 = np.maximum(corners.min(axis=0).astype(int) - margin, 0)
+        x1, y1 = corners.max(axis=0).astype(int) + margin + 1
+        region = image[y0:y1, x0:x1]
+        if region.ndim == 3:
+            region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+        offset = np.array([x0, y0], dtype=np.float32)
+        refined = np.ascontiguousarray(corners - offset, dtype=np.float32)
+        cv2.cornerSubPix(
+            region,
+            refined,
+            (win, win),
+            (-1, -1),
+            (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_COUNT, 20, 0.01),
+        )
+        return (refined + offset)[np.newaxis]
+
+    def _detect_points(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Поиск маркера с id valid_id на изображении детектором Aruco.
+
+        Параметры:
+        ----------
+        image: np.ndarray
+            изображение (кадр или его часть)
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray | None:
+            координаты углов маркера на изображении
+        """
+        detected_points, detected_ids, _ = self.detector.detectMarkers(image)
+        if detected_points is not None and detected_ids is not None:
+            for points, id in zip(detected_points, detected_ids):
+                if id == self.valid_id:
+                    return points
+        return None
+
+    def _find_points_roi(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Поиск маркера в предсказанной области кадра.
+
+        Координаты углов переводятся из системы координат области в систему
+        координат кадра. Маркеры с периметром меньше допустимого для всего
+        кадра отбрасываются, чтобы результат совпадал с поиском по всему кадру.
+
+        Параметры:
+        ----------
+        frame: np.ndarray
+            кадр
+
+        Возвращаемое значение:
+        ----------------------
+        np.ndarray | None:
+            координаты углов маркера на кадре
+        """
+        x0, y0, x1, y1 = self.roi
+        points = self._find_points(frame[y0:y1, x0:x1])
+        if points is None:
+            return None
+        points = points + np.array([x0, y0], dtype=points.dtype)
+        perimeter = cv2.arcLength(points[0], True)
+        min_perimeter = (
+            self.detector.getDetectorParameters().minMarkerPerimeterRate
+            * max(frame.shape[:2])
+        )
+        if perimeter < min_perimeter:
+            return None
+        return points
+
+    def _predict_roi(self, frame_width: int, frame_height: int) -> None:
+        """
+        Предсказание области поиска маркера на следующем кадре.
+
+        Положение маркера экстраполируется по скорости смещения центра между
+        двумя последними кадрами, область расширяется на roi_padding размера
+        маркера и на величину смещения. Если маркер не найден, область
+        сбрасывается и следующий поиск выполняется по всему кадру.
+
+        Параметры:
+        ----------
+        frame_width: int
+            ширина кадра
+        frame_height: int
+            высота кадра
+        """
+        if self.points is None:
+            self.roi = None
+            self._last_points = None
+            self._velocity[:] = 0
+            return
+
+        corners = self.points[0]
+        if self._last_points is not None:
+            self._velocity = corners.mean(axis=0) - self._last_points.mean(axis=0)
+        self._last_points = corners
+
+        predicted = corners + self._velocity
+        x_min, y_min = predicted.min(axis=0)
+        x_max, y_max = predicted.max(axis=0)
+        pad = self.roi_padding * max(x_max - x_min, y_max - y_min)
+        pad_x = pad + abs(self._velocity[0])
+        pad_y = pad + abs(self._velocity[1])
+
+        x0 = max(int(x_min - pad_x), 0)
+        y0 = max(int(y_min - pad_y), 0)
+        x1 = min(int(x_max + pad_x) + 1, frame_width)
+        y1 = min(int(y_max + pad_y) + 1, frame_height)
+        if x1 - x0 >= frame_width and y1 - y0 >= frame_height:
+            self.roi = None
+        else:
+            self.roi = (x0, y0, x1, y1)
+
     def draw_contour(self, frame: np.ndarray) -> None:
         if not self.valid:
             return
@@ -491,3 +911,196 @@ class ArucoMarker(Marker):
 
     def print_info(self, frame: np.ndarray) -> None:
         return super().print_info(frame)
+
+
+class MultiArucoMarker(ArucoMarker):
+    """
+    Класс для одновременного отслеживания нескольких Aruco маркеров.
+
+    Все маркеры находятся одним вызовом detectMarkers, центры, размеры,
+    расстояния и отклонения от центра кадра вычисляются для всех маркеров
+    сразу операциями NumPy. Для каждого id ведется свой счетчик подряд
+    идущих кадров с маркером. Маркер valid_id заполняет points/center,
+    поэтому методы базового класса работают без изменений.
+
+    Параметры:
+    ----------
+    target_ids: set[int] | None
+        id отслеживаемых маркеров (None - все найденные маркеры)
+    ids: np.ndarray
+        id найденных маркеров, форма (N,)
+    corners: np.ndarray
+        координаты углов найденных маркеров, форма (N, 4, 2)
+    centers: np.ndarray
+        координаты центров найденных маркеров, форма (N, 2)
+    sizes: np.ndarray
+        видимые размеры найденных маркеров (пиксели), форма (N,)
+    distances: np.ndarray
+        расстояния до найденных маркеров (мм), форма (N,)
+    errors: np.ndarray
+        отклонения центров от центра кадра ([-1.0;1.0]), форма (N,)
+    directions: np.ndarray
+        направления движения до найденных маркеров, форма (N,)
+    valid_counts: dict[int, int]
+        количество подряд идущих кадров с маркером для каждого id
+
+    Методы:
+    -------
+    find_contour(frame): bool
+        поиск маркеров на кадре, возвращает True если найден хотя бы один маркер
+    get_targets(frame_width): dict
+        центр, расстояние, отклонение и направление для каждого найденного id
+    valid_ids: list[int]
+        id маркеров, прошедших проверку на количество подряд идущих кадров
+    """
+
+    def __init__(
+        self,
+        dead_zone: float = config.DEAD_ZONE,
+        start_distance: int = config.START_DISTANCE,
+        marker_true_size: int = config.MARKER_TRUE_SIZE,
+        valid_id: int = config.CORRECT_ID,
+        valid_frame_count: int = config.VALID_FRAME_COUNT,
+        target_ids: Optional[Iterable[int]] = None,
+        calibration: Optional[CameraCalibration] = None,
+        profile: Optional[str] = config.DETECTOR_PROFILE,
+    ) -> None:
+        super().__init__(
+            dead_zone,
+            start_distance,
+            marker_true_size,
+            valid_id,
+            valid_frame_count,
+            calibration=calibration,
+            profile=profile,
+        )
+        self.target_ids: Optional[set[int]] = (
+            set(target_ids) if target_ids is not None else None
+        )
+        self.ids: np.ndarray = np.empty(0, dtype=int)
+        self.corners: np.ndarray = np.empty((0, 4, 2), dtype=np.float32)
+        self.centers: np.ndarray = np.empty((0, 2), dtype=int)
+        self.sizes: np.ndarray = np.empty(0)
+        self.distances: np.ndarray = np.empty(0)
+        self.errors: np.ndarray = np.empty(0)
+        self.directions: np.ndarray = np.empty(0, dtype="<U1")
+        self.valid_counts: dict[int, int] = {}
+
+    @property
+    def valid_ids(self) -> list[int]:
+        """id маркеров, прошедших проверку на количество подряд идущих кадров."""
+        return [
+            id
+            for id, count in self.valid_counts.items()
+            if count >= self.valid_frame_count
+        ]
+
+    def find_contour(self, frame: np.ndarray) -> bool:
+        ids = np.empty(0, dtype=int)
+        corners = np.empty((0, 4, 2), dtype=np.float32)
+        try:
+            detected_points, detected_ids, _ = self.detector.detectMarkers(frame)
+            if detected_ids is not None and len(detected_ids) > 0:
+                ids = detected_ids.ravel()
+                corners = np.concatenate(detected_points)
+                if self.target_ids is not None:
+                    keep = np.isin(ids, list(self.target_ids))
+                    ids, corners = ids[keep], corners[keep]
+        except:
+            print("ERROR - Aruco detect error")
+
+        self.ids = ids
+        self.corners = corners
+        self.centers = marker_centers(corners)
+        self.sizes = marker_sizes(corners)
+        self._update_valid_counts()
+
+        primary = np.flatnonzero(ids == self.valid_id)
+        if len(primary) > 0:
+            index = primary[0]
+            self.points = corners[index : index + 1]
+            self.center = self.centers[index].tolist()
+        else:
+            self.points = None
+            self.center = None
+        self.check_valid()
+        return len(ids) > 0
+
+    def rescale(self, scale: int) -> None:
+        super().rescale(scale)
+        if scale != 1 and len(self.ids) > 0:
+            self.corners = (self.corners + 0.5) * scale - 0.5
+            self.centers = marker_centers(self.corners)
+            self.sizes = marker_sizes(self.corners)
+
+    def _update_valid_counts(self) -> None:
+        """Обновление счетчиков подряд идущих кадров для каждого id."""
+        seen = set(self.ids.tolist())
+        for id in seen:
+            self.valid_counts[id] = self.valid_counts.get(id, 0) + 1
+        for id in list(self.valid_counts):
+            if id not in seen:
+                del self.valid_counts[id]
+
+    def get_targets(self, frame_width: int) -> dict[int, dict]:
+        """
+        Определение расстояния, отклонения и направления для всех маркеров.
+
+        Параметры:
+        ----------
+        frame_width: int
+            ширина кадра
+
+        Возвращаемое значение:
+        ----------------------
+        dict[int, dict]:
+            для каждого id: center, distance, error, direction, valid
+        """
+        self._match_calibration(frame_width)
+        centers = self.centers
+        if self.calibration is not None and len(self.ids) > 0:
+            centers = marker_centers(self.calibration.undistort_points(self.corners))
+            self.distances = np.array(
+                [self._pnp_distance(corners) for corners in self.corners]
+            )
+        else:
+            distance_coefficient = frame_width / 720
+            with np.errstate(divide="ignore"):
+                self.distances = (
+                    distance_coefficient * 1000.0 * self.marker_true_size / self.sizes
+                )
+        self.errors = (2.0 * centers[:, 0]) / frame_width - 1.0
+        in_dead_zone = np.abs(self.errors) <= self.dead_zone
+        self.directions = np.where(
+            in_dead_zone,
+            np.where(self.distances > self.start_distance, "F", "S"),
+            np.where(self.errors < 0, "L", "R"),
+        )
+        return {
+            id: {
+                "center": self.centers[index].tolist(),
+                "distance": float(self.distances[index]),
+                "error": float(self.errors[index]),
+                "direction": str(self.directions[index]),
+                "valid": self.valid_counts.get(id, 0) >= self.valid_frame_count,
+            }
+            for index, id in enumerate(self.ids.tolist())
+        }
+
+    def _pnp_distance(self, corners: np.ndarray) -> float:
+        """Расстояние до маркера через solvePnP (0, если не определено)."""
+        pose = self.calibration.estimate_pose(corners, self.marker_true_size)
+        return float(pose[1][2][0]) if pose is not None else 0.0
+
+    def draw_contour(self, frame: np.ndarray) -> None:
+        valid_ids = self.valid_ids
+        if not valid_ids:
+            return
+        keep = np.isin(self.ids, valid_ids)
+        cv2.aruco.drawDetectedMarkers(
+            frame,
+            list(self.corners[keep][:, np.newaxis]),
+            self.ids[keep].reshape(-1, 1),
+        )
+        for center in self.centers[keep]:
+            cv2.circle(frame, center.tolist(), 2, config.CONTOUR_COLOR, -1)
@@ -0,0 +1,527 @@
+"""
+Модуль для измерения задержек обработки кадров и экспорта метрик
+    Классы:
+        RollingHistogram
+        LatencyMetrics
+        StartupTimer
+        MetricsServer
+
+Время каждого этапа (захват, ожидание в очереди, find_contour,
+get_direction, отправка команды) и полная задержка от захвата кадра до
+отправки команды записываются в гистограммы с фиксированными границами.
+Запись - поиск корзины (bisect) и несколько операций со списками, поэтому
+измерения можно не отключать при работе.
+
+Гистограмма хранит накопленные количества по корзинам (для Prometheus)
+и сами последние window измерений: процентили в выводе, CSV и значениях
+метрик считаются по ним, без округления до границы корзины. Счетчики
+dropped и stale считаются по номерам и времени захвата кадров (Frame):
+разрыв номеров - пропущенные захватом или очередью кадры, кадр старше
+stale_age к началу обработки или выданный повторно - устаревший.
+
+Полная задержка отсчитывается от времени получения кадра от драйвера
+(Frame.timestamp), время экспозиции и передачи кадра камерой не входит.
+
+Этапы запуска (StartupTimer) отсчитываются от старта процесса (по
+/proc/self/stat, время импорта модулей входит), первая правильная команда
+дополнительно - от загрузки системы (/proc/uptime).
+"""
+
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Iterator, Optional, TextIO
+
+import config
+import numpy as np
+
+# границы корзин гистограмм (с)
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+STAGES = ("capture", "queue", "find_contour", "get_direction", "send", "end_to_end")
+COUNTERS = ("processed", "dropped", "stale", "skipped")
+PREFIX = "nrtk"
+
+# время импорта модуля, если время старта процесса недоступно
+_IMPORT_TIME = time.monotonic()
+
+
+class RollingHistogram:
+    """
+    Гистограмма времени с накопленными и скользящими значениями.
+
+    Атрибуты:
+    ----------
+    bounds: tuple[float, ...]
+        верхние границы корзин (с), последняя корзина - +Inf
+    window: int
+        количество последних измерений для процентилей
+    count: int
+        количество всех измерений
+    total: float
+        сумма всех измерений (с)
+
+    Методы:
+    ----------
+    observe(value):
+        добавление измерения
+    percentile(q): float
+        процентиль по последним window измерениям
+    snapshot(): dict
+        count, mean и p50/p95/p99 по последним window измерениям (мс)
+    """
+
+    def __init__(self, bounds: tuple[float, ...] = BUCKETS, window: int = 300) -> None:
+        self.bounds = bounds
+        self.window = window
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(bounds) + 1)
+        self._ring_value = [0.0] * window
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Добавление измерения.
+
+        Параметры:
+        ----------
+        value: float
+            время (с)
+        """
+        bucket = bisect_left(self.bounds, value)
+        with self._lock:
+            self._ring_value[self.count % self.window] = value
+            self.buckets[bucket] += 1
+            self.total += value
+            self.count += 1
+
+    def _recent(self) -> np.ndarray:
+        """Копия последних window измерений (с)."""
+        with self._lock:
+            return np.array(self._ring_value[: min(self.count, self.window)])
+
+    def percentile(self, q: float) -> float:
+        """
+        Процентиль по последним window измерениям.
+
+        Параметры:
+        ----------
+        q: float
+            процентиль [0;100]
+
+        Возвращаемое значение:
+        ----------------------
+        float:
+            процентиль (с), 0 - если измерений нет
+        """
+        recent = self._recent()
+        return float(np.percentile(recent, q)) if recent.size else 0.0
+
+    def snapshot(self) -> dict:
+        """
+        Сводка по последним window измерениям.
+
+        Возвращаемое значение:
+        ----------------------
+        dict:
+            count (все измерения), mean_ms, p50_ms, p95_ms, p99_ms
+        """
+        recent = self._recent()
+        mean, p50, p95, p99 = 0.0, 0.0, 0.0, 0.0
+        if recent.size:
+            mean = float(recent.mean())
+            p50, p95, p99 = np.percentile(recent, (50, 95, 99)).tolist()
+        return {
+            "count": self.count,
+            "mean_ms": 1000.0 * mean,
+            "p50_ms": 1000.0 * p50,
+            "p95_ms": 1000.0 * p95,
+            "p99_ms": 1000.0 * p99,
+        }
+
+
+class LatencyMetrics:
+    """
+    Метрики задержек этапов обработки кадра.
+
+    Атрибуты:
+    ----------
+    histograms: dict[str, RollingHistogram]
+        гистограммы этапов (STAGES)
+    counters: dict[str, int]
+        счетчики кадров (COUNTERS)
+    gauges: dict[str, float]
+        текущие значения (например, статистика SerialWriter)
+    stale_age: float
+        возраст кадра к началу обработки, после которого он считается устаревшим (с)
+
+    Методы:
+    ----------
+    observe(stage, seconds):
+        запись времени этапа
+    timed(stage):
+        контекстный менеджер для измерения времени этапа
+    observe_frame(frame):
+        учет полученного кадра: пропуски, устаревание, время в очереди
+    skip_frame(frame):
+        учет кадра, пропущенного DetectionGovernor
+    increment(name, value):
+        увеличение счетчика
+    set_gauge(name, value):
+        установка текущего значения
+    prometheus(): str
+        метрики в текстовом формате Prometheus
+    write_csv(file):
+        запись строки сводки в CSV
+    summary(): str
+        краткая сводка для вывода в консоль
+    """
+
+    def __init__(
+        self,
+        window: int = config.METRICS_WINDOW,
+        stale_age: float = config.METRICS_STALE_AGE,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта метрик.
+
+        Параметры:
+        ----------
+        window: int, optional
+            количество последних измерений для процентилей. По умолчанию config.METRICS_WINDOW.
+        stale_age: float, optional
+            возраст устаревшего кадра (с). По умолчанию config.METRICS_STALE_AGE.
+        """
+        self.histograms = {stage: RollingHistogram(window=window) for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges: dict[str, float] = {}
+        self.stale_age = stale_age
+        self._last_seq = -1
+        self._csv_counters = list(COUNTERS)
+        self._csv_gauges: list[str] = []
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Запись времени этапа.
+
+        Параметры:
+        ----------
+        stage: str
+            этап (STAGES)
+        seconds: float
+            время (с)
+        """
+        self.histograms[stage].observe(seconds)
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """
+        Измерение времени блока кода.
+
+        Параметры:
+        ----------
+        stage: str
+            этап (STAGES)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histograms[stage].observe(time.perf_counter() - start)
+
+    def observe_frame(self, frame) -> bool:
+        """
+        Учет полученного для обработки кадра.
+
+        Параметры:
+        ----------
+        frame: Frame
+            кадр с номером и временем захвата
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            True, если кадр устарел (старше stale_age или уже обрабатывался)
+        """
+        age = time.monotonic() - frame.timestamp
+        self.histograms["queue"].observe(age)
+        self.counters["processed"] += 1
+        stale = self._follow_seq(frame) or age > self.stale_age
+        if stale:
+            self.counters["stale"] += 1
+        return stale
+
+    def skip_frame(self, frame) -> None:
+        """
+        Учет кадра, намеренно пропущенного без обработки (DetectionGovernor),
+        чтобы он не считался потерянным.
+
+        Параметры:
+        ----------
+        frame: Frame
+            кадр с номером и временем захвата
+        """
+        self.counters["skipped"] += 1
+        self._follow_seq(frame)
+
+    def _follow_seq(self, frame) -> bool:
+        """Учет пропусков номеров кадров, возвращает True для повторного кадра."""
+        if self._last_seq >= 0 and frame.seq > self._last_seq + 1:
+            self.counters["dropped"] += frame.seq - self._last_seq - 1
+        repeated = frame.seq <= self._last_seq
+        self._last_seq = max(self._last_seq, frame.seq)
+        return repeated
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Увеличение счетчика name на value."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Установка текущего значения name."""
+        self.gauges[name] = value
+
+    def prometheus(self) -> str:
+        """
+        Метрики в текстовом формате Prometheus.
+
+        Возвращаемое значение:
+        ----------------------
+        str:
+            гистограммы nrtk_stage_seconds{stage=...}, счетчики
+            nrtk_<name>_frames_total и значения nrtk_<name>
+        """
+        name = f"{PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Frame processing stage duration.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.buckets):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}'
+            )
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        for counter, value in self.counters.items():
+            metric = f"{PREFIX}_{counter}_frames_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for gauge, value in self.gauges.items():
+            metric = f"{PREFIX}_{gauge}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_csv(self, file: TextIO) -> None:
+        """
+        Запись строки сводки в CSV (в пустой файл - и заголовка).
+
+        Столбцы: время, счетчики, для каждого этапа mean/p50/p95/p99 (мс),
+        значения gauges; набор счетчиков и gauges - на момент записи заголовка.
+
+        Параметры:
+        ----------
+        file: TextIO
+            открытый файл
+        """
+        if file.tell() == 0:
+            self._csv_counters = list(self.counters)
+            self._csv_gauges = sorted(self.gauges)
+            columns = ["time", *self._csv_counters]
+            for stage in self.histograms:
+                columns += [f"{stage}_{key}" for key in ("mean", "p50", "p95", "p99")]
+            file.write(",".join(columns + self._csv_gauges) + "\n")
+        values = [f"{time.time():.3f}"]
+        values += [str(self.counters.get(name, 0)) for name in self._csv_counters]
+        for histogram in self.histograms.values():
+            snapshot = histogram.snapshot()
+            values += [
+                f"{snapshot[key]:.3f}"
+                for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+            ]
+        values += [str(self.gauges.get(name, "")) for name in self._csv_gauges]
+        file.write(",".join(values) + "\n")
+        file.flush()
+
+    def summary(self) -> str:
+        """Краткая сводка по этапам для вывода в консоль."""
+        parts = []
+        for stage, histogram in self.histograms.items():
+            snapshot = histogram.snapshot()
+            if snapshot["count"]:
+                parts.append(
+                    f"{stage} {snapshot['mean_ms']:.1f}/{snapshot['p95_ms']:.1f} ms"
+                )
+        counters = ", ".join(f"{name} {value}" for name, value in self.counters.items())
+        return "latency mean/p95: " + ", ".join(parts) + f"; {counters}"
+
+
+def process_start_time() -> float:
+    """
+    Время старта процесса по часам time.monotonic.
+
+    Возвращаемое значение:
+    ----------------------
+    float:
+        время старта (с); без /proc - время импорта модуля metrics
+    """
+    try:
+        with open("/proc/self/stat") as file:
+            # имя процесса в скобках может содержать пробелы
+            fields = file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as file:
+            uptime = float(file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return _IMPORT_TIME
+    started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    return time.monotonic() - max(0.0, uptime - started)
+
+
+def boot_uptime() -> Optional[float]:
+    """Время от загрузки системы (с), None без /proc/uptime."""
+    try:
+        with open("/proc/uptime") as file:
+            return float(file.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StartupTimer:
+    """
+    Этапы запуска системы от старта процесса.
+
+    Время этапа записывается один раз (при первом mark) и дублируется в
+    значения метрик startup_<name>_seconds.
+
+    Атрибуты:
+    ----------
+    start: float
+        время старта процесса (time.monotonic)
+    marks: dict[str, float]
+        время этапов от старта процесса (с)
+    metrics: LatencyMetrics | None
+        метрики для значений этапов
+
+    Методы:
+    ----------
+    mark(name): float
+        запись времени этапа
+    summary(): str
+        сводка этапов для вывода в консоль
+    """
+
+    def __init__(self, metrics: Optional["LatencyMetrics"] = None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта этапов запуска.
+
+        Параметры:
+        ----------
+        metrics: LatencyMetrics | None, optional
+            метрики для значений этапов. По умолчанию None.
+        """
+        self.start = process_start_time()
+        self.marks: dict[str, float] = {}
+        self.metrics = metrics
+
+    def mark(self, name: str) -> float:
+        """
+        Запись времени этапа name (повторные вызовы не меняют время).
+
+        Возвращаемое значение:
+        ----------------------
+        float:
+            время этапа от старта процесса (с)
+        """
+        if name not in self.marks:
+            self.marks[name] = time.monotonic() - self.start
+            if self.metrics is not None:
+                self.metrics.set_gauge(f"startup_{name}_seconds", self.marks[name])
+        return self.marks[name]
+
+    def summary(self) -> str:
+        """Сводка этапов запуска для вывода в консоль."""
+        parts = ", ".join(f"{name} {value:.2f} s" for name, value in self.marks.items())
+        return f"startup: {parts}"
+
+
+class MetricsServer:
+    """
+    HTTP сервер метрик в формате Prometheus (путь /metrics).
+
+    Атрибуты:
+    ----------
+    metrics: LatencyMetrics
+        метрики
+    host: str
+        адрес сервера
+    port: int
+        порт сервера
+
+    Методы:
+    ----------
+    start():
+        запуск сервера
+    stop():
+        остановка сервера
+    """
+
+    def __init__(
+        self,
+        metrics: LatencyMetrics,
+        host: str = config.METRICS_HOST,
+        port: int = config.METRICS_PORT,
+    ) -> None:
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> None:
+        """Запуск HTTP сервера."""
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        """Остановка HTTP сервера."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
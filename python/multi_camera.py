@@ -0,0 +1,489 @@
+"""
+Модуль для одновременной работы с несколькими камерами
+    Классы:
+        SharedFrameRing
+        CameraSpec
+        MultiCameraRuntime
+    Функции:
+        camera_worker
+
+Для каждой камеры запускается отдельный процесс захвата и поиска маркера,
+поэтому обработка распределяется по ядрам процессора без ограничения GIL.
+Кадры записываются прямо в кольцо буферов в разделяемой памяти
+(cap.read(image=buf)) и не передаются через pickle, в очередь результатов
+передаются только параметры найденного маркера. Координатор объединяет
+результаты всех камер в одну команду движения.
+
+Запуск:
+    python multi_camera.py [--usb 0 2] [--gopro] [--file footage.avi ...]
+"""
+
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+import config
+import numpy as np
+from protocol import ControlMessage
+
+HEADER_FIELDS = 2  # номер кадра и время захвата для каждого буфера
+
+
+class SharedFrameRing:
+    """
+    Кольцо буферов кадров в разделяемой памяти.
+
+    В начале блока памяти хранится таблица (номер кадра, время захвата)
+    для каждого буфера и номер последнего записанного кадра. Номер кадра
+    буфера работает как seqlock: buffer(seq) сбрасывает его в -1 до
+    записи кадра, publish записывает его после записи, а читатель
+    сравнивает номер до и после копирования и отбрасывает кадр, если
+    буфер перезаписывался во время копирования.
+
+    Атрибуты:
+    ----------
+    name: str
+        имя блока разделяемой памяти
+    shape: tuple[int, int, int]
+        форма кадра
+    slots: int
+        количество буферов
+
+    Методы:
+    ----------
+    buffer(seq): np.ndarray
+        буфер для записи кадра с номером seq
+    publish(seq, timestamp):
+        публикация записанного кадра
+    latest(): tuple[np.ndarray, int, float] | None
+        копия последнего кадра, его номер и время захвата
+    close():
+        отключение от разделяемой памяти (и удаление для создателя)
+    """
+
+    def __init__(
+        self,
+        shape: tuple[int, int, int],
+        slots: int = config.FRAME_RING_SIZE,
+        name: Optional[str] = None,
+    ) -> None:
+        """
+        Создает блок разделяемой памяти или подключается к существующему.
+
+        Параметры:
+        ----------
+        shape: tuple[int, int, int]
+            форма кадра (высота, ширина, каналы)
+        slots: int, optional
+            количество буферов. По умолчанию config.FRAME_RING_SIZE.
+        name: str | None, optional
+            имя существующего блока. По умолчанию None (создать новый).
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = 8 * (slots * HEADER_FIELDS + 1)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=header_bytes + slots * frame_bytes
+            )
+        else:
+            # процессы камер используют resource_tracker координатора,
+            # поэтому блок удаляется один раз - создателем
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self._header = np.ndarray(
+            (slots * HEADER_FIELDS + 1,), dtype=np.float64, buffer=self.shm.buf
+        )
+        self._frames = np.ndarray(
+            (slots, *self.shape),
+            dtype=np.uint8,
+            buffer=self.shm.buf,
+            offset=header_bytes,
+        )
+        if self.owner:
+            self._header[:] = -1
+
+    def buffer(self, seq: int) -> np.ndarray:
+        """Буфер для записи кадра с номером seq (помечается как записываемый)."""
+        slot = seq % self.slots
+        self._header[slot * HEADER_FIELDS] = -1
+        return self._frames[slot]
+
+    def publish(self, seq: int, timestamp: float) -> None:
+        """Публикация записанного кадра."""
+        slot = seq % self.slots
+        self._header[slot * HEADER_FIELDS + 1] = timestamp
+        self._header[slot * HEADER_FIELDS] = seq
+        self._header[-1] = seq
+
+    def latest(self) -> Optional[tuple[np.ndarray, int, float]]:
+        """
+        Копия последнего кадра.
+
+        Возвращаемое значение:
+        ----------------------
+        tuple[np.ndarray, int, float] | None:
+            кадр, номер кадра и время захвата или None, если кадров нет
+            или буфер перезаписан во время копирования
+        """
+        seq = int(self._header[-1])
+        if seq < 0:
+            return None
+        slot = seq % self.slots
+        if int(self._header[slot * HEADER_FIELDS]) != seq:
+            return None  # буфер уже записывается следующим кадром
+        timestamp = float(self._header[slot * HEADER_FIELDS + 1])
+        frame = self._frames[slot].copy()
+        if int(self._header[slot * HEADER_FIELDS]) != seq:
+            return None
+        return frame, seq, timestamp
+
+    def close(self) -> None:
+        """Отключение от разделяемой памяти (создатель также удаляет блок)."""
+        del self._header, self._frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class CameraSpec:
+    """
+    Описание камеры для MultiCameraRuntime.
+
+    kind - "usb", "gopro" или "file", kwargs - параметры конструктора
+    соответствующего класса video_capture, resolution - (ширина, высота).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        resolution: tuple[int, int] = (config.FRAME_WIDTH, config.FRAME_HEIGHT),
+        **kwargs,
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.resolution = resolution
+        self.kwargs = kwargs
+
+
+def _open_capture(kind: str, kwargs: dict):
+    """
+    Создание объекта захвата кадров в процессе камеры.
+
+    Кольцо разделяемой памяти хранит цветные кадры полного размера,
+    поэтому захват всегда декодирует кадры в цвете, без выдачи сжатых
+    кадров (CAPTURE_DECODE не применяется).
+    """
+    import video_capture
+
+    kwargs = dict(kwargs, decode="color", passthrough=False)
+    if kind == "usb":
+        return video_capture.UsbVideoCapture(**kwargs)
+    if kind == "gopro":
+        return video_capture.GoProVideoCapture(**kwargs)
+    if kind == "file":
+        return video_capture.FileVideoCapture(**kwargs)
+    raise ValueError(f"Unknown camera kind: {kind}")
+
+
+def camera_worker(
+    spec: CameraSpec,
+    shm_name: str,
+    slots: int,
+    results: mp.Queue,
+    stop: mp.Event,
+) -> None:
+    """
+    Процесс захвата кадров и поиска маркера для одной камеры.
+
+    Кадр читается прямо в буфер разделяемой памяти, в очередь results
+    передается кортеж (камера, номер кадра, время захвата, найден,
+    прошел проверку, центр, расстояние, отклонение, размер маркера,
+    направление). Захват повторяется при ошибке чтения; для записей
+    (kind="file") процесс завершается в конце записи.
+    """
+    from marker import ArucoMarker
+
+    width, height = spec.resolution
+    ring = SharedFrameRing((height, width, 3), slots, shm_name)
+    cap = _open_capture(spec.kind, spec.kwargs)
+    marker = ArucoMarker()
+    seq = 0
+    try:
+        while not stop.is_set():
+            buffer = ring.buffer(seq)
+            ret, frame = _read_into(cap, buffer)
+            if not ret:
+                if spec.kind == "file":
+                    break
+                continue
+            timestamp = time.monotonic()
+            ring.publish(seq, timestamp)
+            found = marker.find_contour(frame)
+            marker.get_direction(frame.shape[1])
+            results.put(
+                (
+                    spec.name,
+                    seq,
+                    timestamp,
+                    bool(found),
+                    marker.valid,
+                    marker.center,
+                    float(marker.distance),
+                    marker.eps,
+                    float(marker.marker_size),
+                    marker.direction,
+                )
+            )
+            seq += 1
+    finally:
+        results.put(
+            (spec.name, -1, time.monotonic(), False, False, None, 0.0, 0.0, 0.0, "S")
+        )
+        cap.release()
+        ring.close()
+
+
+def _read_into(cap, buffer: np.ndarray) -> tuple[bool, Optional[np.ndarray]]:
+    """
+    Чтение кадра в буфер разделяемой памяти.
+
+    USB камера декодирует кадр прямо в буфер, остальные источники
+    (поток GoPro, записи с соблюдением частоты кадров) копируются.
+    """
+    from video_capture import UsbVideoCapture
+
+    if isinstance(cap, UsbVideoCapture):
+        ret, frame = cap.cap.read(image=buffer)
+    else:
+        ret, frame = cap.read()
+    if not ret:
+        return False, None
+    if frame is not buffer:
+        if frame.shape != buffer.shape:
+            raise ValueError(
+                f"Frame shape {frame.shape} does not match ring shape {buffer.shape}"
+            )
+        np.copyto(buffer, frame)
+    return True, buffer
+
+
+class MultiCameraRuntime:
+    """
+    Координатор процессов камер.
+
+    Результаты камер объединяются в одну команду: из камер, у которых
+    маркер прошел проверку на количество подряд идущих кадров и результат
+    не старше max_age, выбирается камера с самым большим видимым размером
+    маркера (ближайший и самый надежно найденный маркер), ее направление
+    становится командой движения.
+
+    Атрибуты:
+    ----------
+    specs: list[CameraSpec]
+        камеры
+    rings: dict[str, SharedFrameRing]
+        кольца кадров камер
+    results: dict[str, tuple]
+        последний результат каждой камеры
+    command: str
+        объединенная команда движения
+    best: tuple | None
+        результат камеры, по которому выбрана команда
+
+    Методы:
+    ----------
+    start():
+        запуск процессов камер
+    poll(timeout): str
+        прием результатов и обновление команды
+    message(): ControlMessage
+        команда для Sender.send_message по выбранному результату
+    run(on_command):
+        основной цикл координатора
+    frame(camera): tuple[np.ndarray, int, float] | None
+        копия последнего кадра камеры
+    stop():
+        остановка процессов и освобождение разделяемой памяти
+    """
+
+    def __init__(
+        self,
+        specs: list[CameraSpec],
+        slots: int = config.FRAME_RING_SIZE,
+        max_age: float = config.MULTI_CAMERA_MAX_AGE,
+    ) -> None:
+        self.specs = specs
+        self.slots = slots
+        self.max_age = max_age
+        self.rings: dict[str, SharedFrameRing] = {}
+        self.results: dict[str, tuple] = {}
+        self.command = "S"
+        self.best: Optional[tuple] = None
+        self._context = mp.get_context("spawn")
+        self._queue = self._context.Queue()
+        self._stop = self._context.Event()
+        self._processes: list[mp.Process] = []
+
+    def start(self) -> None:
+        """Запуск процессов камер."""
+        for spec in self.specs:
+            width, height = spec.resolution
+            ring = SharedFrameRing((height, width, 3), self.slots)
+            self.rings[spec.name] = ring
+            process = self._context.Process(
+                target=camera_worker,
+                args=(spec, ring.name, self.slots, self._queue, self._stop),
+                name=f"camera-{spec.name}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+    @property
+    def alive(self) -> bool:
+        """Есть ли работающие процессы камер."""
+        return any(process.is_alive() for process in self._processes)
+
+    def poll(self, timeout: float = 0.1) -> str:
+        """
+        Прием всех доступных результатов и обновление команды.
+
+        Параметры:
+        ----------
+        timeout: float, optional
+            время ожидания первого результата (с). По умолчанию 0.1.
+
+        Возвращаемое значение:
+        ----------------------
+        str:
+            объединенная команда движения
+        """
+        try:
+            result = self._queue.get(timeout=timeout)
+            while True:
+                self.results[result[0]] = result
+                result = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.command = self.merge()
+        return self.command
+
+    def merge(self) -> str:
+        """Объединение результатов камер в одну команду движения."""
+        now = time.monotonic()
+        best = None
+        for result in self.results.values():
+            _, seq, timestamp, found, valid, _, _, _, size, _ = result
+            if seq < 0 or not (found and valid) or now - timestamp > self.max_age:
+                continue
+            if best is None or size > best[8]:
+                best = result
+        self.best = best
+        return best[9] if best is not None else "S"
+
+    def message(self) -> ControlMessage:
+        """
+        Команда для Sender.send_message по результату, выбранному merge.
+
+        Возвращаемое значение:
+        ----------------------
+        ControlMessage:
+            команда (без маркера - остановка)
+        """
+        if self.best is None:
+            return ControlMessage(0)
+        _, seq, _, found, valid, _, distance, eps, _, direction = self.best
+        return ControlMessage(
+            seq,
+            steering=eps,
+            distance=distance,
+            found=found,
+            valid=valid,
+            direction=direction,
+        )
+
+    def run(self, on_command: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Основной цикл координатора.
+
+        Параметры:
+        ----------
+        on_command: Callable[[str], None] | None, optional
+            вызывается после каждого опроса с текущей командой движения:
+            повторные команды отбрасывает SerialWriter, а их регулярная
+            отправка не дает Arduino остановиться по тайм-ауту
+        """
+        try:
+            while self.alive or not self._queue.empty():
+                command = self.poll()
+                if on_command is not None:
+                    on_command(command)
+        except KeyboardInterrupt:
+            pass
+
+    def frame(self, camera: str) -> Optional[tuple[np.ndarray, int, float]]:
+        """Копия последнего кадра камеры."""
+        return self.rings[camera].latest()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Остановка процессов камер и освобождение разделяемой памяти."""
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Работа с несколькими камерами")
+    parser.add_argument(
+        "--usb", nargs="*", type=int, default=[], help="индексы USB камер"
+    )
+    parser.add_argument("--gopro", action="store_true", help="использовать GoPro")
+    parser.add_argument("--file", nargs="*", default=[], help="записи вместо камер")
+    parser.add_argument(
+        "--send", action="store_true", help="отправлять команды на Arduino"
+    )
+    args = parser.parse_args()
+
+    specs = [CameraSpec(f"usb{index}", "usb", camera_index=index) for index in args.usb]
+    if args.gopro:
+        specs.append(CameraSpec("gopro", "gopro"))
+    for index, path in enumerate(args.file):
+        specs.append(CameraSpec(f"file{index}", "file", source=path, realtime=True))
+
+    sender = None
+    if args.send:
+        from data_sender import Sender
+
+        sender = Sender()
+        sender.open_connect()
+
+    last_command = None
+
+    def on_command(command: str) -> None:
+        global last_command
+        if command != last_command:
+            print(f"command: {command}")
+            last_command = command
+        if sender is not None:
+            sender.send_message(runtime.message())
+
+    runtime = MultiCameraRuntime(specs)
+    runtime.start()
+    try:
+        runtime.run(on_command)
+    finally:
+        runtime.stop()
+        if sender is not None:
+            sender.close()
@@ -0,0 +1,398 @@
+"""
+Модуль для построения многопоточного конвейера обработки кадров
+    Классы:
+        StageQueue
+        Stage
+        Pipeline
+
+"""
+
+import logging
+import time
+from collections import deque
+from threading import Condition, Event, Thread
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("pipeline")
+
+
+class StageQueue:
+    """
+    Ограниченная очередь между стадиями конвейера.
+
+    Поддерживает политики переполнения:
+        "block" - ожидание освобождения места
+        "drop_oldest" - удаление самого старого элемента (для кадров)
+        "latest" - хранится только последний элемент (для команд)
+
+    Атрибуты:
+    ----------
+    maxsize: int
+        максимальное количество элементов
+    policy: str
+        политика переполнения
+    dropped: int
+        количество отброшенных элементов
+
+    Методы:
+    ----------
+    put(item, timeout): bool
+        добавление элемента в очередь
+    get(timeout): Any
+        извлечение элемента из очереди
+    depth: int
+        текущее количество элементов
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    LATEST = "latest"
+
+    def __init__(self, maxsize: int = 1, policy: str = DROP_OLDEST) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта очереди.
+
+        Параметры:
+        ----------
+        maxsize: int, optional
+            максимальное количество элементов. По умолчанию 1.
+        policy: str, optional
+            политика переполнения. По умолчанию "drop_oldest".
+        """
+        if policy not in (self.BLOCK, self.DROP_OLDEST, self.LATEST):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.policy = policy
+        self.maxsize = 1 if policy == self.LATEST else max(1, maxsize)
+        self.dropped = 0
+        self._items: deque = deque()
+        self._cond = Condition()
+
+    @property
+    def depth(self) -> int:
+        """Текущее количество элементов в очереди."""
+        return len(self._items)
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """
+        Добавление элемента в очередь.
+
+        Параметры:
+        ----------
+        item: Any
+            элемент
+        timeout: float | None, optional
+            максимальное время ожидания для политики "block". По умолчанию None.
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            True, если элемент добавлен
+        """
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == self.BLOCK:
+                    if not self._cond.wait_for(
+                        lambda: len(self._items) < self.maxsize, timeout
+                    ):
+                        self.dropped += 1
+                        return False
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Извлечение элемента из очереди.
+
+        Параметры:
+        ----------
+        timeout: float | None, optional
+            максимальное время ожидания. По умолчанию None.
+
+        Возвращаемое значение:
+        ----------------------
+        Any:
+            элемент или None, если время ожидания истекло
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) > 0, timeout):
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+
+class Stage(Thread):
+    """
+    Стадия конвейера, выполняемая в отдельном потоке.
+
+    Стадия без входной очереди является источником и вызывает функцию
+    без аргументов. Результат функции (если не None) передается во все
+    выходные очереди без ожидания, кроме очередей с политикой "block".
+
+    Исключение функции в потоке стадии записывается в журнал (logging,
+    логгер "pipeline") с трассировкой и учитывается в errors, стадия
+    продолжает работу. После max_errors исключений подряд стадия
+    останавливается, исключение сохраняется в error и повторно
+    выбрасывается в главном потоке вызовом Pipeline.check().
+
+    Атрибуты:
+    ----------
+    func: Callable
+        функция обработки элемента
+    inbox: StageQueue | None
+        входная очередь
+    outputs: list[StageQueue]
+        выходные очереди
+    threaded: bool
+        флаг выполнения стадии в отдельном потоке
+    processed: int
+        количество обработанных элементов
+    errors: int
+        количество исключений функции обработки
+    max_errors: int
+        количество исключений подряд, после которого стадия останавливается
+    error: BaseException | None
+        исключение, остановившее стадию
+
+    Методы:
+    ----------
+    step(timeout): bool
+        обработка одного элемента в вызывающем потоке
+    stop():
+        остановка стадии
+    stats(): dict
+        производительность стадии и глубина входной очереди
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        inbox: Optional[StageQueue] = None,
+        outputs: Optional[list[StageQueue]] = None,
+        threaded: bool = True,
+        stats_window: float = 1.0,
+        max_errors: int = 10,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта стадии.
+
+        Параметры:
+        ----------
+        name: str
+            имя стадии
+        func: Callable
+            функция обработки элемента
+        inbox: StageQueue | None, optional
+            входная очередь. По умолчанию None (источник).
+        outputs: list[StageQueue] | None, optional
+            выходные очереди. По умолчанию None.
+        threaded: bool, optional
+            выполнять стадию в отдельном потоке. По умолчанию True.
+        stats_window: float, optional
+            окно усреднения производительности (с). По умолчанию 1.0.
+        max_errors: int, optional
+            количество исключений подряд, после которого стадия
+            останавливается. По умолчанию 10.
+        """
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outputs = outputs or []
+        self.threaded = threaded
+        self.stats_window = stats_window
+        self.processed = 0
+        self.busy_time = 0.0
+        self.errors = 0
+        self.max_errors = max_errors
+        self.error: Optional[BaseException] = None
+        self._stop_event = Event()
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+        self._fps = 0.0
+
+    def run(self) -> None:
+        consecutive = 0
+        while not self._stop_event.is_set():
+            try:
+                if self.step():
+                    consecutive = 0
+            except Exception as error:
+                self.errors += 1
+                consecutive += 1
+                logger.exception(
+                    "Stage %s failed (%d in a row)", self.name, consecutive
+                )
+                if consecutive >= self.max_errors:
+                    logger.error(
+                        "Stage %s stopped after %d errors", self.name, consecutive
+                    )
+                    self.error = error
+                    self._stop_event.set()
+
+    def step(self, timeout: float = 0.1) -> bool:
+        """
+        Обработка одного элемента.
+
+        Позволяет выполнять стадию в вызывающем потоке (например, вывод
+        изображения, который должен выполняться в главном потоке).
+
+        Параметры:
+        ----------
+        timeout: float, optional
+            максимальное время ожидания элемента (с). По умолчанию 0.1.
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            True, если элемент был обработан
+        """
+        if self.inbox is not None:
+            item = self.inbox.get(timeout)
+            if item is None:
+                return False
+            start = time.perf_counter()
+            result = self.func(item)
+        else:
+            start = time.perf_counter()
+            result = self.func()
+        self._account(start)
+        if result is not None:
+            for output in self.outputs:
+                output.put(result)
+        return True
+
+    def _account(self, start: float) -> None:
+        """Учет времени обработки и производительности стадии."""
+        now = time.perf_counter()
+        self.busy_time += now - start
+        self.processed += 1
+        self._window_count += 1
+        elapsed = now - self._window_start
+        if elapsed >= self.stats_window:
+            self._fps = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+    def stop(self) -> None:
+        """Остановка стадии."""
+        self._stop_event.set()
+
+    def stats(self) -> dict:
+        """
+        Производительность стадии и глубина входной очереди.
+
+        Возвращаемое значение:
+        ----------------------
+        dict:
+            fps - элементов в секунду за последнее окно,
+            mean_ms - среднее время обработки элемента (мс),
+            queue_depth - глубина входной очереди,
+            dropped - количество отброшенных элементов входной очереди,
+            errors - количество исключений функции обработки
+        """
+        return {
+            "fps": self._fps,
+            "mean_ms": (
+                1000.0 * self.busy_time / self.processed if self.processed else 0.0
+            ),
+            "queue_depth": self.inbox.depth if self.inbox is not None else 0,
+            "dropped": self.inbox.dropped if self.inbox is not None else 0,
+            "errors": self.errors,
+        }
+
+
+class Pipeline:
+    """
+    Конвейер из стадий, соединенных очередями.
+
+    Методы:
+    ----------
+    add_stage(name, func, inbox, outputs, threaded): Stage
+        добавление стадии
+    start():
+        запуск всех стадий, выполняемых в отдельных потоках
+    stop():
+        остановка всех стадий
+    check():
+        повторный выброс исключения остановившейся стадии
+    stats(): dict
+        статистика всех стадий
+    """
+
+    def __init__(self) -> None:
+        self.stages: list[Stage] = []
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable,
+        inbox: Optional[StageQueue] = None,
+        outputs: Optional[list[StageQueue]] = None,
+        threaded: bool = True,
+    ) -> Stage:
+        """
+        Добавление стадии в конвейер.
+
+        Параметры:
+        ----------
+        name: str
+            имя стадии
+        func: Callable
+            функция обработки элемента
+        inbox: StageQueue | None, optional
+            входная очередь. По умолчанию None (источник).
+        outputs: list[StageQueue] | None, optional
+            выходные очереди. По умолчанию None.
+        threaded: bool, optional
+            выполнять стадию в отдельном потоке. Иначе стадия выполняется
+            вызовом Stage.step() в вызывающем потоке. По умолчанию True.
+
+        Возвращаемое значение:
+        ----------------------
+        Stage:
+            созданная стадия
+        """
+        stage = Stage(name, func, inbox, outputs, threaded)
+        self.stages.append(stage)
+        return stage
+
+    def start(self) -> None:
+        """Запуск всех стадий, выполняемых в отдельных потоках."""
+        for stage in self.stages:
+            if stage.threaded:
+                stage.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Остановка всех стадий."""
+        for stage in self.stages:
+            stage.stop()
+        for stage in self.stages:
+            if stage.is_alive():
+                stage.join(timeout)
+
+    def check(self) -> None:
+        """
+        Повторный выброс исключения стадии, остановленной после max_errors
+        исключений подряд. Вызывается в главном потоке.
+        """
+        for stage in self.stages:
+            if stage.error is not None:
+                raise RuntimeError(
+                    f"Pipeline stage {stage.name} failed"
+                ) from stage.error
+
+    def stats(self) -> dict:
+        """
+        Статистика всех стадий.
+
+        Возвращаемое значение:
+        ----------------------
+        dict:
+            статистика каждой стадии по имени
+        """
+        return {stage.name: stage.stats() for stage in self.stages}
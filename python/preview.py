@@ -0,0 +1,268 @@
+"""
+Модуль для просмотра кадров в режиме без дисплея через локальный HTTP MJPEG поток
+    Классы:
+        MjpegPreview
+
+"""
+
+import copy
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Condition, Thread
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+from calibration import CameraCalibration
+from marker import Marker, marker_centers
+
+BOUNDARY = "frame"
+
+
+class MjpegPreview:
+    """
+    Сервер уменьшенного прореженного MJPEG потока для просмотра.
+
+    Основной цикл передает кадры методом submit. Кадр копируется (с
+    уменьшением) только если подключен хотя бы один клиент и с момента
+    предыдущего кадра просмотра прошло не меньше 1/fps секунд. Изображение
+    контура и информации о маркере, а также кодирование в JPEG выполняются
+    в отдельном потоке и не замедляют поиск маркера.
+
+    С параметрами камеры (calibration) кадр просмотра выводится без
+    дисторсии (CameraCalibration.undistort_frame в потоке кодирования),
+    координаты маркера также переводятся в кадр без дисторсии.
+
+    Атрибуты:
+    ----------
+    host: str
+        адрес сервера
+    port: int
+        порт сервера
+    fps: float
+        частота кадров просмотра
+    scale: float
+        коэффициент уменьшения кадра
+    quality: int
+        качество JPEG
+    clients: int
+        количество подключенных клиентов
+    calibration: CameraCalibration | None
+        параметры камеры для коррекции дисторсии кадров просмотра
+
+    Методы:
+    ----------
+    start():
+        запуск сервера и потока кодирования
+    submit(frame, marker): bool
+        передача кадра и состояния маркера для просмотра
+    stop():
+        остановка сервера
+    """
+
+    def __init__(
+        self,
+        host: str = config.PREVIEW_HOST,
+        port: int = config.PREVIEW_PORT,
+        fps: float = config.PREVIEW_FPS,
+        scale: float = config.PREVIEW_SCALE,
+        quality: int = config.PREVIEW_JPEG_QUALITY,
+        calibration: Optional[CameraCalibration] = None,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта просмотра.
+
+        Параметры:
+        ----------
+        host: str, optional
+            адрес сервера. По умолчанию config.PREVIEW_HOST.
+        port: int, optional
+            порт сервера. По умолчанию config.PREVIEW_PORT.
+        fps: float, optional
+            частота кадров просмотра. По умолчанию config.PREVIEW_FPS.
+        scale: float, optional
+            коэффициент уменьшения кадра. По умолчанию config.PREVIEW_SCALE.
+        quality: int, optional
+            качество JPEG. По умолчанию config.PREVIEW_JPEG_QUALITY.
+        calibration: CameraCalibration | None, optional
+            параметры камеры, None - кадры с дисторсией. По умолчанию None.
+        """
+        self.host = host
+        self.port = port
+        self.fps = fps
+        self.scale = scale
+        self.quality = quality
+        self.clients = 0
+        self.calibration = calibration
+        # параметры камеры для разрешения кадра просмотра (таблицы remap)
+        self._preview_calibration: Optional[CameraCalibration] = None
+        self._interval = 1.0 / fps
+        self._last_submit = 0.0
+        self._pending: Optional[tuple[np.ndarray, Marker]] = None
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_seq = 0
+        self._running = False
+        self._cond = Condition()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> None:
+        """Запуск HTTP сервера и потока кодирования."""
+        self._running = True
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        Thread(target=self._encode_loop, daemon=True).start()
+
+    def stop(self) -> None:
+        """Остановка HTTP сервера и потока кодирования."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def submit(self, frame: np.ndarray, marker: Marker, frame_scale: int = 1) -> bool:
+        """
+        Передача кадра и состояния маркера для просмотра.
+
+        Параметры:
+        ----------
+        frame: np.ndarray
+            кадр (не изменяется, BGR или оттенки серого)
+        marker: Marker
+            маркер, найденный на кадре (координаты кадра камеры)
+        frame_scale: int, optional
+            во сколько раз кадр меньше кадра камеры. По умолчанию 1.
+
+        Возвращаемое значение:
+        ----------------------
+        bool:
+            True, если кадр принят для просмотра
+        """
+        now = time.monotonic()
+        if self.clients == 0 or now - self._last_submit < self._interval:
+            return False
+        self._last_submit = now
+        fx = self.scale * frame_scale
+        small = cv2.resize(frame, None, fx=fx, fy=fx, interpolation=cv2.INTER_NEAREST)
+        snapshot = copy.copy(marker)
+        if self.calibration is not None:
+            height, width = frame.shape[:2]
+            resolution = (width * frame_scale, height * frame_scale)
+            self._undistort_marker(snapshot, self.calibration.scaled(resolution))
+        with self._cond:
+            self._pending = (small, self._scale_marker(snapshot))
+            self._cond.notify_all()
+        return True
+
+    def _scale_marker(self, marker: Marker) -> Marker:
+        """
+        Копия маркера с координатами в масштабе кадра просмотра.
+
+        rescale копии переводит все координаты, по которым рисуется маркер
+        (в том числе corners/centers/sizes MultiArucoMarker).
+        """
+        snapshot = copy.copy(marker)
+        snapshot.rescale(self.scale)
+        if hasattr(snapshot, "radius"):
+            snapshot.radius = snapshot.radius * self.scale
+        return snapshot
+
+    @staticmethod
+    def _undistort_marker(marker: Marker, calibration: CameraCalibration) -> None:
+        """Перевод координат копии маркера в кадр без дисторсии."""
+        if marker.points is not None and len(marker.points) > 0:
+            marker.points = calibration.undistort_points(marker.points)
+            marker.center = marker_centers(marker.points[:1])[0].tolist()
+        if len(getattr(marker, "ids", ())) > 0:
+            marker.corners = calibration.undistort_points(marker.corners)
+            marker.centers = marker_centers(marker.corners)
+
+    def _undistort_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Коррекция дисторсии кадра просмотра."""
+        height, width = frame.shape[:2]
+        if (
+            self._preview_calibration is None
+            or self._preview_calibration.resolution != (width, height)
+        ):
+            self._preview_calibration = self.calibration.scaled((width, height))
+        return self._preview_calibration.undistort_frame(frame)
+
+    def _encode_loop(self) -> None:
+        """Изображение информации о маркере и кодирование кадров в JPEG."""
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._pending is not None or not self._running
+                )
+                if not self._running:
+                    return
+                frame, marker = self._pending
+                self._pending = None
+            if self.calibration is not None:
+                frame = self._undistort_frame(frame)
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            if marker.center is not None:
+                marker.draw_contour(frame)
+            marker.print_info(frame)
+            ret, jpeg = cv2.imencode(".jpg", frame, params)
+            if not ret:
+                continue
+            with self._cond:
+                self._jpeg = jpeg.tobytes()
+                self._jpeg_seq += 1
+                self._cond.notify_all()
+
+    def _next_jpeg(self, after_seq: int) -> tuple[Optional[bytes], int]:
+        """Ожидание JPEG кадра с номером больше after_seq."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._jpeg_seq > after_seq or not self._running, timeout=1.0
+            )
+            return self._jpeg, self._jpeg_seq
+
+    def _handler(self) -> type:
+        """Класс обработчика HTTP запросов, связанный с объектом просмотра."""
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path not in ("/", "/stream.mjpg"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header(
+                    "Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+                )
+                self.end_headers()
+                with preview._cond:
+                    preview.clients += 1
+                seq = preview._jpeg_seq
+                try:
+                    while preview._running:
+                        jpeg, new_seq = preview._next_jpeg(seq)
+                        if jpeg is None or new_seq == seq:
+                            continue
+                        seq = new_seq
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode()
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with preview._cond:
+                        preview.clients -= 1
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
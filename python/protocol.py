@@ -0,0 +1,288 @@
+"""
+Модуль двоичного протокола управления Arduino
+    Классы:
+        ControlMessage
+        FrameDecoder
+    Функции:
+        crc8
+        encode
+        decode
+
+Формат кадра (версия 1, 9 байт, little-endian):
+
+    байт 0      0xA5 - начало кадра
+    байт 1      версия (старшие 4 бита) и флаги (младшие 4 бита):
+                бит 0 - маркер найден, бит 1 - маркер подтвержден
+                (valid_frame_count кадров подряд), биты 2-3 - направление
+                текстового протокола (0 - S, 1 - F, 2 - L, 3 - R)
+    байт 2      номер кадра (младшие 8 бит)
+    байты 3-4   отклонение от центра кадра eps * 32767, int16
+    байты 5-6   расстояние до маркера (мм), uint16
+    байт 7      id маркера (0xFF - нет маркера)
+    байт 8      CRC-8 (полином 0x07) байтов 1-7
+
+Направление передается вместе с непрерывными значениями, поэтому плата
+может как управлять пропорционально по eps, так и работать по-старому.
+Справочный декодер для Arduino: arduino/control_decoder.
+"""
+
+import struct
+from typing import Optional
+
+SYNC = 0xA5
+VERSION = 1
+FRAME_SIZE = 9
+NO_MARKER = 0xFF
+DIRECTIONS = "SFLR"
+FLAG_FOUND = 0x01
+FLAG_VALID = 0x02
+
+_BODY = struct.Struct("<BBhHB")
+
+
+def _crc8_table() -> list[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return table
+
+
+_CRC8_TABLE = _crc8_table()
+
+
+def crc8(data: bytes) -> int:
+    """
+    CRC-8 (полином 0x07, начальное значение 0).
+
+    Параметры:
+    ----------
+    data: bytes
+        данные
+
+    Возвращаемое значение:
+    ----------------------
+    int:
+        контрольная сумма
+    """
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+class ControlMessage:
+    """
+    Класс команды управления.
+
+    Атрибуты:
+    ----------
+    seq: int
+        номер кадра
+    steering: float
+        отклонение маркера от центра кадра [-1.0;1.0]
+    distance: float
+        расстояние до маркера (мм)
+    marker_id: int | None
+        id маркера
+    found: bool
+        маркер найден на кадре
+    valid: bool
+        маркер подтвержден valid_frame_count кадрами подряд
+    direction: str
+        направление текстового протокола ('S', 'F', 'L', 'R')
+
+    Методы:
+    ----------
+    from_marker(marker, seq): ControlMessage
+        команда по состоянию маркера после get_direction
+    """
+
+    __slots__ = (
+        "seq",
+        "steering",
+        "distance",
+        "marker_id",
+        "found",
+        "valid",
+        "direction",
+    )
+
+    def __init__(
+        self,
+        seq: int,
+        steering: float = 0.0,
+        distance: float = 0.0,
+        marker_id: Optional[int] = None,
+        found: bool = False,
+        valid: bool = False,
+        direction: str = "S",
+    ) -> None:
+        self.seq = seq
+        self.steering = steering
+        self.distance = distance
+        self.marker_id = marker_id
+        self.found = found
+        self.valid = valid
+        self.direction = direction
+
+    @classmethod
+    def from_marker(cls, marker, seq: int) -> "ControlMessage":
+        """
+        Команда по состоянию маркера после get_direction.
+
+        Параметры:
+        ----------
+        marker: Marker
+            маркер
+        seq: int
+            номер кадра
+
+        Возвращаемое значение:
+        ----------------------
+        ControlMessage:
+            команда
+        """
+        found = marker.center is not None
+        return cls(
+            seq,
+            steering=marker.eps,
+            distance=marker.distance,
+            marker_id=marker.valid_id if found else None,
+            found=found,
+            valid=marker.valid,
+            direction=marker.direction,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ControlMessage):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"ControlMessage({fields})"
+
+
+def encode(message: ControlMessage) -> bytes:
+    """
+    Кодирование команды в кадр протокола.
+
+    Значения вне диапазона ограничиваются: steering - [-1.0;1.0],
+    distance - [0;65535] мм.
+
+    Параметры:
+    ----------
+    message: ControlMessage
+        команда
+
+    Возвращаемое значение:
+    ----------------------
+    bytes:
+        кадр FRAME_SIZE байт
+    """
+    flags = DIRECTIONS.index(message.direction) << 2
+    if message.found:
+        flags |= FLAG_FOUND
+    if message.valid:
+        flags |= FLAG_VALID
+    steering = round(max(-1.0, min(1.0, message.steering)) * 32767)
+    distance = round(max(0.0, min(65535.0, message.distance)))
+    marker_id = NO_MARKER if message.marker_id is None else message.marker_id & 0xFF
+    body = _BODY.pack(
+        (VERSION << 4) | flags, message.seq & 0xFF, steering, distance, marker_id
+    )
+    return bytes((SYNC,)) + body + bytes((crc8(body),))
+
+
+def decode(frame: bytes) -> ControlMessage:
+    """
+    Декодирование кадра протокола.
+
+    Параметры:
+    ----------
+    frame: bytes
+        кадр FRAME_SIZE байт
+
+    Возвращаемое значение:
+    ----------------------
+    ControlMessage:
+        команда (steering и distance с точностью кодирования)
+    """
+    if len(frame) != FRAME_SIZE or frame[0] != SYNC:
+        raise ValueError("Not a control frame")
+    body = frame[1:-1]
+    if crc8(body) != frame[-1]:
+        raise ValueError("Control frame checksum mismatch")
+    header, seq, steering, distance, marker_id = _BODY.unpack(body)
+    if header >> 4 != VERSION:
+        raise ValueError(f"Unsupported control protocol version {header >> 4}")
+    return ControlMessage(
+        seq,
+        steering=steering / 32767,
+        distance=float(distance),
+        marker_id=None if marker_id == NO_MARKER else marker_id,
+        found=bool(header & FLAG_FOUND),
+        valid=bool(header & FLAG_VALID),
+        direction=DIRECTIONS[(header >> 2) & 0x03],
+    )
+
+
+class FrameDecoder:
+    """
+    Класс потокового декодера: выделяет кадры из произвольных фрагментов
+    данных и пропускает поврежденные байты.
+
+    Атрибуты:
+    ----------
+    errors: int
+        количество отброшенных байтов (нет начала кадра, ошибка CRC или версии)
+
+    Методы:
+    ----------
+    feed(data): list[ControlMessage]
+        добавление данных и декодирование полных кадров
+    """
+
+    def __init__(self) -> None:
+        self.errors = 0
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[ControlMessage]:
+        """
+        Добавление данных и декодирование полных кадров.
+
+        Параметры:
+        ----------
+        data: bytes
+            принятые данные
+
+        Возвращаемое значение:
+        ----------------------
+        list[ControlMessage]:
+            декодированные команды
+        """
+        self._buffer += data
+        messages = []
+        while len(self._buffer) >= FRAME_SIZE:
+            start = self._buffer.find(SYNC)
+            if start < 0:
+                self.errors += len(self._buffer)
+                self._buffer.clear()
+                break
+            if start > 0:
+                self.errors += start
+                del self._buffer[:start]
+                continue
+            try:
+                messages.append(decode(bytes(self._buffer[:FRAME_SIZE])))
+            except ValueError:
+                self.errors += 1
+                del self._buffer[:1]
+                continue
+            del self._buffer[:FRAME_SIZE]
+        return messages
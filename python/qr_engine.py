@@ -0,0 +1,202 @@
+"""
+Модуль для поиска QR кодов с повторным использованием декодированных данных
+    Классы:
+        QRCodeEngine
+
+Поиск разделен на два шага: нахождение четырехугольников кодов на кадре
+(cv2.QRCodeDetector.detectMulti, все коды за один проход) и декодирование
+данных (decodeMulti). Декодирование дорогое, поэтому данные кода
+запоминаются: четырехугольник на новом кадре сопоставляется с кодами
+предыдущих кадров по положению центра и размеру. Декодируются только
+новые четырехугольники и четырехугольники, сместившиеся от положения при
+последнем декодировании больше чем на max_shift размера кода; все они
+декодируются одним вызовом. Код, не найденный max_age кадров подряд,
+забывается.
+"""
+
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+
+
+class _CachedCode:
+    """Код, найденный на предыдущих кадрах."""
+
+    __slots__ = ("payload", "corners", "anchor", "missed")
+
+    def __init__(self, payload: str, corners: np.ndarray) -> None:
+        self.payload = payload
+        self.corners = corners
+        self.anchor = corners  # углы при последнем декодировании
+        self.missed = 0
+
+
+def _size(corners: np.ndarray) -> float:
+    """Размер кода (средняя длина диагонали, пиксели)."""
+    return 0.5 * float(
+        np.linalg.norm(corners[2] - corners[0])
+        + np.linalg.norm(corners[3] - corners[1])
+    )
+
+
+class QRCodeEngine:
+    """
+    Класс для поиска QR кодов с кэшем декодированных данных.
+
+    Атрибуты:
+    ----------
+    detector: cv2.QRCodeDetector
+        детектор QR кодов
+    multi: bool
+        поиск нескольких кодов на кадре
+    max_shift: float
+        смещение кода (в долях его размера), после которого код декодируется заново
+    max_age: int
+        количество кадров без кода, после которого код забывается
+    frames: int
+        количество обработанных кадров
+    decodes: int
+        количество декодированных четырехугольников
+    cache_hits: int
+        количество четырехугольников с данными из кэша
+
+    Методы:
+    ----------
+    find(frame): list[tuple[str, np.ndarray]]
+        данные и углы всех найденных кодов
+    reset():
+        очистка кэша
+    """
+
+    def __init__(
+        self,
+        multi: bool = config.QR_MULTI,
+        max_shift: float = config.QR_MAX_SHIFT,
+        max_age: int = config.QR_MAX_AGE,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта поиска.
+
+        Параметры:
+        ----------
+        multi: bool, optional
+            поиск нескольких кодов на кадре. По умолчанию config.QR_MULTI.
+        max_shift: float, optional
+            смещение для повторного декодирования (доля размера кода). По умолчанию config.QR_MAX_SHIFT.
+        max_age: int, optional
+            количество кадров без кода до удаления из кэша. По умолчанию config.QR_MAX_AGE.
+        """
+        self.detector = cv2.QRCodeDetector()
+        self.multi = multi
+        self.max_shift = max_shift
+        self.max_age = max_age
+        self.frames = 0
+        self.decodes = 0
+        self.cache_hits = 0
+        self._cache: list[_CachedCode] = []
+
+    def reset(self) -> None:
+        """Очистка кэша декодированных кодов."""
+        self._cache = []
+
+    def _locate(self, frame: np.ndarray) -> np.ndarray:
+        """Углы всех кодов на кадре, форма (N, 4, 2)."""
+        if self.multi:
+            found, points = self.detector.detectMulti(frame)
+        else:
+            found, points = self.detector.detect(frame)
+        if not found or points is None:
+            return np.empty((0, 4, 2), dtype=np.float32)
+        return np.asarray(points, dtype=np.float32).reshape(-1, 4, 2)
+
+    def _match(self, corners: np.ndarray, used: set[int]) -> Optional[_CachedCode]:
+        """Код из кэша с ближайшим центром и близким размером."""
+        center = corners.mean(axis=0)
+        size = _size(corners)
+        best, best_distance = None, np.inf
+        for index, code in enumerate(self._cache):
+            if index in used:
+                continue
+            distance = float(np.linalg.norm(code.corners.mean(axis=0) - center))
+            code_size = _size(code.corners)
+            # за один кадр код смещается не больше своего размера
+            if distance < max(size, code_size) and distance < best_distance:
+                if 0.5 < size / max(code_size, 1e-6) < 2.0:
+                    best, best_distance = index, distance
+        if best is None:
+            return None
+        used.add(best)
+        return self._cache[best]
+
+    def find(self, frame: np.ndarray) -> list[tuple[str, np.ndarray]]:
+        """
+        Поиск всех QR кодов на кадре.
+
+        Параметры:
+        ----------
+        frame: np.ndarray
+            кадр (BGR или оттенки серого)
+
+        Возвращаемое значение:
+        ----------------------
+        list[tuple[str, np.ndarray]]:
+            данные и углы (форма (4, 2)) каждого декодированного кода
+        """
+        self.frames += 1
+        quads = self._locate(frame)
+        used: set[int] = set()
+        matched: list[Optional[_CachedCode]] = []
+        pending = []
+        for i, corners in enumerate(quads):
+            code = self._match(corners, used)
+            matched.append(code)
+            if code is not None:
+                shift = float(np.abs(corners - code.anchor).max())
+                if shift <= self.max_shift * _size(code.anchor):
+                    self.cache_hits += 1
+                    continue
+            pending.append(i)
+
+        payloads: dict[int, str] = {}
+        if pending:
+            self.decodes += len(pending)
+            payloads = self._decode(frame, quads[pending], pending)
+
+        codes = []
+        seen = set()
+        for i, corners in enumerate(quads):
+            code = matched[i]
+            if i in pending:
+                payload = payloads.get(i, "")
+                if not payload:
+                    continue  # не декодирован - повтор на следующем кадре
+                if code is None or code.payload != payload:
+                    code = _CachedCode(payload, corners)
+                    self._cache.append(code)
+                code.anchor = corners
+            code.corners = corners
+            code.missed = 0
+            seen.add(id(code))
+            codes.append((code.payload, corners))
+
+        for code in self._cache:
+            if id(code) not in seen:
+                code.missed += 1
+        self._cache = [code for code in self._cache if code.missed <= self.max_age]
+        return codes
+
+    def _decode(
+        self, frame: np.ndarray, quads: np.ndarray, indices: list[int]
+    ) -> dict[int, str]:
+        """Декодирование четырехугольников одним вызовом."""
+        try:
+            if len(quads) == 1:
+                payload, _ = self.detector.decode(frame, quads)
+                payloads = (payload,)
+            else:
+                _, payloads, _ = self.detector.decodeMulti(frame, quads)
+        except cv2.error:
+            return {}
+        return dict(zip(indices, payloads))
@@ -0,0 +1,320 @@
+"""
+Модуль для записи кадров камеры с результатами поиска маркера
+    Классы:
+        FlightRecorder
+        RecordingReader
+
+Запись состоит из двух файлов:
+    <path>.mjpeg - сжатые кадры подряд (поток MJPEG, открывается ffplay -f mjpeg);
+    <path>.idx - индекс, по записи INDEX_DTYPE на кадр: смещение и размер
+    кадра в .mjpeg, номер и время захвата кадра, результат поиска маркера.
+
+Кадры из захвата в режиме passthrough (Frame.jpeg) записываются без
+декодирования и повторного кодирования, поэтому запись стоит одной
+операции записи в файл на кадр. Кадры без Frame.jpeg (например, поток
+GoPro) кодируются в JPEG в потоке записи. Запись в файл выполняется в
+отдельном потоке, основной цикл только помещает кадр в очередь; при
+переполнении очереди самый старый кадр отбрасывается (dropped).
+
+Индекс записывается после кадра и отображается в память (numpy.memmap),
+место в нем выделяется блоками. При чтении (RecordingReader) индекс
+отображается в память только для чтения, переход к кадру по номеру или
+времени не требует чтения записи с начала.
+"""
+
+import argparse
+import os
+from threading import Thread
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+from marker import Marker
+from pipeline import StageQueue
+from video_capture import Frame
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("offset", "<u8"),
+        ("size", "<u4"),
+        ("seq", "<i8"),
+        ("timestamp", "<f8"),
+        ("found", "u1"),
+        ("valid", "u1"),
+        ("direction", "S1"),
+        ("distance", "<f4"),
+        ("eps", "<f4"),
+        ("center", "<f4", (2,)),
+    ]
+)
+
+
+class FlightRecorder(Thread):
+    """
+    Поток записи кадров и результатов поиска маркера.
+
+    Атрибуты:
+    ----------
+    path: str
+        путь к записи без расширения
+    written: int
+        количество записанных кадров
+    encoded: int
+        количество кадров, закодированных в JPEG при записи
+    dropped: int
+        количество кадров, отброшенных при переполнении очереди
+    bytes_written: int
+        размер записанных кадров (байты)
+
+    Методы:
+    ----------
+    record(frame, marker):
+        передача кадра и результата поиска маркера для записи
+    stop():
+        запись оставшихся кадров и закрытие файлов
+    """
+
+    def __init__(
+        self,
+        path: str = config.RECORDER_PATH,
+        queue_size: int = config.RECORDER_QUEUE_SIZE,
+        quality: int = config.RECORDER_JPEG_QUALITY,
+        index_block: int = 4096,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта записи.
+
+        Параметры:
+        ----------
+        path: str, optional
+            путь к записи без расширения. По умолчанию config.RECORDER_PATH.
+        queue_size: int, optional
+            размер очереди кадров. По умолчанию config.RECORDER_QUEUE_SIZE.
+        quality: int, optional
+            качество JPEG для кадров без Frame.jpeg. По умолчанию config.RECORDER_JPEG_QUALITY.
+        index_block: int, optional
+            количество записей индекса, выделяемых за раз. По умолчанию 4096.
+        """
+        super().__init__(name="recorder", daemon=True)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.quality = quality
+        self.index_block = index_block
+        self.written = 0
+        self.encoded = 0
+        self.bytes_written = 0
+        self._queue = StageQueue(queue_size, StageQueue.DROP_OLDEST)
+        self._data = open(path + ".mjpeg", "wb")
+        self._index_file = open(path + ".idx", "wb+")
+        self._index: Optional[np.memmap] = None
+        self._running = True
+
+    @property
+    def dropped(self) -> int:
+        return self._queue.dropped
+
+    def record(self, frame: Frame, marker: Marker) -> None:
+        """
+        Передача кадра и результата поиска маркера для записи (без ожидания).
+
+        Параметры:
+        ----------
+        frame: Frame
+            кадр
+        marker: Marker
+            маркер после find_contour и get_direction
+        """
+        # буфер кадра перезаписывается захватом, сжатый кадр - нет
+        image = frame.image.copy() if frame.jpeg is None else None
+        center = marker.center if marker.center is not None else (np.nan, np.nan)
+        entry = (
+            frame.seq,
+            frame.timestamp,
+            marker.center is not None,
+            marker.valid,
+            marker.direction,
+            marker.distance,
+            getattr(marker, "eps", 0.0),
+            center,
+        )
+        self._queue.put((frame.jpeg, image, entry))
+
+    def run(self) -> None:
+        while self._running or self._queue.depth > 0:
+            item = self._queue.get(timeout=0.1)
+            if item is not None:
+                self._write(*item)
+        self._close()
+
+    def _write(
+        self, jpeg: Optional[np.ndarray], image: Optional[np.ndarray], entry: tuple
+    ) -> None:
+        """Запись кадра и записи индекса."""
+        if jpeg is None:
+            _, jpeg = cv2.imencode(
+                ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+            )
+            self.encoded += 1
+        data = memoryview(jpeg).cast("B")
+        offset = self.bytes_written
+        self._data.write(data)
+        self.bytes_written += len(data)
+        if self._index is None or self.written == len(self._index):
+            self._grow_index()
+        self._index[self.written] = (offset, len(data)) + entry
+        self.written += 1
+
+    def _grow_index(self) -> None:
+        """Выделение следующего блока индекса."""
+        size = (0 if self._index is None else len(self._index)) + self.index_block
+        if self._index is not None:
+            self._index.flush()
+        self._index_file.truncate(size * INDEX_DTYPE.itemsize)
+        self._index = np.memmap(self._index_file, INDEX_DTYPE, "r+", shape=(size,))
+
+    def _close(self) -> None:
+        """Закрытие файлов, индекс обрезается до количества кадров."""
+        self._data.close()
+        if self._index is not None:
+            self._index.flush()
+            self._index = None
+        self._index_file.truncate(self.written * INDEX_DTYPE.itemsize)
+        self._index_file.close()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Запись оставшихся в очереди кадров и закрытие файлов."""
+        self._running = False
+        if self.is_alive():
+            self.join(timeout)
+        elif not self._data.closed:
+            self._close()
+
+
+class RecordingReader:
+    """
+    Чтение записи FlightRecorder с переходом к любому кадру.
+
+    Атрибуты:
+    ----------
+    index: np.ndarray
+        индекс записи (INDEX_DTYPE), отображенный в память
+    position: int
+        номер следующего кадра для read
+
+    Методы:
+    ----------
+    jpeg(i): np.ndarray
+        сжатый кадр i
+    frame(i): np.ndarray
+        декодированный кадр i
+    seek(i):
+        переход к кадру i
+    seek_time(timestamp): int
+        переход к первому кадру не раньше timestamp
+    read(): tuple[bool, np.ndarray]
+        чтение следующего кадра, как cv2.VideoCapture.read
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Параметры:
+        ----------
+        path: str
+            путь к записи без расширения
+        """
+        self.path = path
+        count = os.path.getsize(path + ".idx") // INDEX_DTYPE.itemsize
+        if count > 0:
+            index = np.memmap(path + ".idx", INDEX_DTYPE, "r", shape=(count,))
+            # запись прервана без stop: хвост выделенного блока не заполнен
+            self.index = index[: np.count_nonzero(index["size"])]
+        else:
+            self.index = np.empty(0, dtype=INDEX_DTYPE)
+        if os.path.getsize(path + ".mjpeg") > 0:
+            self._data = np.memmap(path + ".mjpeg", np.uint8, "r")
+        else:
+            self._data = np.empty(0, dtype=np.uint8)
+        self.position = 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def jpeg(self, i: int) -> np.ndarray:
+        """Сжатый кадр i без копирования."""
+        offset, size = int(self.index["offset"][i]), int(self.index["size"][i])
+        return self._data[offset : offset + size]
+
+    def frame(self, i: int) -> np.ndarray:
+        """Декодированный кадр i."""
+        return cv2.imdecode(np.asarray(self.jpeg(i)), cv2.IMREAD_COLOR)
+
+    def seek(self, i: int) -> None:
+        """Переход к кадру i."""
+        self.position = max(0, min(i, len(self)))
+
+    def seek_time(self, timestamp: float) -> int:
+        """
+        Переход к первому кадру, захваченному не раньше timestamp.
+
+        Параметры:
+        ----------
+        timestamp: float
+            время захвата (time.monotonic записи, с)
+
+        Возвращаемое значение:
+        ----------------------
+        int:
+            номер кадра
+        """
+        self.seek(int(np.searchsorted(self.index["timestamp"], timestamp)))
+        return self.position
+
+    def read(self) -> tuple[bool, Optional[np.ndarray]]:
+        """Чтение следующего кадра."""
+        if self.position >= len(self):
+            return False, None
+        image = self.frame(self.position)
+        self.position += 1
+        return image is not None, image
+
+    def release(self) -> None:
+        self.index = None
+        self._data = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Просмотр записи FlightRecorder")
+    parser.add_argument("path", help="путь к записи без расширения")
+    parser.add_argument("--start", type=float, default=0.0, help="начало (с)")
+    args = parser.parse_args()
+
+    reader = RecordingReader(args.path)
+    if len(reader) > 0:
+        reader.seek_time(reader.index["timestamp"][0] + args.start)
+    print(f"{len(reader)} frames")
+    while True:
+        position = reader.position
+        ret, image = reader.read()
+        if not ret:
+            break
+        entry = reader.index[position]
+        text = (
+            f"{entry['seq']} {entry['direction'].decode()} "
+            f"{entry['distance']:.0f} mm {'valid' if entry['valid'] else ''}"
+        )
+        cv2.putText(
+            image,
+            text,
+            (0, 30),
+            config.FONT_STYLE,
+            config.FONT_SIZE,
+            config.FONT_COLOR,
+            config.FONT_THICKNESS,
+        )
+        cv2.imshow("Recording", image)
+        if cv2.waitKey(30) & 0xFF == ord("q"):
+            break
+    reader.release()
@@ -0,0 +1,334 @@
+"""
+Модуль для генерации синтетических кадров с Aruco маркером и точными
+эталонными значениями центра и расстояния
+    Функции:
+        default_focal
+        generate_scene
+        random_scene_params
+        generate_dataset
+        load_dataset
+
+Модель камеры - идеальная камера-обскура с фокусным расстоянием
+default_focal(width) = width * 500 / 720 (пиксели). При таком фокусном
+расстоянии Marker.get_distance с коэффициентом frame_width / 720 дает
+точное расстояние для маркера, расположенного параллельно кадру, поэтому
+ошибка расстояния на синтетических кадрах показывает только ошибку поиска
+углов и влияние поворота маркера.
+
+Запуск:
+    python synthetic.py out_dir [--count 200] [--width 1280] [--height 720]
+"""
+
+import argparse
+import csv
+import os
+from math import cos, radians, sin
+from typing import Optional
+
+import config
+import cv2
+import numpy as np
+
+GROUND_TRUTH_FILE = "ground_truth.csv"
+GROUND_TRUTH_FIELDS = [
+    "frame",
+    "marker_id",
+    "center_x",
+    "center_y",
+    "distance",
+    "x0",
+    "y0",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+    "x3",
+    "y3",
+]
+
+
+def default_focal(width: int) -> float:
+    """
+    Фокусное расстояние, согласованное с коэффициентом frame_width / 720.
+
+    Параметры:
+    ----------
+    width: int
+        ширина кадра
+
+    Возвращаемое значение:
+    ----------------------
+    float:
+        фокусное расстояние (пиксели)
+    """
+    return width * 500.0 / 720.0
+
+
+def _rotation(yaw: float, pitch: float, roll: float) -> np.ndarray:
+    """Матрица поворота маркера (углы в градусах)."""
+    a, b, c = radians(yaw), radians(pitch), radians(roll)
+    rot_y = np.array([[cos(a), 0, sin(a)], [0, 1, 0], [-sin(a), 0, cos(a)]])
+    rot_x = np.array([[1, 0, 0], [0, cos(b), -sin(b)], [0, sin(b), cos(b)]])
+    rot_z = np.array([[cos(c), -sin(c), 0], [sin(c), cos(c), 0], [0, 0, 1]])
+    return rot_z @ rot_y @ rot_x
+
+
+def generate_scene(
+    width: int = config.FRAME_WIDTH,
+    height: int = config.FRAME_HEIGHT,
+    distance: float = 1000.0,
+    offset: tuple[float, float] = (0.0, 0.0),
+    angles: tuple[float, float, float] = (0.0, 0.0, 0.0),
+    blur: float = 0.0,
+    noise: float = 0.0,
+    brightness: float = 1.0,
+    gradient: float = 0.0,
+    marker_id: int = config.CORRECT_ID,
+    marker_true_size: float = config.MARKER_TRUE_SIZE,
+    focal: Optional[float] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> tuple[np.ndarray, dict]:
+    """
+    Генерация кадра с маркером config.ARUCO_TYPE.
+
+    Параметры:
+    ----------
+    width: int, optional
+        ширина кадра. По умолчанию config.FRAME_WIDTH.
+    height: int, optional
+        высота кадра. По умолчанию config.FRAME_HEIGHT.
+    distance: float, optional
+        расстояние от камеры до центра маркера вдоль оптической оси (мм).
+        По умолчанию 1000.
+    offset: tuple[float, float], optional
+        смещение центра маркера от центра кадра в долях половины ширины
+        и высоты кадра [-1.0;1.0]. По умолчанию (0, 0).
+    angles: tuple[float, float, float], optional
+        поворот маркера (рыскание, тангаж, крен), градусы. По умолчанию (0, 0, 0).
+    blur: float, optional
+        sigma размытия по Гауссу (пиксели). По умолчанию 0.
+    noise: float, optional
+        СКО гауссова шума (уровни яркости). По умолчанию 0.
+    brightness: float, optional
+        множитель яркости. По умолчанию 1.0.
+    gradient: float, optional
+        перепад освещенности слева направо (доля яркости). По умолчанию 0.
+    marker_id: int, optional
+        id маркера. По умолчанию config.CORRECT_ID.
+    marker_true_size: float, optional
+        реальный размер маркера (мм). По умолчанию config.MARKER_TRUE_SIZE.
+    focal: float | None, optional
+        фокусное расстояние (пиксели). По умолчанию default_focal(width).
+    rng: np.random.Generator | None, optional
+        генератор случайных чисел для фона и шума.
+
+    Возвращаемое значение:
+    ----------------------
+    tuple[np.ndarray, dict]:
+        кадр BGR и эталонные значения: center - проекция центра маркера,
+        distance - расстояние (мм), corners - проекции углов маркера
+        (в порядке Aruco), marker_id
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    focal = focal if focal is not None else default_focal(width)
+    cx, cy = width / 2.0, height / 2.0
+    camera = np.array([[focal, 0, cx], [0, focal, cy], [0, 0, 1]])
+
+    # центр маркера в системе координат камеры
+    position = np.array(
+        [offset[0] * cx * distance / focal, offset[1] * cy * distance / focal, distance]
+    )
+    half = marker_true_size / 2.0
+    local = np.array(
+        [[-half, -half, 0], [half, -half, 0], [half, half, 0], [-half, half, 0]]
+    )
+    world = local @ _rotation(*angles).T + position
+    projected = world @ camera.T
+    corners = (projected[:, :2] / projected[:, 2:]).astype(np.float32)
+    center = camera @ position
+    center = center[:2] / center[2]
+
+    # изображение маркера с белым полем шириной в одну клетку
+    dictionary = cv2.aruco.getPredefinedDictionary(config.ARUCO_TYPE)
+    cells = dictionary.markerSize + 2
+    cell = 32
+    side = cells * cell
+    marker = cv2.aruco.generateImageMarker(dictionary, marker_id, side)
+    marker = cv2.copyMakeBorder(
+        marker, cell, cell, cell, cell, cv2.BORDER_CONSTANT, value=255
+    )
+    src = np.float32(
+        [
+            [cell, cell],
+            [cell + side, cell],
+            [cell + side, cell + side],
+            [cell, cell + side],
+        ]
+    )
+    homography = cv2.getPerspectiveTransform(src, corners)
+
+    background = rng.integers(
+        90, 170, (height // 16 + 1, width // 16 + 1), dtype=np.uint8
+    )
+    background = cv2.resize(background, (width, height), interpolation=cv2.INTER_CUBIC)
+    warped = cv2.warpPerspective(
+        marker, homography, (width, height), flags=cv2.INTER_LINEAR, borderValue=0
+    )
+    mask = cv2.warpPerspective(
+        np.full_like(marker, 255), homography, (width, height), flags=cv2.INTER_LINEAR
+    )
+    alpha = mask.astype(np.float32) / 255.0
+    gray = alpha * warped + (1.0 - alpha) * background
+
+    light = brightness * (1.0 - gradient / 2.0 + gradient * np.linspace(0, 1, width))
+    gray = gray * light[np.newaxis, :].astype(np.float32)
+    if blur > 0:
+        gray = cv2.GaussianBlur(gray, (0, 0), blur)
+    if noise > 0:
+        gray = gray + rng.normal(0, noise, gray.shape).astype(np.float32)
+    frame = cv2.cvtColor(np.clip(gray, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+    truth = {
+        "marker_id": marker_id,
+        "center": [float(center[0]), float(center[1])],
+        "distance": float(distance),
+        "corners": corners,
+    }
+    return frame, truth
+
+
+def random_scene_params(
+    rng: np.random.Generator,
+    distance_range: tuple[float, float] = (500.0, 4000.0),
+    max_angle: float = 40.0,
+    max_blur: float = 1.5,
+    max_noise: float = 8.0,
+) -> dict:
+    """
+    Случайные параметры сцены для generate_scene.
+
+    Параметры:
+    ----------
+    rng: np.random.Generator
+        генератор случайных чисел
+    distance_range: tuple[float, float], optional
+        диапазон расстояний (мм). По умолчанию (500, 4000).
+    max_angle: float, optional
+        максимальный угол поворота маркера (градусы). По умолчанию 40.
+    max_blur: float, optional
+        максимальное размытие. По умолчанию 1.5.
+    max_noise: float, optional
+        максимальный шум. По умолчанию 8.
+
+    Возвращаемое значение:
+    ----------------------
+    dict:
+        именованные параметры generate_scene
+    """
+    return {
+        "distance": float(rng.uniform(*distance_range)),
+        "offset": tuple(rng.uniform(-0.6, 0.6, 2)),
+        "angles": (
+            float(rng.uniform(-max_angle, max_angle)),
+            float(rng.uniform(-max_angle, max_angle)),
+            float(rng.uniform(-180, 180)),
+        ),
+        "blur": float(rng.uniform(0, max_blur)),
+        "noise": float(rng.uniform(0, max_noise)),
+        "brightness": float(rng.uniform(0.6, 1.3)),
+        "gradient": float(rng.uniform(0, 0.5)),
+    }
+
+
+def generate_dataset(
+    out_dir: str,
+    count: int,
+    width: int = config.FRAME_WIDTH,
+    height: int = config.FRAME_HEIGHT,
+    seed: int = 0,
+    **ranges,
+) -> None:
+    """
+    Запись набора синтетических кадров и эталонных значений.
+
+    Кадры сохраняются в PNG (без потерь), эталонные значения - в
+    ground_truth.csv в том же каталоге.
+
+    Параметры:
+    ----------
+    out_dir: str
+        каталог для записи
+    count: int
+        количество кадров
+    width: int, optional
+        ширина кадра. По умолчанию config.FRAME_WIDTH.
+    height: int, optional
+        высота кадра. По умолчанию config.FRAME_HEIGHT.
+    seed: int, optional
+        начальное значение генератора случайных чисел. По умолчанию 0.
+    ranges:
+        диапазоны параметров для random_scene_params
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    with open(os.path.join(out_dir, GROUND_TRUTH_FILE), "w", newline="") as file:
+        writer = csv.DictWriter(file, GROUND_TRUTH_FIELDS)
+        writer.writeheader()
+        for index in range(count):
+            params = random_scene_params(rng, **ranges)
+            frame, truth = generate_scene(width, height, rng=rng, **params)
+            name = f"{index:06d}.png"
+            cv2.imwrite(os.path.join(out_dir, name), frame)
+            row = {
+                "frame": name,
+                "marker_id": truth["marker_id"],
+                "center_x": truth["center"][0],
+                "center_y": truth["center"][1],
+                "distance": truth["distance"],
+            }
+            for i, (x, y) in enumerate(truth["corners"]):
+                row[f"x{i}"], row[f"y{i}"] = float(x), float(y)
+            writer.writerow(row)
+
+
+def load_dataset(path: str) -> list[dict]:
+    """
+    Чтение эталонных значений набора кадров.
+
+    Параметры:
+    ----------
+    path: str
+        каталог набора
+
+    Возвращаемое значение:
+    ----------------------
+    list[dict]:
+        путь к кадру (path) и эталонные значения в формате generate_scene
+    """
+    samples = []
+    with open(os.path.join(path, GROUND_TRUTH_FILE), newline="") as file:
+        for row in csv.DictReader(file):
+            samples.append(
+                {
+                    "path": os.path.join(path, row["frame"]),
+                    "marker_id": int(row["marker_id"]),
+                    "center": [float(row["center_x"]), float(row["center_y"])],
+                    "distance": float(row["distance"]),
+                    "corners": np.array(
+                        [[float(row[f"x{i}"]), float(row[f"y{i}"])] for i in range(4)],
+                        dtype=np.float32,
+                    ),
+                }
+            )
+    return samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация синтетических кадров")
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--width", type=int, default=config.FRAME_WIDTH)
+    parser.add_argument("--height", type=int, default=config.FRAME_HEIGHT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_dataset(args.out_dir, args.count, args.width, args.height, args.seed)
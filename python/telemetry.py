@@ -0,0 +1,655 @@
+"""
+Модуль для рассылки результатов поиска маркера по локальному сокету
+    Классы:
+        TelemetryMessage
+        TelemetryPublisher
+        TelemetrySubscriber
+    Функции:
+        parse_address
+        encode
+        decode
+
+Результаты каждого обработанного кадра (id и углы найденных маркеров,
+центр, расстояние, отклонение, направление, время захвата и отправки)
+рассылаются двоичными датаграммами по UDP (udp://host:port) или Unix
+сокету (unix:///path). Подписчик отправляет издателю датаграмму SUB и
+повторяет ее чаще, чем истекает аренда (lease); подписчик, не продливший
+аренду или отправивший UNS, удаляется. Сообщения отправляются через
+отдельный неблокирующий сокет для каждого подписчика: если очередь
+подписчика заполнена, сообщение для него отбрасывается (dropped; для UDP
+датаграммы отбрасывает ядро при приеме, такие сообщения видны подписчику
+как missed). Неполученные датаграммы Unix сокета учитываются в буфере
+отправки сокета, поэтому общий сокет зависшего подписчика остановил бы
+рассылку всем; с отдельными сокетами медленный или зависший подписчик
+не задерживает ни основной цикл, ни других подписчиков. Датаграммы
+управления читаются при публикации, отдельный поток не нужен.
+
+Формат сообщения (версия 1, little-endian):
+
+    байты 0-1   b"NT"
+    байт 2      версия
+    байт 3      флаги: бит 0 - маркер найден, бит 1 - маркер подтвержден
+    байты 4-5   количество маркеров N, uint16
+    байты 6-9   номер кадра, uint32
+    байты 10-17 время захвата кадра (time.monotonic), float64
+    байты 18-25 время отправки сообщения (time.monotonic), float64
+    байт 26     направление ('S', 'F', 'L', 'R')
+    байты 27-30 отклонение от центра кадра eps, float32
+    байты 31-34 расстояние до маркера (мм), float32
+    байты 35-42 центр маркера (x, y; NaN - нет маркера), 2 x float32
+    далее N записей по 36 байт: id маркера int32, углы 4 x 2 float32
+
+Время отсчитывается по time.monotonic, общему для процессов одной машины,
+поэтому подписчик может вычислить задержку доставки.
+"""
+
+import argparse
+import os
+import socket
+import struct
+import time
+from typing import Iterator, Optional
+
+import config
+import numpy as np
+
+MAGIC = b"NT"
+VERSION = 1
+FLAG_FOUND = 0x01
+FLAG_VALID = 0x02
+SUBSCRIBE = b"SUB"
+UNSUBSCRIBE = b"UNS"
+RETRY_INTERVAL = 0.05  # повтор подписки, не принятой издателем (с)
+
+_HEADER = struct.Struct("<2sBBHIddcff2f")
+DETECTION_DTYPE = np.dtype([("id", "<i4"), ("corners", "<f4", (4, 2))])
+
+
+def parse_address(address: str) -> tuple[int, object]:
+    """
+    Семейство и адрес сокета по строке адреса.
+
+    Параметры:
+    ----------
+    address: str
+        'udp://host:port' или 'unix:///path'
+
+    Возвращаемое значение:
+    ----------------------
+    tuple[int, object]:
+        socket.AF_INET и (host, port) или socket.AF_UNIX и путь
+    """
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://") :]
+    if address.startswith("udp://"):
+        host, _, port = address[len("udp://") :].rpartition(":")
+        return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Unknown telemetry address: {address}")
+
+
+class TelemetryMessage:
+    """
+    Класс результатов поиска маркера на кадре.
+
+    Атрибуты:
+    ----------
+    seq: int
+        номер кадра
+    timestamp: float
+        время захвата кадра (time.monotonic)
+    sent: float
+        время отправки сообщения (time.monotonic)
+    found: bool
+        маркер найден на кадре
+    valid: bool
+        маркер подтвержден valid_frame_count кадрами подряд
+    direction: str
+        направление ('S', 'F', 'L', 'R')
+    eps: float
+        отклонение маркера от центра кадра [-1.0;1.0]
+    distance: float
+        расстояние до маркера (мм)
+    center: tuple[float, float] | None
+        центр маркера (пиксели кадра камеры)
+    ids: np.ndarray
+        id найденных маркеров, форма (N,)
+    corners: np.ndarray
+        углы найденных маркеров, форма (N, 4, 2)
+
+    Методы:
+    ----------
+    from_marker(marker, seq, timestamp): TelemetryMessage
+        сообщение по состоянию маркера после get_direction
+    """
+
+    __slots__ = (
+        "seq",
+        "timestamp",
+        "sent",
+        "found",
+        "valid",
+        "direction",
+        "eps",
+        "distance",
+        "center",
+        "ids",
+        "corners",
+    )
+
+    def __init__(
+        self,
+        seq: int,
+        timestamp: float = 0.0,
+        sent: float = 0.0,
+        found: bool = False,
+        valid: bool = False,
+        direction: str = "S",
+        eps: float = 0.0,
+        distance: float = 0.0,
+        center: Optional[tuple[float, float]] = None,
+        ids: Optional[np.ndarray] = None,
+        corners: Optional[np.ndarray] = None,
+    ) -> None:
+        self.seq = seq
+        self.timestamp = timestamp
+        self.sent = sent
+        self.found = found
+        self.valid = valid
+        self.direction = direction
+        self.eps = eps
+        self.distance = distance
+        self.center = center
+        self.ids = ids if ids is not None else np.empty(0, dtype=np.int32)
+        self.corners = (
+            corners if corners is not None else np.empty((0, 4, 2), dtype=np.float32)
+        )
+
+    @classmethod
+    def from_marker(cls, marker, seq: int, timestamp: float) -> "TelemetryMessage":
+        """
+        Сообщение по состоянию маркера после get_direction (и rescale).
+
+        Маркеры: все найденные маркеры MultiArucoMarker, коды QRMarker
+        (id - число из данных кода, -1 для других данных) или углы
+        маркера points.
+
+        Параметры:
+        ----------
+        marker: Marker
+            маркер
+        seq: int
+            номер кадра
+        timestamp: float
+            время захвата кадра (time.monotonic)
+
+        Возвращаемое значение:
+        ----------------------
+        TelemetryMessage:
+            сообщение
+        """
+        ids = corners = None
+        if getattr(marker, "ids", None) is not None and hasattr(marker, "corners"):
+            ids, corners = marker.ids, marker.corners
+        elif getattr(marker, "codes", None):
+            ids = [int(p) if p.isdigit() else -1 for p, _ in marker.codes]
+            corners = [c for _, c in marker.codes]
+        elif marker.points is not None and np.size(marker.points) % 8 == 0:
+            corners = np.reshape(marker.points, (-1, 4, 2))[:1]
+            ids = [marker.valid_id] * len(corners)
+        center = marker.center
+        return cls(
+            seq,
+            timestamp=timestamp,
+            found=center is not None,
+            valid=marker.valid,
+            direction=marker.direction,
+            eps=marker.eps,
+            distance=marker.distance,
+            center=(center[0], center[1]) if center is not None else None,
+            ids=np.asarray(ids, dtype=np.int32) if ids is not None else None,
+            corners=(
+                np.asarray(corners, dtype=np.float32).reshape(-1, 4, 2)
+                if corners is not None
+                else None
+            ),
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.__slots__
+            if name != "corners"
+        )
+        return f"TelemetryMessage({fields})"
+
+
+def encode(message: TelemetryMessage) -> bytes:
+    """
+    Кодирование сообщения в датаграмму.
+
+    Параметры:
+    ----------
+    message: TelemetryMessage
+        сообщение
+
+    Возвращаемое значение:
+    ----------------------
+    bytes:
+        датаграмма
+    """
+    flags = (FLAG_FOUND if message.found else 0) | (FLAG_VALID if message.valid else 0)
+    center = message.center if message.center is not None else (np.nan, np.nan)
+    detections = np.empty(len(message.ids), dtype=DETECTION_DTYPE)
+    detections["id"] = message.ids
+    detections["corners"] = message.corners
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        len(detections),
+        message.seq & 0xFFFFFFFF,
+        message.timestamp,
+        message.sent,
+        message.direction.encode(),
+        message.eps,
+        message.distance or 0.0,
+        *center,
+    )
+    return header + detections.tobytes()
+
+
+def decode(data: bytes) -> TelemetryMessage:
+    """
+    Декодирование датаграммы.
+
+    Параметры:
+    ----------
+    data: bytes
+        датаграмма
+
+    Возвращаемое значение:
+    ----------------------
+    TelemetryMessage:
+        сообщение
+
+    Исключения:
+    ----------
+    ValueError:
+        неверные начало, версия или длина датаграммы
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Telemetry message is too short")
+    (
+        magic,
+        version,
+        flags,
+        count,
+        seq,
+        timestamp,
+        sent,
+        direction,
+        eps,
+        distance,
+        x,
+        y,
+    ) = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unknown telemetry message format")
+    if len(data) != _HEADER.size + count * DETECTION_DTYPE.itemsize:
+        raise ValueError("Telemetry message length mismatch")
+    detections = np.frombuffer(data, DETECTION_DTYPE, count, _HEADER.size)
+    return TelemetryMessage(
+        seq,
+        timestamp=timestamp,
+        sent=sent,
+        found=bool(flags & FLAG_FOUND),
+        valid=bool(flags & FLAG_VALID),
+        direction=direction.decode(),
+        eps=eps,
+        distance=distance,
+        center=None if np.isnan(x) else (x, y),
+        ids=detections["id"],
+        corners=detections["corners"],
+    )
+
+
+class _Subscription:
+    """Подписка: сокет отправки, соединенный с подписчиком, и конец аренды."""
+
+    __slots__ = ("socket", "expires")
+
+    def __init__(self, sender: socket.socket) -> None:
+        self.socket = sender
+        self.expires = 0.0
+
+
+class TelemetryPublisher:
+    """
+    Класс рассылки результатов поиска маркера подписчикам.
+
+    Атрибуты:
+    ----------
+    address: str
+        адрес издателя ('udp://host:port' или 'unix:///path')
+    lease: float
+        время подписки без продления (с)
+    max_subscribers: int
+        наибольшее количество подписчиков
+    subscribers: dict
+        подписки (сокет отправки и время окончания аренды) по адресам подписчиков
+    published: int
+        количество опубликованных сообщений
+    sent: int
+        количество отправленных датаграмм
+    dropped: int
+        количество датаграмм, отброшенных из-за заполненной очереди подписчика
+
+    Методы:
+    ----------
+    publish(marker, seq, timestamp): int
+        рассылка результатов кадра, возвращает количество подписчиков
+    poll():
+        обработка датаграмм подписки
+    close():
+        закрытие сокетов
+    """
+
+    def __init__(
+        self,
+        address: str = config.TELEMETRY_ADDRESS,
+        lease: float = config.TELEMETRY_LEASE,
+        max_subscribers: int = config.TELEMETRY_MAX_SUBSCRIBERS,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта издателя.
+
+        Параметры:
+        ----------
+        address: str, optional
+            адрес издателя. По умолчанию config.TELEMETRY_ADDRESS.
+        lease: float, optional
+            время подписки без продления (с). По умолчанию config.TELEMETRY_LEASE.
+        max_subscribers: int, optional
+            наибольшее количество подписчиков. По умолчанию config.TELEMETRY_MAX_SUBSCRIBERS.
+        """
+        self.address = address
+        self.lease = lease
+        self.max_subscribers = max_subscribers
+        self.subscribers: dict[object, _Subscription] = {}
+        self.published = 0
+        self.sent = 0
+        self.dropped = 0
+        family, sockaddr = parse_address(address)
+        self._path = sockaddr if family == socket.AF_UNIX else None
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        if self._path is not None:
+            _unlink(self._path)
+        self._socket.bind(sockaddr)
+        self._socket.setblocking(False)
+
+    def poll(self) -> None:
+        """Обработка датаграмм подписки и удаление истекших подписок."""
+        now = time.monotonic()
+        while True:
+            try:
+                data, address = self._socket.recvfrom(16)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                continue  # ошибка отправки предыдущей датаграммы (ICMP)
+            if not address:
+                continue  # Unix сокет подписчика без адреса
+            if data == SUBSCRIBE:
+                subscription = self.subscribers.get(address)
+                if subscription is None:
+                    if len(self.subscribers) >= self.max_subscribers:
+                        continue
+                    subscription = self._subscribe(address)
+                    if subscription is None:
+                        continue
+                subscription.expires = now + self.lease
+            elif data == UNSUBSCRIBE:
+                self._unsubscribe(address)
+        for address, subscription in list(self.subscribers.items()):
+            if subscription.expires < now:
+                self._unsubscribe(address)
+
+    def _subscribe(self, address) -> Optional["_Subscription"]:
+        """Подписка с отдельным сокетом отправки."""
+        sender = socket.socket(self._socket.family, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            sender.connect(address)
+        except OSError:
+            sender.close()
+            return None
+        subscription = self.subscribers[address] = _Subscription(sender)
+        return subscription
+
+    def _unsubscribe(self, address) -> None:
+        """Удаление подписки."""
+        subscription = self.subscribers.pop(address, None)
+        if subscription is not None:
+            subscription.socket.close()
+
+    def publish(self, marker, seq: int, timestamp: float) -> int:
+        """
+        Рассылка результатов поиска маркера на кадре.
+
+        Параметры:
+        ----------
+        marker: Marker
+            маркер после get_direction (и rescale)
+        seq: int
+            номер кадра
+        timestamp: float
+            время захвата кадра (time.monotonic)
+
+        Возвращаемое значение:
+        ----------------------
+        int:
+            количество подписчиков, получивших сообщение
+        """
+        self.poll()
+        self.published += 1
+        if not self.subscribers:
+            return 0
+        message = TelemetryMessage.from_marker(marker, seq, timestamp)
+        message.sent = time.monotonic()
+        data = encode(message)
+        delivered = 0
+        for address, subscription in list(self.subscribers.items()):
+            try:
+                subscription.socket.send(data)
+            except (BlockingIOError, InterruptedError):
+                self.dropped += 1  # очередь подписчика заполнена
+                continue
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._unsubscribe(address)  # подписчик закрыл сокет
+                continue
+            except OSError:
+                self.dropped += 1
+                continue
+            delivered += 1
+        self.sent += delivered
+        return delivered
+
+    def close(self) -> None:
+        """Закрытие сокетов издателя и подписок."""
+        for address in list(self.subscribers):
+            self._unsubscribe(address)
+        self._socket.close()
+        if self._path is not None:
+            _unlink(self._path)
+
+
+class TelemetrySubscriber:
+    """
+    Класс получения результатов поиска маркера от издателя.
+
+    Подписка продлевается при вызовах receive, поэтому подписчик должен
+    читать сообщения не реже, чем раз в lease / 3.
+
+    Атрибуты:
+    ----------
+    address: str
+        адрес издателя
+    lease: float
+        время подписки без продления (с)
+    received: int
+        количество полученных сообщений
+    missed: int
+        количество пропущенных сообщений (по номерам кадров)
+
+    Методы:
+    ----------
+    receive(timeout): TelemetryMessage | None
+        следующее сообщение
+    __iter__: Iterator[TelemetryMessage]
+        сообщения до закрытия
+    close():
+        отмена подписки и закрытие сокета
+    """
+
+    def __init__(
+        self,
+        address: str = config.TELEMETRY_ADDRESS,
+        lease: float = config.TELEMETRY_LEASE,
+        buffer_size: int = 1 << 20,
+    ) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта подписчика.
+
+        Параметры:
+        ----------
+        address: str, optional
+            адрес издателя. По умолчанию config.TELEMETRY_ADDRESS.
+        lease: float, optional
+            время подписки без продления (с). По умолчанию config.TELEMETRY_LEASE.
+        buffer_size: int, optional
+            размер приемного буфера сокета (байты). По умолчанию 1 МБ.
+        """
+        self.address = address
+        self.lease = lease
+        self.received = 0
+        self.missed = 0
+        family, self._publisher = parse_address(address)
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+        if family == socket.AF_UNIX:
+            self._socket.bind("")  # абстрактный адрес Linux, файл не нужен
+        else:
+            self._socket.bind((self._publisher[0], 0))
+        self._renew_at = 0.0
+        self._last_seq: Optional[int] = None
+        self._closed = False
+
+    def _renew(self) -> None:
+        """Отправка (продление) подписки."""
+        interval = self.lease / 3
+        try:
+            self._socket.sendto(SUBSCRIBE, socket.MSG_DONTWAIT, self._publisher)
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass  # издатель еще не запущен, повтор при следующем продлении
+        except OSError:
+            # очередь Unix сокета издателя заполнена (net.unix.max_dgram_qlen)
+            interval = min(interval, RETRY_INTERVAL)
+        self._renew_at = time.monotonic() + interval
+
+    def receive(self, timeout: Optional[float] = None) -> Optional[TelemetryMessage]:
+        """
+        Следующее сообщение издателя.
+
+        Параметры:
+        ----------
+        timeout: float | None, optional
+            время ожидания (с), None - без ограничения. По умолчанию None.
+
+        Возвращаемое значение:
+        ----------------------
+        TelemetryMessage | None:
+            сообщение или None, если оно не получено за timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._closed:
+            now = time.monotonic()
+            if now >= self._renew_at:
+                self._renew()
+            wait = self._renew_at - now
+            if deadline is not None:
+                if now >= deadline:
+                    return None
+                wait = min(wait, deadline - now)
+            self._socket.settimeout(max(wait, 0.0))
+            try:
+                data = self._socket.recv(65536)
+            except (socket.timeout, BlockingIOError):
+                continue
+            except (ConnectionRefusedError, FileNotFoundError):
+                continue
+            try:
+                message = decode(data)
+            except ValueError:
+                continue
+            if self._last_seq is not None and message.seq > self._last_seq + 1:
+                self.missed += message.seq - self._last_seq - 1
+            self._last_seq = message.seq
+            self.received += 1
+            return message
+        return None
+
+    def __iter__(self) -> Iterator[TelemetryMessage]:
+        while not self._closed:
+            message = self.receive()
+            if message is not None:
+                yield message
+
+    def close(self) -> None:
+        """Отмена подписки и закрытие сокета."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._socket.sendto(UNSUBSCRIBE, socket.MSG_DONTWAIT, self._publisher)
+        except OSError:
+            pass
+        self._socket.close()
+
+    def __enter__(self) -> "TelemetrySubscriber":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _unlink(path: str) -> None:
+    """Удаление файла Unix сокета, оставшегося от предыдущего запуска."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Вывод сообщений TelemetryPublisher")
+    parser.add_argument("--address", default=config.TELEMETRY_ADDRESS)
+    args = parser.parse_args()
+
+    with TelemetrySubscriber(args.address) as subscriber:
+        try:
+            for message in subscriber:
+                delay = 1000.0 * (time.monotonic() - message.timestamp)
+                center = (
+                    f"({message.center[0]:.0f}, {message.center[1]:.0f})"
+                    if message.center is not None
+                    else "-"
+                )
+                print(
+                    f"{message.seq} {message.direction} "
+                    f"{'valid' if message.valid else 'found' if message.found else '-'} "
+                    f"ids {message.ids.tolist()} center {center} "
+                    f"{message.distance:.0f} mm, {delay:.1f} ms after capture"
+                )
+        except KeyboardInterrupt:
+            pass
+        print(f"{subscriber.received} received, {subscriber.missed} missed")
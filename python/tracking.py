@@ -1,11 +1,29 @@
 """Модуль реализующий основную логику работы системы"""
+import copy
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import config
 import cv2
+import numpy as np
+from calibration import CameraCalibration
 from data_sender import Sender
+from flow_tracker import FlowTracker
+from governor import DetectionGovernor
 from marker import ArucoMarker
-from video_capture import GoProVideoCapture, UsbVideoCapture
+from metrics import LatencyMetrics, MetricsServer, StartupTimer, boot_uptime
+from pipeline import Pipeline, StageQueue
+from preview import MjpegPreview
+from protocol import ControlMessage
+from recorder import FlightRecorder
+from telemetry import TelemetryPublisher
+from video_capture import (
+    DECODE_MODES,
+    FileVideoCapture,
+    GoProVideoCapture,
+    UsbVideoCapture,
+    VideoCapture,
+)
 
 
 class Tracking:
@@ -18,33 +36,392 @@ class Tracking:
         объект класса Sender, реализующий отправку команд
     marker: Marker
         объкт класса Marker, реализующий основную логику работы с маркером
+    headless: bool
+        режим без дисплея (без изображения информации на кадре и вывода кадра)
+    preview: MjpegPreview | None
+        просмотр кадров через локальный MJPEG поток
+    metrics: LatencyMetrics
+        задержки этапов обработки кадра
+    metrics_server: MetricsServer | None
+        HTTP сервер метрик Prometheus
+    governor: DetectionGovernor | None
+        подстройка разрешения поиска и пропуска кадров под частоту управления
+    recorder: FlightRecorder | None
+        запись кадров и результатов поиска маркера
+    telemetry: TelemetryPublisher | None
+        рассылка результатов поиска маркера подписчикам
+    camera: str
+        тип камеры: 'usb', 'gopro' или 'file'
+    warm_up: bool
+        прогрев детектора на пустом кадре при запуске
+    startup: StartupTimer
+        этапы запуска от старта процесса
 
     Методы:
     -------
+    start: VideoCapture
+        параллельное открытие порта, камеры и прогрев детектора
     tracking:
         основной алгоритм работы системы
+    tracking_pipeline:
+        основной алгоритм работы системы в виде многопоточного конвейера
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        headless: bool = config.HEADLESS,
+        preview: bool = config.PREVIEW_ENABLED,
+        metrics_server: bool = config.METRICS_SERVER,
+        governor: bool = config.GOVERNOR_ENABLED,
+        recorder: bool = config.RECORDER_ENABLED,
+        telemetry: bool = config.TELEMETRY_ENABLED,
+        camera: str = config.CAMERA_TYPE,
+        warm_up: bool = config.STARTUP_WARM_UP,
+    ) -> None:
+        self.metrics = LatencyMetrics()
+        self.startup = StartupTimer(self.metrics)
+        self.startup.mark("imports")
+        # порт открывается в start() одновременно с камерой
         self.sender = Sender()
-        self.sender.open_connect()
-        self.marker = ArucoMarker()
+        calibration = CameraCalibration.load() if config.USE_CALIBRATION else None
+        self.marker = ArucoMarker(calibration=calibration)
+        if config.FLOW_TRACKING:
+            self.marker = FlowTracker(self.marker)
+        self.headless = headless
+        self.preview = None
+        if preview:
+            undistort = calibration if config.PREVIEW_UNDISTORT else None
+            self.preview = MjpegPreview(calibration=undistort)
+        self.metrics_server = MetricsServer(self.metrics) if metrics_server else None
+        self.governor = DetectionGovernor(self.marker) if governor else None
+        self.recorder = FlightRecorder() if recorder else None
+        self.telemetry = TelemetryPublisher() if telemetry else None
+        self.camera = camera
+        self.warm_up = warm_up
+
+    def _open_camera(self, ring_size: int) -> VideoCapture:
+        """Открытие камеры типа self.camera."""
+        # сжатые кадры камеры нужны только для записи
+        passthrough = self.recorder is not None
+        if self.camera == "usb":
+            return UsbVideoCapture(ring_size=ring_size, passthrough=passthrough)
+        if self.camera == "gopro":
+            return GoProVideoCapture(ring_size=ring_size, passthrough=passthrough)
+        if self.camera == "file":
+            return FileVideoCapture(
+                config.CAMERA_FILE,
+                realtime=True,
+                loop=True,
+                ring_size=ring_size,
+                passthrough=passthrough,
+                decode=config.CAPTURE_DECODE,
+            )
+        raise ValueError(f"Unknown camera type: {self.camera}")
+
+    def _warm_up_detector(self) -> None:
+        """
+        Поиск маркера на пустом кадре размера кадров камеры.
+
+        Первый вызов детектора выделяет буферы и загружает словарь, поэтому
+        выполняется до первого кадра камеры; состояние маркера после пустого
+        кадра совпадает с состоянием при потерянном маркере.
+        """
+        _, scale = DECODE_MODES.get(config.CAPTURE_DECODE, (None, 1))
+        shape = (config.FRAME_HEIGHT // scale, config.FRAME_WIDTH // scale)
+        if config.CAPTURE_DECODE == "color" or self.camera == "gopro":
+            shape += (3,)  # поток H.264 GoPro декодируется захватом в BGR
+        dummy = np.zeros(shape, dtype=np.uint8)
+        self.marker.find_contour(dummy)
+        self.marker.rescale(scale)
+        self.marker.get_direction(config.FRAME_WIDTH)
+
+    def start(self, ring_size: int = config.FRAME_RING_SIZE) -> VideoCapture:
+        """
+        Параллельное открытие порта Arduino, камеры и прогрев детектора.
+
+        Открытие порта (сброс Arduino), камеры (для GoPro - команды камере и
+        ожидание UDP потока) и первый вызов детектора выполняются в
+        отдельных потоках, время запуска определяется самым долгим из них.
+
+        Параметры:
+        ----------
+        ring_size: int, optional
+            количество буферов кадров камеры. По умолчанию config.FRAME_RING_SIZE.
+
+        Возвращаемое значение:
+        ----------------------
+        VideoCapture:
+            открытая камера
+        """
+
+        def timed(name, function, *args):
+            result = function(*args)
+            self.startup.mark(name)
+            return result
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            serial = pool.submit(timed, "serial", self.sender.open_connect)
+            camera = pool.submit(timed, "camera", self._open_camera, ring_size)
+            if self.warm_up:
+                warm_up = pool.submit(timed, "warm_up", self._warm_up_detector)
+        try:
+            serial.result()
+            if self.warm_up:
+                warm_up.result()
+            cam = camera.result()
+        except BaseException:
+            if camera.exception() is None:
+                camera.result().release()
+            self.sender.close()
+            raise
+        self.startup.mark("ready")
+        return cam
+
+    def _first_valid(self, valid: bool, event: str = "command") -> None:
+        """
+        Запись времени первого кадра и первого правильного результата.
+
+        Параметры:
+        ----------
+        valid: bool
+            маркер прошел проверку
+        event: str, optional
+            'command' - команда передана Sender, 'detection' - маркер найден
+            в цикле без отправки команд. По умолчанию 'command'.
+        """
+        name = f"first_valid_{event}"
+        if name in self.startup.marks:
+            return
+        if "first_frame" not in self.startup.marks:
+            self.startup.mark("first_frame")
+        if valid:
+            self.startup.mark(name)
+            summary = self.startup.summary()
+            uptime = boot_uptime()
+            if uptime is not None:
+                self.metrics.set_gauge(f"boot_to_{name}_seconds", uptime)
+                summary += f"; first valid {event} {uptime:.2f} s after boot"
+            print(summary)
+
+    def _report_stats(self, csv_file) -> None:
+        """
+        Вывод статистики порта, записи, рассылки и сводки задержек, запись
+        строки сводки в CSV (config.METRICS_CSV).
+        """
+        metrics = self.metrics
+        if self.sender.writer is not None:
+            stats = self.sender.writer.stats()
+            print(
+                f"serial: {stats['written']} written, "
+                f"{stats['dropped_stale']} stale, "
+                f"{stats['dropped_duplicate']} duplicate, "
+                f"{stats['latency_p95_ms']:.1f} ms p95"
+            )
+            for key in ("dropped_stale", "latency_p95_ms"):
+                metrics.set_gauge(f"serial_{key}", stats[key])
+        if self.recorder is not None:
+            print(
+                f"recorder: {self.recorder.written} written, "
+                f"{self.recorder.dropped} dropped, "
+                f"{self.recorder.encoded} encoded"
+            )
+            metrics.set_gauge("recorder_dropped", self.recorder.dropped)
+        if self.telemetry is not None:
+            print(
+                f"telemetry: {len(self.telemetry.subscribers)} subscribers, "
+                f"{self.telemetry.sent} sent, "
+                f"{self.telemetry.dropped} dropped"
+            )
+            metrics.set_gauge("telemetry_dropped", self.telemetry.dropped)
+        print(metrics.summary())
+        if csv_file is not None:
+            metrics.write_csv(csv_file)
 
     def tracking(self):
-        cam = UsbVideoCapture()
-        # cam = GoProVideoCapture()
-        while True:
-            ret, frame = cam.read()
-            if ret:
-                find_ret = self.marker.find_contour(frame)
-                command = self.marker.get_direction(frame.shape[1])
-                if find_ret:
-                    self.marker.draw_contour(frame)
-                self.marker.print_info(frame)
-                cv2.imshow("Tracking", frame)
-                # ret = self.sender.send_command(command + '\n')
-                # print(f'Sending command "{command}" ---> {ret}')
-
-            if cv2.waitKey(1) & 0xFF == ord("q"):
-                break
-        cam.release()
+        cam = self.start()
+        if self.preview is not None:
+            self.preview.start()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+        if self.recorder is not None:
+            self.recorder.start()
+        csv_file = open(config.METRICS_CSV, "a") if config.METRICS_CSV else None
+        last_stats = time.perf_counter()
+        try:
+            while True:
+                with self.metrics.timed("capture"):
+                    captured = cam.read_frame()
+                ret = captured is not None
+                frame = captured.image if ret else None
+                if ret and (self.governor is None or self.governor.should_process()):
+                    self.metrics.observe_frame(captured)
+                    start = time.perf_counter()
+                    with self.metrics.timed("find_contour"):
+                        find_ret = self.marker.find_contour(frame)
+                        self.marker.rescale(captured.scale)
+                    with self.metrics.timed("get_direction"):
+                        command = self.marker.get_direction(captured.width)
+                    # команды в этом цикле не отправляются
+                    self._first_valid(self.marker.valid, "detection")
+                    if self.governor is not None:
+                        self.governor.update(time.perf_counter() - start)
+                    if self.recorder is not None:
+                        self.recorder.record(captured, self.marker)
+                    if self.telemetry is not None:
+                        self.telemetry.publish(
+                            self.marker, captured.seq, captured.timestamp
+                        )
+                    if self.preview is not None:
+                        self.preview.submit(frame, self.marker, captured.scale)
+                    if not self.headless:
+                        frame = captured.display_image()
+                        if find_ret:
+                            self.marker.draw_contour(frame)
+                        self.marker.print_info(frame)
+                        cv2.imshow("Tracking", frame)
+                    # ret = self.sender.send_command(command + '\n')
+                    # print(f'Sending command "{command}" ---> {ret}')
+                elif ret:
+                    self.metrics.skip_frame(captured)
+
+                if not self.headless and cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+                now = time.perf_counter()
+                interval = config.PIPELINE_STATS_INTERVAL
+                if interval and now - last_stats >= interval:
+                    last_stats = now
+                    self._report_stats(csv_file)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.preview is not None:
+                self.preview.stop()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            if csv_file is not None:
+                csv_file.close()
+            if self.recorder is not None:
+                self.recorder.stop()
+            if self.telemetry is not None:
+                self.telemetry.close()
+            cam.release()
+            self.sender.close()
+
+    def tracking_pipeline(self) -> None:
+        """
+        Основной алгоритм работы системы в виде многопоточного конвейера.
+
+        Захват, поиск маркера и отправка команд выполняются в отдельных
+        потоках, соединенных ограниченными очередями. Вывод изображения
+        выполняется в главном потоке и не задерживает отправку команд.
+        """
+        cam = self.start(ring_size=config.PIPELINE_RING_SIZE)
+        frames = StageQueue(
+            config.PIPELINE_FRAME_QUEUE_SIZE, config.PIPELINE_FRAME_POLICY
+        )
+        renders = StageQueue(
+            config.PIPELINE_FRAME_QUEUE_SIZE, config.PIPELINE_FRAME_POLICY
+        )
+        commands = StageQueue(1, config.PIPELINE_COMMAND_POLICY)
+
+        metrics = self.metrics
+
+        def capture():
+            with metrics.timed("capture"):
+                return cam.read_frame()
+
+        def detect(frame):
+            if self.governor is not None and not self.governor.should_process():
+                metrics.skip_frame(frame)
+                return None
+            metrics.observe_frame(frame)
+            start = time.perf_counter()
+            with metrics.timed("find_contour"):
+                find_ret = self.marker.find_contour(frame.image)
+                self.marker.rescale(frame.scale)
+            with metrics.timed("get_direction"):
+                self.marker.get_direction(frame.width)
+            if self.governor is not None:
+                self.governor.update(time.perf_counter() - start)
+            if self.recorder is not None:
+                self.recorder.record(frame, self.marker)
+            if self.telemetry is not None:
+                self.telemetry.publish(self.marker, frame.seq, frame.timestamp)
+            if self.preview is not None:
+                self.preview.submit(frame.image, self.marker, frame.scale)
+            if not self.headless:
+                renders.put((frame, copy.copy(self.marker), find_ret))
+            message = ControlMessage.from_marker(self.marker, frame.seq)
+            return message, frame.timestamp
+
+        def send(item):
+            message, timestamp = item
+            with metrics.timed("send"):
+                self.sender.send_message(message)
+            self._first_valid(message.valid)
+            metrics.observe("end_to_end", time.monotonic() - timestamp)
+
+        def render(item):
+            frame, marker, find_ret = item
+            if not cam.ring.is_current(frame):
+                return  # буфер кадра уже перезаписан захватом
+            image = frame.display_image()
+            if find_ret:
+                marker.draw_contour(image)
+            marker.print_info(image)
+            cv2.imshow("Tracking", image)
+
+        pipeline = Pipeline()
+        pipeline.add_stage("capture", capture, outputs=[frames])
+        pipeline.add_stage("detect", detect, frames, [commands])
+        pipeline.add_stage("send", send, commands)
+        render_stage = pipeline.add_stage("render", render, renders, threaded=False)
+        if self.preview is not None:
+            self.preview.start()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+        if self.recorder is not None:
+            self.recorder.start()
+        csv_file = open(config.METRICS_CSV, "a") if config.METRICS_CSV else None
+        pipeline.start()
+
+        last_stats = time.perf_counter()
+        try:
+            while True:
+                pipeline.check()
+                if self.headless:
+                    time.sleep(0.1)
+                else:
+                    render_stage.step(timeout=0.01)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        break
+                now = time.perf_counter()
+                interval = config.PIPELINE_STATS_INTERVAL
+                if interval and now - last_stats >= interval:
+                    last_stats = now
+                    for name, stats in pipeline.stats().items():
+                        print(
+                            f"{name}: {stats['fps']:.1f} fps, "
+                            f"{stats['mean_ms']:.1f} ms, "
+                            f"queue {stats['queue_depth']}, dropped {stats['dropped']}, "
+                            f"errors {stats['errors']}"
+                        )
+                        metrics.set_gauge(f"{name}_queue_dropped", stats["dropped"])
+                        metrics.set_gauge(f"{name}_errors", stats["errors"])
+                    self._report_stats(csv_file)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pipeline.stop()
+            if self.preview is not None:
+                self.preview.stop()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            if csv_file is not None:
+                csv_file.close()
+            if self.recorder is not None:
+                self.recorder.stop()
+            if self.telemetry is not None:
+                self.telemetry.close()
+            cam.release()
+            self.sender.close()
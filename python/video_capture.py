@@ -1,12 +1,216 @@
-import queue
+import os
+import time
 from abc import ABC, abstractmethod
-from threading import Thread
+from threading import Condition, Thread
+from typing import Optional
 
 import config
 import cv2
-import gopro_stream
 import numpy as np
-import requests
+
+
+# декодирование сжатых кадров: флаг cv2.imdecode и уменьшение кадра
+DECODE_MODES = {
+    "color": (cv2.IMREAD_COLOR, 1),
+    "gray": (cv2.IMREAD_GRAYSCALE, 1),
+    "gray2": (cv2.IMREAD_REDUCED_GRAYSCALE_2, 2),
+    "gray4": (cv2.IMREAD_REDUCED_GRAYSCALE_4, 4),
+}
+
+
+class Frame:
+    """
+    Кадр с порядковым номером и временем захвата (time.monotonic, с).
+
+    jpeg - сжатый кадр камеры (MJPG) в режиме passthrough, иначе None;
+    scale - во сколько раз image меньше кадра камеры (DECODE_MODES).
+    """
+
+    __slots__ = ("image", "seq", "timestamp", "jpeg", "scale")
+
+    def __init__(
+        self,
+        image: np.ndarray,
+        seq: int,
+        timestamp: float,
+        jpeg: Optional[np.ndarray] = None,
+        scale: int = 1,
+    ) -> None:
+        self.image = image
+        self.seq = seq
+        self.timestamp = timestamp
+        self.jpeg = jpeg
+        self.scale = scale
+
+    @property
+    def width(self) -> int:
+        """Ширина кадра камеры (пиксели)."""
+        return self.image.shape[1] * self.scale
+
+    def display_image(self) -> np.ndarray:
+        """Кадр в полном размере BGR для изображения (копия, если нужно)."""
+        image = self.image
+        if self.scale != 1:
+            image = cv2.resize(
+                image,
+                None,
+                fx=self.scale,
+                fy=self.scale,
+                interpolation=cv2.INTER_NEAREST,
+            )
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        return image
+
+
+def enable_passthrough(cap: cv2.VideoCapture) -> bool:
+    """
+    Выдача сжатых кадров MJPG без декодирования (cap.read возвращает JPEG).
+
+    V4L2 выдает сжатый кадр при CAP_PROP_CONVERT_RGB = 0, FFMPEG - при
+    CAP_PROP_FORMAT = -1.
+
+    Возвращаемое значение:
+    ----------------------
+    bool:
+        True, если захват поддерживает выдачу сжатых кадров
+    """
+    if cap.getBackendName() == "FFMPEG":
+        return cap.set(cv2.CAP_PROP_FORMAT, -1)
+    return cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+
+
+def setup_decode(
+    cap: cv2.VideoCapture,
+    ring: "FrameRing",
+    passthrough: bool = False,
+    decode: str = "color",
+    mjpg: Optional[bool] = None,
+) -> None:
+    """
+    Включение выдачи сжатых кадров для записи (passthrough) или для
+    декодирования в режиме decode (DECODE_MODES).
+
+    Сжатые кадры выдаются только для MJPG; если захват их не выдает, кадры
+    декодируются захватом в цвете, как обычно.
+
+    Параметры:
+    ----------
+    cap: cv2.VideoCapture
+        захват
+    ring: FrameRing
+        кольцо буферов захвата
+    passthrough: bool, optional
+        сохранять сжатые кадры в Frame.jpeg. По умолчанию False.
+    decode: str, optional
+        режим декодирования (DECODE_MODES). По умолчанию "color".
+    mjpg: bool | None, optional
+        захват выдает MJPG, None - по CAP_PROP_FOURCC. По умолчанию None.
+    """
+    if decode not in DECODE_MODES:
+        raise ValueError(f"Unknown decode mode: {decode}")
+    if not passthrough and decode == "color":
+        return
+    if mjpg is None:
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        mjpg = fourcc == cv2.VideoWriter_fourcc(*"MJPG")
+    if mjpg and enable_passthrough(cap):
+        ring.passthrough = True
+        ring.decode = decode
+
+
+class FrameRing:
+    """
+    Кольцо предвыделенных буферов кадров.
+
+    Кадры читаются прямо в буферы кольца (cap.read(image=buf)) и выдаются
+    без копирования. Буфер кадра с номером seq перезаписывается при захвате
+    кадра seq + size, проверить это можно методом is_current.
+    По разрыву номеров потребитель определяет пропущенные кадры, по
+    совпадению - повторно выданные.
+
+    В режиме passthrough захват выдает сжатые кадры (enable_passthrough),
+    кадр декодируется один раз для поиска маркера, а сжатый кадр
+    сохраняется в Frame.jpeg для записи без повторного кодирования.
+    Режим decode (DECODE_MODES) позволяет декодировать сразу в оттенки
+    серого и в уменьшенном размере: декодер JPEG пропускает цветность и
+    вычисляет только нужные коэффициенты DCT.
+    """
+
+    def __init__(
+        self,
+        size: int = config.FRAME_RING_SIZE,
+        passthrough: bool = False,
+        decode: str = "color",
+    ) -> None:
+        if decode not in DECODE_MODES:
+            raise ValueError(f"Unknown decode mode: {decode}")
+        self.size = size
+        self.passthrough = passthrough
+        self.decode = decode
+        self.buffers: list[Optional[np.ndarray]] = [None] * size
+        self.seq = -1
+        self.allocations = 0
+        self.closed = False
+        self._latest: Optional[Frame] = None
+        self._cond = Condition()
+
+    def write(self, cap: cv2.VideoCapture) -> Optional[Frame]:
+        """Захват следующего кадра в очередной буфер кольца."""
+        seq = self.seq + 1
+        slot = seq % self.size
+        buffer = self.buffers[slot]
+        jpeg = None
+        scale = 1
+        if self.passthrough:
+            ret, jpeg = cap.read()
+            if not ret:
+                return None
+            timestamp = time.monotonic()
+            flags, scale = DECODE_MODES[self.decode]
+            image = cv2.imdecode(jpeg, flags)
+            if image is None:
+                return None
+            self.buffers[slot] = image
+        else:
+            ret, image = cap.read(image=buffer)
+            if not ret:
+                return None
+            timestamp = time.monotonic()
+            if image is not buffer:
+                # первый проход по кольцу или изменился размер кадра
+                self.buffers[slot] = image
+                self.allocations += 1
+        frame = Frame(image, seq, timestamp, jpeg, scale)
+        with self._cond:
+            self.seq = seq
+            self._latest = frame
+            self._cond.notify_all()
+        return frame
+
+    def latest(
+        self, after_seq: int = -1, timeout: Optional[float] = None
+    ) -> Optional[Frame]:
+        """Ожидание кадра с номером больше after_seq, возвращает последний кадр."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.closed
+                or (self._latest is not None and self._latest.seq > after_seq),
+                timeout,
+            )
+            if self._latest is None or self._latest.seq <= after_seq:
+                return None
+            return self._latest
+
+    def is_current(self, frame: Frame) -> bool:
+        """Проверка, что буфер кадра еще не перезаписан."""
+        return frame.seq + self.size > self.seq + 1
+
+    def close(self) -> None:
+        """Завершение записи, ожидающие потребители получают None."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
 
 
 class VideoCapture:
@@ -29,20 +233,126 @@ class UsbVideoCapture(VideoCapture):
         api=config.USB_PREF_API,
         video_codec=config.USB_VIDEO_CODEC,
         resolution=(config.FRAME_HEIGHT, config.FRAME_WIDTH),
+        ring_size=config.FRAME_RING_SIZE,
+        passthrough=False,
+        decode=config.CAPTURE_DECODE,
     ) -> None:
         self.cap = cv2.VideoCapture(camera_index, api)
         self.cap.set(cv2.CAP_PROP_FOURCC, video_codec)
 
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[0])
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[1])
+        self.ring = FrameRing(ring_size)
+        mjpg = video_codec == cv2.VideoWriter_fourcc(*"MJPG")
+        setup_decode(self.cap, self.ring, passthrough, decode, mjpg)
 
     def read(self):
-        return self.cap.read()
+        frame = self.read_frame()
+        if frame is None:
+            return False, None
+        return True, frame.image
+
+    def read_frame(self) -> Optional[Frame]:
+        return self.ring.write(self.cap)
 
     def release(self):
         self.cap.release()
 
 
+class FileVideoCapture(VideoCapture):
+    """
+    Воспроизведение записанного видео или каталога изображений.
+
+    realtime=True - кадры выдаются с частотой записи (fps), иначе с
+    максимальной скоростью; loop=True - воспроизведение по кругу;
+    passthrough=True - сжатые кадры MJPG записи выдаются в Frame.jpeg;
+    decode - режим декодирования кадров MJPG записи (DECODE_MODES).
+    """
+
+    IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+    def __init__(
+        self,
+        source,
+        realtime=False,
+        loop=False,
+        fps=None,
+        ring_size=config.FRAME_RING_SIZE,
+        passthrough=False,
+        decode="color",
+    ) -> None:
+        self.source = source
+        self.realtime = realtime
+        self.loop = loop
+        self.ring = FrameRing(ring_size)
+        self.cap = None
+        self.images = None
+        self.index = 0
+        if os.path.isdir(source):
+            self.images = sorted(
+                os.path.join(source, name)
+                for name in os.listdir(source)
+                if name.lower().endswith(self.IMAGE_EXTENSIONS)
+            )
+            self.fps = fps or 30.0
+        else:
+            self.cap = cv2.VideoCapture(source)
+            self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+            setup_decode(self.cap, self.ring, passthrough, decode)
+        self.start_time = None
+
+    def __len__(self):
+        if self.images is not None:
+            return len(self.images)
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def read(self):
+        frame = self.read_frame()
+        if frame is None:
+            return False, None
+        return True, frame.image
+
+    def read_frame(self) -> Optional[Frame]:
+        if self.realtime:
+            self._wait_next()
+        frame = self._next_frame()
+        if frame is None and self.loop and self.ring.seq >= 0:
+            self.rewind()
+            frame = self._next_frame()
+        return frame
+
+    def rewind(self) -> None:
+        """Переход к первому кадру записи."""
+        self.index = 0
+        if self.cap is not None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _next_frame(self) -> Optional[Frame]:
+        if self.cap is not None:
+            return self.ring.write(self.cap)
+        if self.index >= len(self.images):
+            return None
+        image = cv2.imread(self.images[self.index])
+        self.index += 1
+        if image is None:
+            return None
+        self.ring.seq += 1
+        return Frame(image, self.ring.seq, time.monotonic())
+
+    def _wait_next(self) -> None:
+        """Ожидание времени выдачи следующего кадра."""
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        delay = self.start_time + (self.ring.seq + 1) / self.fps - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
 class RealSenseVideoCapture(VideoCapture):
     def __init__(self) -> None:
         pass
@@ -56,28 +366,49 @@ class RealSenseVideoCapture(VideoCapture):
 
 class BufferlessVideoCapture(Thread):
 
-    def __init__(self, source, api, video_codec) -> None:
+    def __init__(
+        self,
+        source,
+        api,
+        video_codec,
+        ring_size=config.FRAME_RING_SIZE,
+        passthrough=False,
+        decode=config.CAPTURE_DECODE,
+    ) -> None:
         self.cap = cv2.VideoCapture(source, api)
         self.cap.set(cv2.CAP_PROP_FOURCC, video_codec)
-        self.q = queue.Queue()
+        self.ring = FrameRing(ring_size)
+        # поток H.264 декодируется захватом, сжатые кадры только для MJPG
+        setup_decode(self.cap, self.ring, passthrough, decode)
+        self.last_seq = -1
+        self.running = True
         super().__init__(daemon=True)
 
     def run(self) -> None:
         """Read frames as soon as they are available, keeping only most recent one"""
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            if not self.q.empty():
-                try:
-                    self.q.get_nowait()  # discard previous (unprocessed) frame
-                except queue.Empty:
-                    pass
+        while self.running and self.ring.write(self.cap) is not None:
+            pass
+        self.ring.close()
 
-            self.q.put(frame)
+    def stop(self, timeout=1.0) -> None:
+        """Остановка чтения и закрытие захвата после выхода из cap.read."""
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+        self.cap.release()
 
     def get_frame(self):
-        return self.q.get()
+        frame = self.get_latest()
+        if frame is None:
+            raise EOFError("Video stream is closed")
+        return frame.image
+
+    def get_latest(self, timeout=None) -> Optional[Frame]:
+        """Ожидание кадра, который еще не выдавался, без копирования."""
+        frame = self.ring.latest(self.last_seq, timeout)
+        if frame is not None:
+            self.last_seq = frame.seq
+        return frame
 
 
 class GoProVideoCapture(VideoCapture):
@@ -86,13 +417,52 @@ class GoProVideoCapture(VideoCapture):
         serial=config.GOPRO_SERIAL,
         api=config.GOPRO_PREF_API,
         video_codec=config.GOPRO_VIDEO_CODEC,
+        base_url=None,
+        source=None,
+        ring_size=config.FRAME_RING_SIZE,
+        passthrough=False,
+        decode=config.CAPTURE_DECODE,
     ) -> None:
-        self.gopro = gopro_stream.gopro()
-        self.gopro.stream_stop()
-        self.gopro.stream_start()
+        """
+        Параметры:
+        ----------
+        serial: str, optional
+            3 последних цифры серийного номера камеры GoPro. По умолчанию config.GOPRO_SERIAL.
+        base_url: str | None, optional
+            адрес для команд камеры (например, fake_gopro). По умолчанию по serial.
+        source: str | None, optional
+            источник видео вместо UDP потока камеры. По умолчанию по serial.
+        ring_size: int, optional
+            количество буферов кадров. По умолчанию config.FRAME_RING_SIZE.
+        passthrough: bool, optional
+            сжатые кадры MJPG потока в Frame.jpeg. По умолчанию False.
+        decode: str, optional
+            режим декодирования кадров MJPG потока (DECODE_MODES). По умолчанию config.CAPTURE_DECODE.
+        """
+        # gopro_stream (и requests) импортируется только для камеры GoPro
+        import gopro_stream
+
+        self.gopro = gopro_stream.gopro(serial, base_url=base_url)
+        # команды камере выполняются одновременно с открытием захвата:
+        # открытие UDP потока ждет первых пакетов, которые приходят после старта
+        setup = Thread(target=self.gopro.restart_stream, daemon=True)
+        setup.start()
         cv2.setUseOptimized(onoff=True)
-        self.buff = BufferlessVideoCapture('udp://@172.2{0}.1{1}{2}.51:8554'.format(*serial), api, video_codec)
+        if source is None:
+            source = "udp://@172.2{0}.1{1}{2}.51:8554".format(*serial)
+        self.buff = BufferlessVideoCapture(
+            source,
+            api,
+            video_codec,
+            ring_size=ring_size,
+            passthrough=passthrough,
+            decode=decode,
+        )
+        self.ring = self.buff.ring
         self.buff.start()
+        setup.join()
+        # поток, не запущенный при старте, перезапускается keep-alive
+        self.gopro.start_keep_alive()
 
     def read(self):
         try:
@@ -100,6 +470,16 @@ class GoProVideoCapture(VideoCapture):
         except:
             return False, None
 
+    def read_frame(self) -> Optional[Frame]:
+        return self.buff.get_latest()
+
     def release(self):
-        self.buff.cap.release()
-        self.gopro.stream_stop()
+        import requests
+
+        self.buff.stop()
+        self.gopro.stop_keep_alive()
+        try:
+            self.gopro.stream_stop()
+        except requests.RequestException:
+            pass
+        self.gopro.close()